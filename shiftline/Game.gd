@@ -11,6 +11,14 @@ const LEVEL_BUTTON_WIDTH := 96
 const LEVEL_BUTTON_HEIGHT := 78
 const ANIM_DURATION := 0.18
 const SAVE_PATH := "user://progress.json"
+const LEVEL_PACK_PATH := "res://levels/levels.bin"
+const LEVEL_PACK_MAGIC := "SLVP"
+const LEVEL_PACK_VERSION := 2
+const LEVEL_PACK_HEADER_SIZE := 12
+const HINT_TABLE_PATH := "res://levels/hints.bin"
+const HINT_TABLE_MAGIC := "SLHT"
+const HINT_TABLE_VERSION := 1
+const HINT_TABLE_HEADER_SIZE := 40
 const TILE_TEXTURE_PATH := "res://assets/tiles/tile_base.svg"
 const WALL_TEXTURE_PATH := "res://assets/tiles/wall_block3.svg"
 const DIFFICULTY_LABELS := ["easy", "fun", "challenging", "hard"]
@@ -71,6 +79,9 @@ const LEVEL_NAMES := [
 const TILE_OFFSET_BIAS := Vector2(-2, -2)
 const HINT_STEPS_PER_FRAME := 200
 const HINT_MAX_STATES := 8000
+# ENGINE_VERSION in tools/slide_engine.py; baked level metrics from another
+# version are ignored and the game searches for itself.
+const LEVEL_ENGINE_VERSION := 1
 const FREE_HINTS_PER_LEVEL := 1
 const FREE_HINTS_PER_DAY := 1
 const FREE_HINTS_STAGE := 1
@@ -155,6 +166,9 @@ var solving := false
 var level_difficulty_text := ""
 var current_difficulty_label: String = ""
 var level_paths: Array = []
+var level_pack := PackedByteArray()
+var level_pack_count := 0
+var hint_tables := PackedByteArray()
 var current_stage := 1
 var current_level_in_stage := 1
 var unlocked_stage := 1
@@ -261,6 +275,7 @@ func _ready() -> void:
 	_setup_music()
 	_setup_iap()
 	_build_level_paths()
+	_load_level_pack()
 	_load_progress()
 	_update_stage_buttons()
 	_check_editor_preview()
@@ -1127,9 +1142,19 @@ func _on_hint_pressed() -> void:
 			status_label.text = "No solution found. Press Restart."
 			_play_sfx(sfx_no_solution, sfx_no_solution_player)
 			return
+	var table_move := _table_hint_move()
+	if not table_move.is_empty():
+		cached_hint_key = current_key
+		cached_hint_path = [table_move]
+		cached_hint_capped = false
+		cached_hint_unsolvable = false
+		_show_debug_line(table_move["is_row"], table_move["index"], int(table_move["dir"]), 0.8)
+		status_label.text = "Hint shown"
+		_consume_hint()
+		return
 	hint_consume_pending = true
 	hint_consume_key = current_key
-	_start_hint_job(current_key, HINT_MAX_STATES)
+	_start_hint_job(current_key, _hint_max_states())
 
 func _on_options_pressed() -> void:
 	start_panel.visible = false
@@ -2533,15 +2558,9 @@ func load_level(path: String) -> void:
 	if editor_preview_active and editor_preview_path != "" and path != editor_preview_path:
 		editor_preview_active = false
 		editor_preview_path = ""
-	var file := FileAccess.open(path, FileAccess.READ)
-	if file == null:
-		push_error("Failed to open level: %s" % path)
-		return
-	var parsed: Variant = JSON.parse_string(file.get_as_text())
-	if typeof(parsed) != TYPE_DICTIONARY:
-		push_error("Invalid JSON level: %s" % path)
+	var data := _read_level_data(path)
+	if data.is_empty():
 		return
-	var data: Dictionary = parsed
 	current_level_path = path
 	current_level_data = data
 	_clear_hint_cache()
@@ -2604,7 +2623,8 @@ func load_level(path: String) -> void:
 	level_start_time_msec = Time.get_ticks_msec()
 	_ensure_level_par_moves(20000)
 	if debug_enabled:
-		var depth := _solve_depth(2500)
+		var baked := _baked_metrics(data)
+		var depth := int(baked["solution_length"]) if baked.has("solution_length") else _solve_depth(2500)
 		if depth >= 0:
 			debug_validation_text = "ok (%d)" % depth
 		else:
@@ -2617,6 +2637,21 @@ func load_level(path: String) -> void:
 	_show_game()
 	call_deferred("_animate_level_intro")
 
+func _read_level_data(path: String) -> Dictionary:
+	if level_pack_count > 0:
+		var pack_index := level_paths.find(path)
+		if pack_index >= 0 and pack_index < level_pack_count:
+			return _level_data_from_pack(pack_index)
+	var file := FileAccess.open(path, FileAccess.READ)
+	if file == null:
+		push_error("Failed to open level: %s" % path)
+		return {}
+	var parsed: Variant = JSON.parse_string(file.get_as_text())
+	if typeof(parsed) != TYPE_DICTIONARY:
+		push_error("Invalid JSON level: %s" % path)
+		return {}
+	return parsed
+
 func _slide_with_bouncers(start: Vector2i, dir: Vector2i, occupied: Dictionary) -> Vector2i:
 	var pos := start
 	var current_dir := dir
@@ -3175,6 +3210,10 @@ func _format_time_ms(ms: int) -> String:
 
 func _ensure_level_par_moves(max_states: int) -> void:
 	current_level_min_moves = -1
+	var baked := _baked_metrics(current_level_data)
+	if baked.has("par_moves"):
+		current_level_min_moves = int(baked["par_moves"])
+		return
 	var key: String = _level_key(current_stage, current_level_in_stage)
 	var entry: Dictionary = _get_level_stats_entry(key)
 	if entry.has("par_moves"):
@@ -3417,7 +3456,12 @@ func _apply_difficulty_from_level(data: Dictionary, max_states: int) -> void:
 		current_difficulty_label = _normalize_difficulty_label(String(manual_label))
 		level_difficulty_text = "Diff: %s" % current_difficulty_label
 		return
-	var analysis := _analyze_difficulty(max_states)
+	var analysis: Dictionary = {}
+	var baked := _baked_metrics(data)
+	if not baked.is_empty():
+		analysis = _difficulty_from_metrics(baked)
+	if analysis.is_empty():
+		analysis = _analyze_difficulty(max_states)
 	if analysis.has("label"):
 		current_difficulty_label = _normalize_difficulty_label(String(analysis["label"]))
 		level_difficulty_text = "Diff: %s" % current_difficulty_label
@@ -3552,7 +3596,45 @@ func _analyze_difficulty(max_states: int) -> Dictionary:
 		max_min_moves = max(max_min_moves, mv)
 		if int(min_other_locked.get(p, 0)) > 0:
 			deps += 1
+	return _difficulty_label_for(max_min_moves, deps)
 
+# The "metrics" block written by tools/bake_level_metadata.py, or {} when the
+# level has none or it was baked for a different engine version.
+func _baked_metrics(data: Dictionary) -> Dictionary:
+	var metrics_var: Variant = data.get("metrics", null)
+	if typeof(metrics_var) != TYPE_DICTIONARY:
+		return {}
+	var metrics: Dictionary = metrics_var
+	if int(metrics.get("engine_version", 0)) != LEVEL_ENGINE_VERSION:
+		return {}
+	return metrics
+
+func _hint_max_states() -> int:
+	var baked := _baked_metrics(current_level_data)
+	if baked.has("hint_max_states"):
+		return mini(int(baked["hint_max_states"]), HINT_MAX_STATES)
+	return HINT_MAX_STATES
+
+# Same record as tools/level_metrics.py LevelMetrics.to_json(); empty if unusable.
+func _difficulty_from_metrics(metrics: Dictionary) -> Dictionary:
+	var holes_var: Variant = metrics.get("holes", [])
+	if typeof(holes_var) != TYPE_ARRAY:
+		return {}
+	var hole_entries: Array = holes_var
+	if hole_entries.size() != holes.size():
+		return {}
+	var max_min_moves := 0
+	var deps := 0
+	for entry_var in hole_entries:
+		if typeof(entry_var) != TYPE_DICTIONARY:
+			return {}
+		var entry: Dictionary = entry_var
+		max_min_moves = max(max_min_moves, int(entry.get("min_moves", 999)))
+		if int(entry.get("other_locked", 0)) > 0:
+			deps += 1
+	return _difficulty_label_for(max_min_moves, deps)
+
+func _difficulty_label_for(max_min_moves: int, deps: int) -> Dictionary:
 	if deps == 0:
 		if max_min_moves <= 1:
 			return {"label": "very easy"}
@@ -3995,6 +4077,200 @@ func _build_level_paths() -> void:
 	for i in range(1, STAGE_COUNT * LEVELS_PER_STAGE + 1):
 		level_paths.append("res://levels/level_%03d.json" % i)
 
+func _load_level_pack() -> void:
+	# Layout is documented in tools/build_level_pack.py. The editor keeps
+	# reading the JSON sources so level edits show up without a rebuild.
+	level_pack = PackedByteArray()
+	level_pack_count = 0
+	if OS.has_feature("editor") or not FileAccess.file_exists(LEVEL_PACK_PATH):
+		return
+	var bytes := FileAccess.get_file_as_bytes(LEVEL_PACK_PATH)
+	if bytes.size() < LEVEL_PACK_HEADER_SIZE or bytes.slice(0, 4).get_string_from_ascii() != LEVEL_PACK_MAGIC:
+		push_warning("Ignoring invalid level pack: %s" % LEVEL_PACK_PATH)
+		return
+	if bytes.decode_u16(4) != LEVEL_PACK_VERSION:
+		push_warning("Ignoring level pack version %d" % bytes.decode_u16(4))
+		return
+	var count := bytes.decode_u16(6)
+	var index_end := LEVEL_PACK_HEADER_SIZE + (count + 1) * 4
+	if count != level_paths.size() or bytes.decode_u8(9) != LEVELS_PER_STAGE:
+		push_warning("Level pack does not match the level list")
+		return
+	if bytes.size() < index_end or bytes.decode_u32(index_end - 4) != bytes.size():
+		push_warning("Level pack is truncated")
+		return
+	level_pack = bytes
+	level_pack_count = count
+	_load_hint_tables()
+
+func _load_hint_tables() -> void:
+	# Layout is documented in tools/build_hint_tables.py; tables are only
+	# trusted for the exact level pack they were built from.
+	hint_tables = PackedByteArray()
+	if level_pack_count == 0 or not FileAccess.file_exists(HINT_TABLE_PATH):
+		return
+	var bytes := FileAccess.get_file_as_bytes(HINT_TABLE_PATH)
+	if bytes.size() < HINT_TABLE_HEADER_SIZE or bytes.slice(0, 4).get_string_from_ascii() != HINT_TABLE_MAGIC:
+		push_warning("Ignoring invalid hint tables: %s" % HINT_TABLE_PATH)
+		return
+	if bytes.decode_u16(4) != HINT_TABLE_VERSION or bytes.decode_u16(6) != level_pack_count:
+		push_warning("Hint tables do not match the level pack")
+		return
+	var hashing := HashingContext.new()
+	hashing.start(HashingContext.HASH_SHA256)
+	hashing.update(level_pack)
+	if bytes.slice(8, HINT_TABLE_HEADER_SIZE) != hashing.finish():
+		push_warning("Hint tables were built for a different level pack")
+		return
+	var index_end := HINT_TABLE_HEADER_SIZE + (level_pack_count + 1) * 4
+	if bytes.size() < index_end or bytes.decode_u32(index_end - 4) != bytes.size():
+		push_warning("Hint tables are truncated")
+		return
+	hint_tables = bytes
+
+func _table_hint_move() -> Dictionary:
+	if hint_tables.is_empty():
+		return {}
+	var level_index := level_paths.find(current_level_path)
+	if level_index < 0 or level_index >= level_pack_count:
+		return {}
+	# Same key as Board.pack in tools/slide_engine.py: block cells color by
+	# color, ascending, cell_bits bits each.
+	var colors: Array = []
+	for y in height:
+		for x in width:
+			var color_id := int(grid[y][x])
+			if color_id >= 0 and not colors.has(color_id):
+				colors.append(color_id)
+	colors.sort()
+	var cell_bits := 1
+	while (1 << cell_bits) < width * height:
+		cell_bits += 1
+	var key := 0
+	var key_bits := 0
+	for color_id in colors:
+		for y in height:
+			for x in width:
+				if int(grid[y][x]) == color_id:
+					key = (key << cell_bits) | (y * width + x)
+					key_bits += cell_bits
+	if key_bits > 63:
+		return {}
+	var pos := int(hint_tables.decode_u32(HINT_TABLE_HEADER_SIZE + level_index * 4))
+	var key_size := hint_tables.decode_u8(pos)
+	var count := int(hint_tables.decode_u32(pos + 1))
+	var keys_at := pos + 5
+	var low := 0
+	var high := count
+	while low < high:
+		var mid := (low + high) / 2
+		var found := 0
+		for b in key_size:
+			found |= hint_tables.decode_u8(keys_at + mid * key_size + b) << (8 * b)
+		if found == key:
+			var move := hint_tables.decode_u8(keys_at + count * key_size + mid)
+			var line := move >> 1
+			var is_row := line < height
+			return {
+				"is_row": is_row,
+				"index": line if is_row else line - height,
+				"dir": 1 if move & 1 else -1
+			}
+		if found < key:
+			low = mid + 1
+		else:
+			high = mid
+	return {}
+
+func _level_data_from_pack(index: int) -> Dictionary:
+	var bytes := level_pack
+	var pos := int(bytes.decode_u32(LEVEL_PACK_HEADER_SIZE + index * 4))
+	var w := bytes.decode_u8(pos)
+	var h := bytes.decode_u8(pos + 1)
+	var data := {
+		"width": w,
+		"height": h,
+		"difficulty": bytes.decode_u8(pos + 2)
+	}
+	var label_len := bytes.decode_u8(pos + 3)
+	pos += 4
+	data["difficulty_label"] = bytes.slice(pos, pos + label_len).get_string_from_utf8()
+	pos += label_len
+	var palette_out: Array = []
+	var palette_size := bytes.decode_u8(pos)
+	pos += 1
+	for i in palette_size:
+		palette_out.append("#%02X%02X%02X" % [bytes.decode_u8(pos), bytes.decode_u8(pos + 1), bytes.decode_u8(pos + 2)])
+		pos += 3
+	data["palette"] = palette_out
+	var walls_out: Array = []
+	for cell in w * h:
+		if (bytes.decode_u8(pos + (cell >> 3)) >> (cell & 7)) & 1:
+			walls_out.append([cell % w, cell / w])
+	pos += (w * h + 7) / 8
+	data["walls"] = walls_out
+	for key in ["holes", "blocks"]:
+		var items: Array = []
+		var count := bytes.decode_u8(pos)
+		pos += 1
+		for i in count:
+			var cell := bytes.decode_u16(pos)
+			items.append({
+				"pos": [cell % w, cell / w],
+				"color": bytes.decode_u8(pos + 2)
+			})
+			pos += 3
+		data[key] = items
+	var bouncers_out: Array = []
+	var bouncer_count := bytes.decode_u8(pos)
+	pos += 1
+	for i in bouncer_count:
+		var cell := bytes.decode_u16(pos)
+		var flags := bytes.decode_u8(pos + 2)
+		var strength := bytes.decode_s16(pos + 3)
+		var type_len := bytes.decode_u8(pos + 5)
+		pos += 6
+		var entry := {
+			"pos": [cell % w, cell / w],
+			"type": bytes.slice(pos, pos + type_len).get_string_from_utf8()
+		}
+		pos += type_len
+		if flags & 1:
+			entry["strength"] = strength
+		bouncers_out.append(entry)
+	data["bouncers"] = bouncers_out
+	var engine_version := bytes.decode_u16(pos)
+	pos += 2
+	if engine_version > 0:
+		var metrics := {
+			"engine_version": engine_version,
+			"par_moves": bytes.decode_u16(pos),
+			"solution_length": bytes.decode_u16(pos + 2)
+		}
+		var hint_max_states := bytes.decode_u32(pos + 4)
+		if hint_max_states > 0:
+			metrics["hint_max_states"] = hint_max_states
+		var hole_count := bytes.decode_u8(pos + 8)
+		pos += 9
+		var hole_metrics: Array = []
+		for i in hole_count:
+			var cell := bytes.decode_u16(pos)
+			hole_metrics.append({
+				"pos": [cell % w, cell / w],
+				"color": bytes.decode_u8(pos + 2),
+				"min_moves": bytes.decode_u16(pos + 3),
+				"other_locked": bytes.decode_u8(pos + 5)
+			})
+			pos += 6
+		metrics["holes"] = hole_metrics
+		data["metrics"] = metrics
+	var extra_len := bytes.decode_u16(pos)
+	if extra_len > 0:
+		var extra: Variant = JSON.parse_string(bytes.slice(pos + 2, pos + 2 + extra_len).get_string_from_utf8())
+		if typeof(extra) == TYPE_DICTIONARY:
+			data.merge(extra)
+	return data
+
 func _level_path_for(stage: int, level_in_stage: int) -> String:
 	var index := (stage - 1) * LEVELS_PER_STAGE + (level_in_stage - 1)
 	if index < 0 or index >= level_paths.size():
@@ -0,0 +1,143 @@
+"""
+On-disk cache of level analyses, keyed by canonical (symmetry-free) signature.
+
+All eight rotations and reflections of a level share one entry.
+analyze_level solves and classifies every level in the orientation of its
+canonical signature, so an entry holds what a cold solve of any of the eight
+would give; the solution path is stored in that orientation and mapped back
+through the transform on lookup. Each entry also records the search mode and
+how many states it needed, so a hit is only used where that search would
+not have hit a smaller ``max_states``.
+
+Signatures are symmetry.canonical_key bytes, stored as hex. The file is
+stamped with ``slide_engine.ENGINE_VERSION`` and CACHE_FORMAT and dropped
+wholesale when either stamp differs.
+
+Pool processes work on their own copy of the cache; the generators send
+each worker's new entries back with its results (take) and merge them into
+the main process's cache in worker order, so parallel runs warm the file too.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from slide_engine import ENGINE_VERSION, Move
+
+
+CACHE_PATH = Path(__file__).resolve().parent / ".analysis_cache.json"
+# Bump when the signature or entry layout changes.
+CACHE_FORMAT = 3
+
+
+@dataclass(frozen=True)
+class CachedAnalysis:
+    # None when the level has no solution.
+    par_moves: Optional[int]
+    # None when the solution never locks every block color (analyze_level rejects it).
+    ordering: Optional[str]
+    multi_swipe: bool
+    # classify() output when cached; informational, hits re-run classify.
+    label: Optional[str]
+    path: List[Move]
+    search: str
+    states: int
+
+    def to_json(self) -> dict:
+        return {
+            "par_moves": self.par_moves,
+            "ordering": self.ordering,
+            "multi_swipe": self.multi_swipe,
+            "label": self.label,
+            "path": [[int(is_row), index, direction] for is_row, index, direction in self.path],
+            "search": self.search,
+            "states": self.states,
+        }
+
+    @staticmethod
+    def from_json(data: dict) -> "CachedAnalysis":
+        return CachedAnalysis(
+            par_moves=data["par_moves"],
+            ordering=data["ordering"],
+            multi_swipe=bool(data["multi_swipe"]),
+            label=data["label"],
+            path=[(bool(is_row), int(index), int(direction)) for is_row, index, direction in data["path"]],
+            search=str(data["search"]),
+            states=int(data["states"]),
+        )
+
+
+class AnalysisCache:
+    def __init__(self, path: Path = CACHE_PATH, engine_version: int = ENGINE_VERSION) -> None:
+        self.path = path
+        self.engine_version = engine_version
+        self._entries: Optional[Dict[bytes, CachedAnalysis]] = None
+        # Entries put since the last take(), for pool processes to send back.
+        self._new: Dict[bytes, CachedAnalysis] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def entries(self) -> Dict[bytes, CachedAnalysis]:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> Dict[bytes, CachedAnalysis]:
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("engine_version") != self.engine_version or data.get("format") != CACHE_FORMAT:
+            return {}
+        return {
+            bytes.fromhex(signature): CachedAnalysis.from_json(entry)
+            for signature, entry in data.get("entries", {}).items()
+        }
+
+    def get(self, signature: bytes, search: str, max_states: int) -> Optional[CachedAnalysis]:
+        """The entry for ``signature`` if a ``search`` capped at ``max_states`` would reach the same result."""
+        entry = self.entries.get(signature)
+        if entry is None or entry.search != search or entry.states >= max_states:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, signature: bytes, entry: CachedAnalysis) -> None:
+        self.entries[signature] = entry
+        self._new[signature] = entry
+        self._dirty = True
+
+    def take(self) -> Dict[bytes, CachedAnalysis]:
+        """Entries put since the last call (worker processes send them back to be merged)."""
+        new = self._new
+        self._new = {}
+        return new
+
+    def merge(self, entries: Dict[bytes, CachedAnalysis]) -> None:
+        for signature, entry in entries.items():
+            self.put(signature, entry)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        data = {
+            "engine_version": self.engine_version,
+            "format": CACHE_FORMAT,
+            "entries": {signature.hex(): entry.to_json() for signature, entry in sorted(self.entries.items())},
+        }
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        tmp.replace(self.path)
+        self._dirty = False
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Bake solver metadata into the level JSON files.
+
+Usage:
+  python tools/bake_level_metadata.py
+  SHIFTLINE_VERIFY=1 python tools/bake_level_metadata.py
+
+Writes a ``metrics`` block (see level_metrics.level_metadata) into every
+level: par, the solution, reachable-state count, per-hole min moves,
+dependencies and a hint search budget, tagged with the engine version.
+Game.gd uses it instead of running its own searches on load.
+
+Levels whose content, engine and solver sources match the build manifest
+(see build_manifest) are skipped; SHIFTLINE_FORCE=1 bakes them all.
+
+With SHIFTLINE_VERIFY=1 nothing is written; every level's block is
+recomputed with the current engine and the run fails if any is missing or
+differs. Rebuild the level pack and hint tables after baking.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import List
+
+from build_level_pack import LEVELS_PER_STAGE, STAGE_COUNT, level_path
+from build_manifest import BuildManifest, inputs_digest, source_digest
+from level_metrics import level_metadata
+from slide_engine import ENGINE_VERSION
+
+
+MAX_STATES = 1_000_000
+VERIFY_ONLY = os.environ.get("SHIFTLINE_VERIFY", "0") == "1"
+# Sources whose changes can change a metrics block.
+METADATA_SOURCES = (
+    "level_metrics.py",
+    "slide_engine.py",
+    "bouncer_engine.py",
+    "solver.py",
+    "reachability.py",
+    "state_store.py",
+)
+
+
+def metadata_inputs(data: dict, max_states: int = MAX_STATES) -> str:
+    """Manifest digest of everything the metrics block of ``data`` depends on."""
+    settings = {
+        "level": {key: value for key, value in data.items() if key != "metrics"},
+        "max_states": max_states,
+        "engine_version": ENGINE_VERSION,
+        "sources": source_digest(*METADATA_SOURCES),
+    }
+    return inputs_digest(settings)
+
+
+def main() -> None:
+    mismatched: List[str] = []
+    baked = 0
+    manifest = BuildManifest("bake")
+    for index in range(STAGE_COUNT * LEVELS_PER_STAGE):
+        path = level_path(index)
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        inputs = metadata_inputs(data)
+        if not VERIFY_ONLY and manifest.is_fresh(path.name, inputs):
+            baked += "metrics" in data
+            continue
+        metadata = level_metadata(data, MAX_STATES)
+        if metadata is None:
+            print(f"{path.name}: not baked (unsolvable or over {MAX_STATES} states)")
+        if VERIFY_ONLY:
+            if data.get("metrics") != metadata:
+                mismatched.append(path.name)
+            continue
+        if metadata is None:
+            data.pop("metrics", None)
+        else:
+            data["metrics"] = metadata
+            baked += 1
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        manifest.record(path.name, inputs, [path])
+
+    if VERIFY_ONLY:
+        if mismatched:
+            shown = ", ".join(mismatched[:10]) + (", ..." if len(mismatched) > 10 else "")
+            raise RuntimeError(f"Stale level metadata in {len(mismatched)} levels: {shown}")
+        print(f"Level metadata matches the current engine for {STAGE_COUNT * LEVELS_PER_STAGE} levels.")
+        return
+    manifest.save()
+    print(f"Baked metadata into {baked} of {STAGE_COUNT * LEVELS_PER_STAGE} levels (manifest: {manifest.stats()}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Measure how solve time grows with board size.
+
+Usage:
+  python tools/bench_board_sizes.py
+
+For every geometry, draws SAMPLES "hard" candidates with a fixed seed, built
+the way the generator builds them (candidate_builder), and solves each with
+every search in SEARCHES_TO_RUN under the geometry's max_states. Prints, per size
+and search, how many were solved or hit the cap and the mean and worst solve
+time and state count. The analysis cache is not used.
+"""
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from typing import List, Tuple
+
+import rebuild_levels_no_bouncers as gen
+from geometry import GEOMETRIES, Geometry
+from slide_engine import Board
+from solver import SEARCHES, SearchStats
+
+
+RNG_SEED = 240125
+SAMPLES = 30
+SEARCHES_TO_RUN = ("bfs", "bidirectional", "astar")
+
+
+def candidates(geometry: Geometry, count: int) -> List[gen.Candidate]:
+    rng = random.Random(f"{RNG_SEED}:{geometry.name}")
+    out: List[gen.Candidate] = []
+    while len(out) < count:
+        candidate = gen.candidate_builder("hard")(rng, "hard", geometry)
+        if candidate is not None:
+            out.append(candidate)
+    return out
+
+
+def bench(geometry: Geometry, search: str, levels: List[gen.Candidate]) -> Tuple[int, int, List[float], List[int]]:
+    solved = capped = 0
+    seconds: List[float] = []
+    states: List[int] = []
+    for candidate in levels:
+        board = Board(candidate.walls, candidate.holes, candidate.blocks.values(), geometry.width, geometry.height)
+        stats = SearchStats()
+        start = time.perf_counter()
+        path = SEARCHES[search](board, board.encode(candidate.blocks), geometry.max_states, stats)
+        seconds.append(time.perf_counter() - start)
+        states.append(stats.states)
+        solved += path is not None
+        capped += stats.capped
+    return solved, capped, seconds, states
+
+
+def main() -> None:
+    print(f"{SAMPLES} hard candidates per size, seed {RNG_SEED}")
+    print(
+        f"{'board':>8} {'search':>14} {'solved':>7} {'capped':>7} "
+        f"{'mean ms':>9} {'max ms':>9} {'states':>8} {'max':>8}"
+    )
+    for geometry in GEOMETRIES.values():
+        levels = candidates(geometry, SAMPLES)
+        for search in SEARCHES_TO_RUN:
+            solved, capped, seconds, states = bench(geometry, search, levels)
+            print(
+                f"{geometry.width}x{geometry.height:<5} {search:>14} {solved:>7} {capped:>7} "
+                f"{statistics.mean(seconds) * 1000:>9.1f} {max(seconds) * 1000:>9.1f} "
+                f"{statistics.mean(states):>8.0f} {max(states):>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
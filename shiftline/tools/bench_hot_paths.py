@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+"""
+Benchmark the hot paths of the level tools on fixed fixtures.
+
+Usage:
+  python tools/bench_hot_paths.py
+  SHIFTLINE_BENCH_SAVE=1 python tools/bench_hot_paths.py
+  SHIFTLINE_BENCH_BASELINE=/path/to/results.json python tools/bench_hot_paths.py
+
+Fixtures are the shipped levels plus every snapshot under levels/archive.
+Measured:
+  slide_grid calls per second over every move of every fixture;
+  analyze_level time and states per fixture, without the analysis cache;
+  canonical_signature (dedupe) signatures per second;
+  collect_levels acceptance rate (levels out per candidate drawn) per label,
+  from a fixed seed with the fixtures as already-seen levels;
+  render_level_sheets time per sheet, fixtures taken twenty to a sheet.
+
+Results go to tools/.bench_results.json. When a baseline exists (by default
+tools/.bench_baseline.json) every metric is compared against it and the run
+fails if any got worse by more than its tolerance. SHIFTLINE_BENCH_SAVE=1
+stores the results as the new baseline instead. Timings are only comparable
+on the same machine; state counts and acceptance rates are exact.
+"""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import dedupe_levels
+import rebuild_levels_no_bouncers as gen
+import render_level_sheets
+from geometry import Geometry
+from slide_engine import ENGINE_VERSION
+from solver import SearchStats
+
+
+TOOLS_DIR = Path(__file__).resolve().parent
+ARCHIVE_DIR = gen.LEVELS_DIR / "archive"
+RESULTS_PATH = TOOLS_DIR / ".bench_results.json"
+BASELINE_PATH = Path(os.environ.get("SHIFTLINE_BENCH_BASELINE", str(TOOLS_DIR / ".bench_baseline.json")))
+SAVE_BASELINE = os.environ.get("SHIFTLINE_BENCH_SAVE", "0") == "1"
+# Bump when metric names or meanings change; older baselines are not compared.
+RESULTS_FORMAT = 1
+
+SLIDE_ROUNDS = 20
+SIGNATURE_ROUNDS = 20
+COLLECT_LABELS = ("easy", "fun", "challenging", "hard")
+COLLECT_COUNT = 10
+COLLECT_ATTEMPTS_MULTIPLIER = 100
+# Allowed relative change in the bad direction before a metric is a regression.
+TIME_TOLERANCE = 0.25
+EXACT_TOLERANCE = 0.0
+
+# name -> (higher is better, tolerance); names not listed are reported only.
+METRICS: Dict[str, Tuple[bool, float]] = {
+    "slide_grid.calls_per_sec": (True, TIME_TOLERANCE),
+    "analyze_level.total_sec": (False, TIME_TOLERANCE),
+    "analyze_level.total_states": (False, EXACT_TOLERANCE),
+    "analyze_level.solved": (True, EXACT_TOLERANCE),
+    "canonical_signature.per_sec": (True, TIME_TOLERANCE),
+    "render.sec_per_sheet": (False, TIME_TOLERANCE),
+}
+for _label in COLLECT_LABELS:
+    METRICS[f"collect_levels.{_label}.acceptance"] = (True, EXACT_TOLERANCE)
+    METRICS[f"collect_levels.{_label}.ms_per_attempt"] = (False, TIME_TOLERANCE)
+
+
+class Fixture:
+    def __init__(self, name: str, data: dict) -> None:
+        self.name = name
+        self.data = data
+        self.geometry: Geometry = gen.level_geometry(data)
+        self.walls = {tuple(w) for w in data.get("walls", [])}
+        self.holes = {tuple(h["pos"]): int(h["color"]) for h in data.get("holes", [])}
+        self.blocks = {tuple(b["pos"]): int(b["color"]) for b in data.get("blocks", [])}
+
+
+def load_fixtures() -> List[Fixture]:
+    paths = sorted(gen.LEVELS_DIR.glob("level_*.json"))
+    for snapshot in sorted(p for p in ARCHIVE_DIR.iterdir() if p.is_dir()):
+        paths.extend(sorted(snapshot.glob("level_*.json")))
+    fixtures = []
+    for path in paths:
+        with path.open("r", encoding="utf-8") as f:
+            fixtures.append(Fixture(str(path.relative_to(gen.LEVELS_DIR)), json.load(f)))
+    if not fixtures:
+        raise RuntimeError(f"No fixtures under {gen.LEVELS_DIR}")
+    return fixtures
+
+
+def bench_slide_grid(fixtures: List[Fixture]) -> Dict[str, float]:
+    work = []
+    for fixture in fixtures:
+        g = fixture.geometry
+        moves = [(True, y, d) for y in range(g.height) for d in (-1, 1)]
+        moves += [(False, x, d) for x in range(g.width) for d in (-1, 1)]
+        work.append((gen.grid_from_blocks(fixture.blocks, g), fixture.walls, fixture.holes, g, moves))
+    slide_grid = gen.slide_grid
+    calls = 0
+    start = time.perf_counter()
+    for _ in range(SLIDE_ROUNDS):
+        for grid, walls, holes, g, moves in work:
+            for is_row, index, direction in moves:
+                slide_grid(grid, walls, holes, is_row, index, direction, g)
+            calls += len(moves)
+    seconds = time.perf_counter() - start
+    return {"slide_grid.calls": calls, "slide_grid.calls_per_sec": calls / seconds}
+
+
+def bench_analyze_level(fixtures: List[Fixture]) -> Tuple[Dict[str, float], Dict[str, dict]]:
+    per_level: Dict[str, dict] = {}
+    total_seconds = 0.0
+    total_states = 0
+    solved = 0
+    for fixture in fixtures:
+        stats = SearchStats()
+        start = time.perf_counter()
+        level = gen.analyze_level(fixture.blocks, fixture.holes, fixture.walls, stats=stats, geometry=fixture.geometry)
+        seconds = time.perf_counter() - start
+        total_seconds += seconds
+        total_states += stats.states
+        solved += level is not None
+        per_level[fixture.name] = {
+            "ms": round(seconds * 1000, 3),
+            "states": stats.states,
+            "par": level.par_moves if level is not None else None,
+        }
+    slowest = max(per_level.values(), key=lambda entry: entry["ms"])
+    metrics = {
+        "analyze_level.total_sec": total_seconds,
+        "analyze_level.mean_ms": total_seconds * 1000 / len(fixtures),
+        "analyze_level.max_ms": slowest["ms"],
+        "analyze_level.total_states": total_states,
+        "analyze_level.mean_states": total_states / len(fixtures),
+        "analyze_level.solved": solved,
+    }
+    return metrics, per_level
+
+
+def bench_canonical_signature(fixtures: List[Fixture]) -> Dict[str, float]:
+    canonical_signature = dedupe_levels.canonical_signature
+    count = 0
+    start = time.perf_counter()
+    for _ in range(SIGNATURE_ROUNDS):
+        for fixture in fixtures:
+            canonical_signature(fixture.walls, fixture.holes, fixture.blocks, fixture.geometry)
+        count += len(fixtures)
+    seconds = time.perf_counter() - start
+    return {"canonical_signature.count": count, "canonical_signature.per_sec": count / seconds}
+
+
+def bench_collect_levels(fixtures: List[Fixture]) -> Dict[str, float]:
+    seen = {
+        dedupe_levels.canonical_signature(fixture.walls, fixture.holes, fixture.blocks, fixture.geometry)
+        for fixture in fixtures
+    }
+    metrics: Dict[str, float] = {}
+    for label in COLLECT_LABELS:
+        rng = random.Random(f"{gen.RNG_SEED}:{label}")
+        start = time.perf_counter()
+        try:
+            levels = gen.collect_levels(label, COLLECT_COUNT, rng, set(seen), COLLECT_ATTEMPTS_MULTIPLIER)
+        except RuntimeError:
+            levels = []
+        seconds = time.perf_counter() - start
+        _label, stage_stats = gen.PIPELINE_STATS[-1]
+        attempts = stage_stats["generate"].received
+        metrics[f"collect_levels.{label}.levels"] = len(levels)
+        metrics[f"collect_levels.{label}.attempts"] = attempts
+        metrics[f"collect_levels.{label}.acceptance"] = len(levels) / attempts if attempts else 0.0
+        metrics[f"collect_levels.{label}.sec"] = seconds
+        metrics[f"collect_levels.{label}.ms_per_attempt"] = seconds * 1000 / attempts if attempts else 0.0
+    return metrics
+
+
+def bench_render(fixtures: List[Fixture]) -> Dict[str, float]:
+    per_sheet = render_level_sheets.LEVELS_PER_STAGE
+    sheets = 0
+    start = time.perf_counter()
+    for first in range(0, len(fixtures), per_sheet):
+        chunk = [fixture.data for fixture in fixtures[first : first + per_sheet]]
+        render_level_sheets.render_sheet(first // per_sheet + 1, chunk)
+        sheets += 1
+    seconds = time.perf_counter() - start
+    return {"render.sheets": sheets, "render.sec_per_sheet": seconds / sheets}
+
+
+def compare(results: dict, baseline: dict) -> List[str]:
+    """Regression messages for metrics worse than the baseline beyond their tolerance."""
+    regressions = []
+    old_metrics = baseline.get("metrics", {})
+    for name, value in results["metrics"].items():
+        rule = METRICS.get(name)
+        old = old_metrics.get(name)
+        if rule is None or old is None:
+            continue
+        higher_is_better, tolerance = rule
+        if higher_is_better:
+            worse = value < old * (1 - tolerance)
+        else:
+            worse = value > old * (1 + tolerance)
+        if worse:
+            regressions.append(f"{name}: {old:.6g} -> {value:.6g}")
+    return regressions
+
+
+def report(results: dict, baseline: Optional[dict]) -> None:
+    old_metrics = baseline.get("metrics", {}) if baseline else {}
+    for name, value in results["metrics"].items():
+        line = f"{name:<40} {value:>14.6g}"
+        old = old_metrics.get(name)
+        if old:
+            line += f"  ({(value - old) / old:+.1%} vs baseline)"
+        print(line)
+
+
+def settings() -> dict:
+    """Workload knobs; a baseline measured with others is not compared."""
+    return {
+        "slide_rounds": SLIDE_ROUNDS,
+        "signature_rounds": SIGNATURE_ROUNDS,
+        "collect_labels": list(COLLECT_LABELS),
+        "collect_count": COLLECT_COUNT,
+        "collect_attempts_multiplier": COLLECT_ATTEMPTS_MULTIPLIER,
+        "rng_seed": gen.RNG_SEED,
+    }
+
+
+def load_baseline() -> Optional[dict]:
+    if not BASELINE_PATH.exists():
+        return None
+    with BASELINE_PATH.open("r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("format") != RESULTS_FORMAT:
+        print(f"Ignoring baseline {BASELINE_PATH}: format {baseline.get('format')}, expected {RESULTS_FORMAT}")
+        return None
+    if baseline.get("settings") != settings():
+        print(f"Ignoring baseline {BASELINE_PATH}: measured with other settings {baseline.get('settings')}")
+        return None
+    return baseline
+
+
+def main() -> None:
+    # Every analysis is timed from scratch.
+    gen.ANALYSIS_CACHE = None
+    fixtures = load_fixtures()
+    metrics: Dict[str, float] = {"fixtures": len(fixtures)}
+    metrics.update(bench_slide_grid(fixtures))
+    analyze_metrics, per_level = bench_analyze_level(fixtures)
+    metrics.update(analyze_metrics)
+    metrics.update(bench_canonical_signature(fixtures))
+    metrics.update(bench_collect_levels(fixtures))
+    metrics.update(bench_render(fixtures))
+    results = {
+        "format": RESULTS_FORMAT,
+        "engine_version": ENGINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": settings(),
+        "metrics": metrics,
+        "levels": per_level,
+    }
+    with RESULTS_PATH.open("w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None if SAVE_BASELINE else load_baseline()
+    report(results, baseline)
+    print(f"Wrote {RESULTS_PATH}")
+    if SAVE_BASELINE:
+        with BASELINE_PATH.open("w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline {BASELINE_PATH}")
+        return
+    if baseline is None:
+        print(f"Nothing to compare against (SHIFTLINE_BENCH_SAVE=1 stores {BASELINE_PATH}).")
+        return
+    regressions = compare(results, baseline)
+    if regressions:
+        raise RuntimeError(f"{len(regressions)} regressions against {BASELINE_PATH}: " + "; ".join(regressions))
+    print(f"No regressions against {BASELINE_PATH}.")
+
+
+if __name__ == "__main__":
+    main()
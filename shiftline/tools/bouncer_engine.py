@@ -0,0 +1,176 @@
+"""
+Slide engine for levels with bouncers, matching Game.gd's slide loop.
+
+In the game (``_simulate_slide`` / ``_slide_with_bouncers``) a block moves
+one cell at a time until the next cell is off the board, a wall or a block.
+Entering a "reverse" bouncer flips its direction; other types and
+``strength`` do not change the slide. A block that comes back to a cell it
+already entered in the same direction stops there. Bouncers never turn a
+block out of its line, so a slide still only involves one row or column.
+
+Without blocks in the way, where a block goes from a cell in a direction
+only depends on walls and bouncers. ``BouncerBoard`` traces that path once
+per (cell, move) when the board is built; a slide walks the path until the
+first blocked cell, and usually just reads its end because nothing is in
+the way. Lines without reverse bouncers use the shared LineTable like any
+other board.
+
+Blocks are moved one at a time from the slide end and the line is rescanned
+in that order as it changes, so a block bounced further along the scan is
+slid again, exactly as in the game. Bouncer boards have no ``predecessors``
+and StopMap does not apply to them (``plain_slides`` is false); the solver
+searches them forward without pruning.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from slide_engine import HEIGHT, WIDTH, Board, State
+
+
+REVERSE = "reverse"
+
+# (cells entered in order, union of those cells, where the block ends up
+# when none of them is blocked) for one block, one move.
+Trajectory = Tuple[Tuple[int, ...], int, int]
+
+
+def bouncers_from_json(data: dict) -> Dict[Tuple[int, int], str]:
+    """Bouncer types by cell from a level JSON dictionary, as Game.gd loads them."""
+    out: Dict[Tuple[int, int], str] = {}
+    for entry in data.get("bouncers", []):
+        if isinstance(entry, dict):
+            x, y = entry.get("pos", [-1, -1])
+            out[(int(x), int(y))] = str(entry.get("type", REVERSE))
+    return out
+
+
+class BouncerBoard(Board):
+    def __init__(
+        self,
+        walls: Set[Tuple[int, int]],
+        holes: Dict[Tuple[int, int], int],
+        colors: Iterable[int] = (),
+        width: int = WIDTH,
+        height: int = HEIGHT,
+        bouncers: Optional[Dict[Tuple[int, int], str]] = None,
+    ) -> None:
+        super().__init__(walls, holes, colors, width, height)
+        self.bouncer_mask = 0
+        for (x, y), kind in (bouncers or {}).items():
+            if kind == REVERSE and 0 <= x < width and 0 <= y < height:
+                self.bouncer_mask |= self.bit(x, y)
+        self.bouncer_mask &= ~self.wall_mask
+        # Per move index of a line with a reverse bouncer, the trajectory
+        # from every open cell of the line.
+        self._trajectories: Dict[int, Dict[int, Trajectory]] = {}
+        for line_idx, (line, step, _first, _last) in enumerate(self._lines):
+            if not line & self.bouncer_mask:
+                continue
+            for move_idx in (2 * line_idx, 2 * line_idx + 1):
+                direction = step if move_idx & 1 else -step
+                self._trajectories[move_idx] = {
+                    cell: self._trace(cell, direction, line)
+                    for cell in self._line_cells[line_idx]
+                    if not cell & self.wall_mask
+                }
+        self.plain_slides = not self._trajectories
+
+    def _trace(self, cell: int, direction: int, line: int) -> Trajectory:
+        # Game.gd's loop with only walls in the way. The (cell, direction)
+        # pairs of one line are finite, so the revisit check always ends it
+        # before the game's safety counter would.
+        pos = cell.bit_length() - 1
+        path: List[int] = []
+        visited: Set[Tuple[int, int]] = set()
+        while True:
+            nxt = pos + direction
+            if nxt < 0 or not line >> nxt & 1 or self.wall_mask >> nxt & 1:
+                break
+            pos = nxt
+            path.append(1 << pos)
+            if (pos, direction) in visited:
+                break
+            visited.add((pos, direction))
+            if self.bouncer_mask >> pos & 1:
+                direction = -direction
+        span = 0
+        for bit in path:
+            span |= bit
+        return tuple(path), span, path[-1] if path else cell
+
+    def _bounce(self, state: State, move_idx: int, blocked: int) -> State:
+        """The state after ``move_idx`` on a line with bouncers; ``blocked`` is its walls and blocks."""
+        trajectories = self._trajectories[move_idx]
+        cells = self._line_cells[move_idx // 2]
+        if move_idx & 1:
+            cells = cells[::-1]
+        masks = list(state)
+        holes = self.hole_masks
+        blocks = blocked & ~self.wall_mask
+        for cell in cells:
+            if not cell & blocks:
+                continue
+            for i, mask in enumerate(masks):
+                if mask & cell:
+                    break
+            if cell & holes[i]:
+                continue  # locked
+            blocked ^= cell
+            path, span, dest = trajectories[cell]
+            if span & blocked:
+                dest = cell
+                for nxt in path:
+                    if nxt & blocked:
+                        break
+                    dest = nxt
+            blocked |= dest
+            if dest != cell:
+                masks[i] ^= cell | dest
+                blocks ^= cell | dest
+        return tuple(masks)
+
+    def slide(self, state: State, is_row: bool, index: int, direction: int) -> Tuple[State, bool]:
+        if index < 0 or index >= (self.height if is_row else self.width):
+            return state, False
+        move_idx = self._move_index[(is_row, index, 1 if direction > 0 else -1)]
+        if move_idx not in self._trajectories:
+            return super().slide(state, is_row, index, direction)
+        line = self._lines[move_idx // 2][0]
+        nxt = self._bounce(state, move_idx, (self.occupied(state) | self.wall_mask) & line)
+        return nxt, nxt != state
+
+    def successors(self, state: State) -> List[Tuple[int, State]]:
+        if self.plain_slides:
+            return super().successors(state)
+        occupied = self.occupied(state)
+        movable_all = occupied & ~self.locked(state)
+        blocked_all = occupied | self.wall_mask
+        table = self.line_table
+        trajectories = self._trajectories
+        out: List[Tuple[int, State]] = []
+        for line_idx, (line, _step, _first, _last) in enumerate(self._lines):
+            if not movable_all & line:
+                continue
+            blocked = blocked_all & line
+            for move_idx in (2 * line_idx, 2 * line_idx + 1):
+                if move_idx in trajectories:
+                    nxt = self._bounce(state, move_idx, blocked)
+                    if nxt != state:
+                        out.append((move_idx, nxt))
+                    continue
+                steps = table.lookup(self, move_idx, movable_all & line, blocked)
+                if steps:
+                    out.append((move_idx, self._apply(state, steps)))
+        return out
+
+    def successor_keys(self, state: State, key: int) -> List[Tuple[int, int]]:
+        if self.plain_slides:
+            return super().successor_keys(state, key)
+        pack = self.pack
+        return [(move_idx, pack(nxt)) for move_idx, nxt in self.successors(state)]
+
+    def predecessors(self, state: State) -> List[Tuple[int, State]]:
+        if self.plain_slides:
+            return super().predecessors(state)
+        raise RuntimeError("Reverse moves are not available on boards with bouncers")
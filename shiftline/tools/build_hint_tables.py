@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+Precompute per-level hint tables so the game can answer hints with a lookup.
+
+Usage:
+  python tools/build_level_pack.py
+  python tools/build_hint_tables.py
+
+Outputs:
+  shiftline/levels/hints.bin
+
+Every level's reachable state space is explored and each state gets its
+distance to the nearest solved state. A state goes in the table when it lies
+on a path at most ``slack`` moves longer than par (depth from the start plus
+distance to go), so a player who strays a little still gets instant hints;
+anything else falls back to the game's A* search. The stored move is the
+first move of the lexicographically smallest shortest path, the same one
+solver.bfs picks. ``slack`` starts at HINT_SLACK and drops until the whole
+file fits HINT_BUDGET_BYTES. Nothing is rebuilt while levels.bin and the
+sources match the build manifest (see build_manifest).
+
+Keys are Board.pack keys: block cell indexes color by color, ascending,
+``cell_bits`` bits each. Game.gd rebuilds them from its grid.
+
+Layout (little-endian):
+  header   magic "SLHT", u16 version, u16 level count,
+           SHA-256 of levels.bin (the game ignores tables built for
+           another pack), level count + 1 u32 record offsets; the last one
+           is the file size
+  record   u8 key bytes, u32 entry count, sorted keys (key bytes each),
+           one move byte per key (2 * line + (dir > 0), rows then columns)
+"""
+from __future__ import annotations
+
+import hashlib
+import struct
+from typing import Dict, List, Optional, Tuple
+
+from build_level_pack import LEVELS_DIR, PACK_PATH, level_path, load_sources
+from build_manifest import BuildManifest, inputs_digest, source_digest
+from level_metrics import board_from_level_json
+from slide_engine import Board, State
+
+
+OUT_PATH = LEVELS_DIR / "hints.bin"
+MAGIC = b"SLHT"
+TABLE_VERSION = 1
+HINT_SLACK = 4
+HINT_BUDGET_BYTES = 256 * 1024
+MAX_STATES = 500_000
+HEADER = struct.Struct("<4sHH32s")
+RECORD = struct.Struct("<BI")
+
+# (key, move, slack) for every tabled state of a level
+Entries = List[Tuple[int, int, int]]
+
+
+def hint_entries(board: Board, start: State, max_slack: int, max_states: int = MAX_STATES) -> Optional[Entries]:
+    """Tabled states within ``max_slack`` of par, or None if the level is too big or unsolvable."""
+    unpack = board.unpack
+    is_solved = board.is_solved
+    # Forward BFS: depth of every reachable state. Solved states end the level.
+    depth: Dict[int, int] = {board.pack(start): 0}
+    frontier = list(depth)
+    solved: List[int] = []
+    level = 0
+    while frontier:
+        level += 1
+        nxt = []
+        for key in frontier:
+            state = unpack(key)
+            if is_solved(state):
+                solved.append(key)
+                continue
+            for _move_idx, child in board.successor_keys(state, key):
+                if child not in depth:
+                    depth[child] = level
+                    nxt.append(child)
+        if len(depth) > max_states:
+            return None
+        frontier = nxt
+    if not solved:
+        return None
+
+    # Backward BFS over reachable states: distance to the nearest solved one.
+    togo: Dict[int, int] = {key: 0 for key in solved}
+    frontier = solved
+    level = 0
+    pack = board.pack
+    while frontier:
+        level += 1
+        nxt = []
+        for key in frontier:
+            for _move_idx, prev in board.predecessors(unpack(key)):
+                prev_key = pack(prev)
+                if prev_key in depth and prev_key not in togo:
+                    togo[prev_key] = level
+                    nxt.append(prev_key)
+        frontier = nxt
+
+    par = togo[board.pack(start)]
+    entries: Entries = []
+    for key, dist in togo.items():
+        slack = depth[key] + dist - par
+        if dist == 0 or slack > max_slack:
+            continue
+        state = unpack(key)
+        for move_idx, child in board.successor_keys(state, key):
+            if togo.get(child) == dist - 1:
+                entries.append((key, move_idx, slack))
+                break
+    entries.sort()
+    return entries
+
+
+def key_bytes(board: Board) -> int:
+    return max(1, (board.key_bits + 7) // 8)
+
+
+def encode_table(entries: Entries, width: int, slack: int) -> bytes:
+    rows = [(key, move) for key, move, entry_slack in entries if entry_slack <= slack]
+    out = bytearray(RECORD.pack(width, len(rows)))
+    for key, _move in rows:
+        out += key.to_bytes(width, "little")
+    out += bytes(move for _key, move in rows)
+    return bytes(out)
+
+
+def table_size(entries: Entries, width: int, slack: int) -> int:
+    count = sum(1 for _key, _move, entry_slack in entries if entry_slack <= slack)
+    return RECORD.size + count * (width + 1)
+
+
+def build_tables(records: List[bytes], pack_digest: bytes) -> bytes:
+    offset = HEADER.size + 4 * (len(records) + 1)
+    offsets = []
+    for record in records:
+        offsets.append(offset)
+        offset += len(record)
+    offsets.append(offset)
+    header = HEADER.pack(MAGIC, TABLE_VERSION, len(records), pack_digest)
+    return header + struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(records)
+
+
+def lookup(blob: bytes, index: int, key: int) -> Optional[int]:
+    """Reference lookup: the hint move for ``key`` in level ``index``, if tabled."""
+    start = struct.unpack_from("<I", blob, HEADER.size + 4 * index)[0]
+    width, count = RECORD.unpack_from(blob, start)
+    keys = start + RECORD.size
+    low, high = 0, count
+    while low < high:
+        mid = (low + high) // 2
+        found = int.from_bytes(blob[keys + mid * width : keys + (mid + 1) * width], "little")
+        if found == key:
+            return blob[keys + count * width + mid]
+        if found < key:
+            low = mid + 1
+        else:
+            high = mid
+    return None
+
+
+def main() -> None:
+    if not PACK_PATH.exists():
+        raise RuntimeError(f"Build the level pack first: {PACK_PATH}")
+    manifest = BuildManifest("hint_tables")
+    sources = source_digest("build_hint_tables.py", "level_metrics.py", "slide_engine.py")
+    inputs = inputs_digest({"sources": sources}, [PACK_PATH])
+    if manifest.is_fresh("hints", inputs):
+        print(f"{OUT_PATH} is up to date.")
+        return
+    pack_digest = hashlib.sha256(PACK_PATH.read_bytes()).digest()
+    tables: List[Tuple[Entries, int]] = []
+    for index, data in enumerate(load_sources()):
+        board, start = board_from_level_json(data)
+        entries = hint_entries(board, start, HINT_SLACK)
+        if entries is None:
+            print(f"{level_path(index).name}: no table (unsolvable or over {MAX_STATES} states)")
+            entries = []
+        tables.append((entries, key_bytes(board)))
+
+    slack = HINT_SLACK
+    while True:
+        total = HEADER.size + 4 * (len(tables) + 1) + sum(table_size(e, w, slack) for e, w in tables)
+        if total <= HINT_BUDGET_BYTES:
+            break
+        if slack == 0:
+            raise RuntimeError(f"Hint tables need {total} bytes even at slack 0; budget is {HINT_BUDGET_BYTES}")
+        slack -= 1
+
+    records = [encode_table(entries, width, slack) for entries, width in tables]
+    for index, record in enumerate(records):
+        count = RECORD.unpack_from(record, 0)[1]
+        print(f"{level_path(index).name}: {count} states, {len(record)} bytes")
+    blob = build_tables(records, pack_digest)
+    OUT_PATH.write_bytes(blob)
+    manifest.record("hints", inputs, [OUT_PATH])
+    manifest.save()
+    print(f"Wrote {OUT_PATH} ({len(blob)} bytes, slack {slack}, budget {HINT_BUDGET_BYTES}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+"""
+Compile the level JSON files into one binary pack for the game.
+
+Usage:
+  python tools/build_level_pack.py
+
+Outputs:
+  shiftline/levels/levels.bin
+
+The JSON files stay the editable source; rebuild the pack after changing them.
+Exports ship only the pack (export_presets.cfg excludes levels/level_*.json;
+the game reads the JSON files in the editor or when the pack is missing), so
+rebuild it before exporting.
+The build is skipped while the sources and this tool match the build
+manifest (see build_manifest).
+All integers are little-endian (Godot's FileAccess default).
+
+Layout:
+  header   magic "SLVP", u16 version, u16 level count,
+           u8 stage count, u8 levels per stage, u16 reserved
+  index    level count + 1 u32 record offsets from the start of the file,
+           stage-major (level_001 first); the last one is the file size
+  record   u8 width, u8 height, u8 difficulty, u8 label length, label,
+           u8 palette size, RGB bytes per color,
+           wall mask (width * height bits, bit y * width + x, LSB first),
+           u8 hole count, (u16 cell, u8 color) per hole,
+           u8 block count, (u16 cell, u8 color) per block,
+           u8 bouncer count, (u16 cell, u8 flags, i16 strength, u8 type
+           length, type) per bouncer, flags bit 0 set when it has a strength,
+           metrics (below), u16 extra length, any other keys as compact JSON
+  metrics  u16 engine version, 0 when the level has no metrics block; if not
+           0: u16 par moves, u16 solution length, u32 hint max states
+           (0 when not baked), u8 hole count, (u16 cell, u8 color, u16 min
+           moves, u8 other locked) per hole
+
+Holes and blocks keep their JSON order; walls come back in cell order. Only
+the metrics the game reads (PACKED_METRICS) are packed; the solution and the
+other tool-side fields stay in the JSON files.
+"""
+from __future__ import annotations
+
+import json
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from build_manifest import BuildManifest, inputs_digest, source_digest
+
+ROOT = Path(__file__).resolve().parents[1]
+LEVELS_DIR = ROOT / "levels"
+PACK_PATH = LEVELS_DIR / "levels.bin"
+
+MAGIC = b"SLVP"
+PACK_VERSION = 2
+STAGE_COUNT = 10
+LEVELS_PER_STAGE = 20
+HEADER = struct.Struct("<4sHHBBH")
+PIECE = struct.Struct("<HB")
+BOUNCER = struct.Struct("<HBhB")
+METRICS = struct.Struct("<HHHIB")
+HOLE_METRICS = struct.Struct("<HBHB")
+HAS_STRENGTH = 1
+KNOWN_KEYS = {
+    "width",
+    "height",
+    "palette",
+    "walls",
+    "blocks",
+    "holes",
+    "bouncers",
+    "difficulty",
+    "difficulty_label",
+    "metrics",
+}
+# Keys of the baked metrics block that Game.gd reads.
+PACKED_METRICS = ("engine_version", "par_moves", "solution_length", "holes", "hint_max_states")
+
+
+def level_path(index: int) -> Path:
+    return LEVELS_DIR / f"level_{index + 1:03d}.json"
+
+
+def _color_bytes(item: object) -> bytes:
+    if isinstance(item, str) and item.startswith("#") and len(item) == 7:
+        return bytes.fromhex(item[1:])
+    if isinstance(item, list) and len(item) >= 3:
+        return bytes(int(v) for v in item[:3])
+    raise RuntimeError(f"Unsupported palette entry: {item!r}")
+
+
+def _short_string(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    if len(raw) > 255:
+        raise RuntimeError(f"String too long for the pack: {text!r}")
+    return bytes([len(raw)]) + raw
+
+
+def _cell(pos: List[int], width: int, height: int) -> int:
+    x, y = int(pos[0]), int(pos[1])
+    if not (0 <= x < width and 0 <= y < height):
+        raise RuntimeError(f"Position {pos} outside {width}x{height} board")
+    return y * width + x
+
+
+def _pieces(items: List[dict], width: int, height: int) -> bytes:
+    out = bytearray([len(items)])
+    for item in items:
+        out += PIECE.pack(_cell(item["pos"], width, height), int(item["color"]))
+    return bytes(out)
+
+
+def _metrics(metrics: Optional[dict], width: int, height: int) -> bytes:
+    if not metrics:
+        return struct.pack("<H", 0)
+    holes = metrics.get("holes", [])
+    if len(holes) > 255:
+        raise RuntimeError("Too many holes for the pack")
+    out = bytearray(
+        METRICS.pack(
+            int(metrics["engine_version"]),
+            int(metrics["par_moves"]),
+            int(metrics["solution_length"]),
+            int(metrics.get("hint_max_states", 0)),
+            len(holes),
+        )
+    )
+    for hole in holes:
+        out += HOLE_METRICS.pack(
+            _cell(hole["pos"], width, height), int(hole["color"]), int(hole["min_moves"]), int(hole["other_locked"])
+        )
+    return bytes(out)
+
+
+def encode_level(data: dict) -> bytes:
+    width = int(data.get("width", 8))
+    height = int(data.get("height", 8))
+    if width * height > 1 << 16:
+        raise RuntimeError(f"Board too large for the pack: {width}x{height}")
+    out = bytearray([width, height, int(data.get("difficulty", 0))])
+    out += _short_string(str(data.get("difficulty_label", "")))
+    palette = data.get("palette", [])
+    out.append(len(palette))
+    for item in palette:
+        out += _color_bytes(item)
+    walls = 0
+    for pos in data.get("walls", []):
+        walls |= 1 << _cell(pos, width, height)
+    out += walls.to_bytes((width * height + 7) // 8, "little")
+    holes = data.get("holes", [])
+    blocks = data.get("blocks", [])
+    bouncers = data.get("bouncers", [])
+    if max(len(holes), len(blocks), len(bouncers)) > 255:
+        raise RuntimeError("Too many pieces for the pack")
+    out += _pieces(holes, width, height)
+    out += _pieces(blocks, width, height)
+    out.append(len(bouncers))
+    for bouncer in bouncers:
+        flags = HAS_STRENGTH if "strength" in bouncer else 0
+        kind = str(bouncer.get("type", "reverse")).encode("utf-8")
+        out += BOUNCER.pack(
+            _cell(bouncer["pos"], width, height), flags, int(bouncer.get("strength", 0)), len(kind)
+        )
+        out += kind
+    out += _metrics(data.get("metrics"), width, height)
+    extra = {key: value for key, value in data.items() if key not in KNOWN_KEYS}
+    raw = json.dumps(extra, separators=(",", ":")).encode("utf-8") if extra else b""
+    if len(raw) > 0xFFFF:
+        raise RuntimeError("Extra level data too large for the pack")
+    out += struct.pack("<H", len(raw)) + raw
+    return bytes(out)
+
+
+def build_pack(levels: List[dict], stage_count: int = STAGE_COUNT, levels_per_stage: int = LEVELS_PER_STAGE) -> bytes:
+    if len(levels) != stage_count * levels_per_stage:
+        raise RuntimeError(f"Expected {stage_count * levels_per_stage} levels, got {len(levels)}")
+    records = [encode_level(data) for data in levels]
+    offset = HEADER.size + 4 * (len(records) + 1)
+    offsets = []
+    for record in records:
+        offsets.append(offset)
+        offset += len(record)
+    offsets.append(offset)
+    header = HEADER.pack(MAGIC, PACK_VERSION, len(records), stage_count, levels_per_stage, 0)
+    return header + struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(records)
+
+
+class LevelPack:
+    """Reference reader; ``level(stage, level)`` returns the JSON dictionary."""
+
+    def __init__(self, data: bytes) -> None:
+        if len(data) < HEADER.size:
+            raise RuntimeError("Level pack truncated")
+        magic, version, count, stages, per_stage, _ = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise RuntimeError("Not a Shiftline level pack")
+        if version != PACK_VERSION:
+            raise RuntimeError(f"Unsupported level pack version {version}")
+        self.data = data
+        self.count = count
+        self.stage_count = stages
+        self.levels_per_stage = per_stage
+        self.offsets = struct.unpack_from(f"<{count + 1}I", data, HEADER.size)
+        if self.offsets[-1] != len(data):
+            raise RuntimeError("Level pack size does not match its index")
+
+    @classmethod
+    def load(cls, path: Path = PACK_PATH) -> "LevelPack":
+        return cls(path.read_bytes())
+
+    def level(self, stage: int, level: int) -> dict:
+        return self.decode((stage - 1) * self.levels_per_stage + (level - 1))
+
+    def decode(self, index: int) -> dict:
+        if not 0 <= index < self.count:
+            raise RuntimeError(f"Level index {index} outside pack")
+        data = self.data
+        pos = self.offsets[index]
+        width, height, difficulty, label_len = data[pos : pos + 4]
+        pos += 4
+        label = data[pos : pos + label_len].decode("utf-8")
+        pos += label_len
+        palette = []
+        for _ in range(data[pos]):
+            palette.append("#" + data[pos + 1 : pos + 4].hex().upper())
+            pos += 3
+        pos += 1
+        mask_len = (width * height + 7) // 8
+        walls_mask = int.from_bytes(data[pos : pos + mask_len], "little")
+        pos += mask_len
+        walls = []
+        for cell in range(width * height):
+            if walls_mask >> cell & 1:
+                walls.append([cell % width, cell // width])
+        pieces: List[List[dict]] = []
+        for _ in range(2):
+            items = []
+            count = data[pos]
+            pos += 1
+            for _ in range(count):
+                cell, color = PIECE.unpack_from(data, pos)
+                pos += PIECE.size
+                items.append({"pos": [cell % width, cell // width], "color": color})
+            pieces.append(items)
+        bouncers = []
+        count = data[pos]
+        pos += 1
+        for _ in range(count):
+            cell, flags, strength, kind_len = BOUNCER.unpack_from(data, pos)
+            pos += BOUNCER.size
+            entry: Dict[str, object] = {
+                "pos": [cell % width, cell // width],
+                "type": data[pos : pos + kind_len].decode("utf-8"),
+            }
+            pos += kind_len
+            if flags & HAS_STRENGTH:
+                entry["strength"] = strength
+            bouncers.append(entry)
+        metrics: Optional[dict] = None
+        (engine_version,) = struct.unpack_from("<H", data, pos)
+        if engine_version:
+            _, par_moves, solution_length, hint_max_states, hole_count = METRICS.unpack_from(data, pos)
+            pos += METRICS.size
+            hole_metrics = []
+            for _ in range(hole_count):
+                cell, color, min_moves, other_locked = HOLE_METRICS.unpack_from(data, pos)
+                pos += HOLE_METRICS.size
+                hole_metrics.append(
+                    {
+                        "pos": [cell % width, cell // width],
+                        "color": color,
+                        "min_moves": min_moves,
+                        "other_locked": other_locked,
+                    }
+                )
+            metrics = {
+                "engine_version": engine_version,
+                "par_moves": par_moves,
+                "solution_length": solution_length,
+                "holes": hole_metrics,
+            }
+            if hint_max_states:
+                metrics["hint_max_states"] = hint_max_states
+        else:
+            pos += 2
+        (extra_len,) = struct.unpack_from("<H", data, pos)
+        pos += 2
+        out = {
+            "width": width,
+            "height": height,
+            "palette": palette,
+            "walls": walls,
+            "blocks": pieces[1],
+            "holes": pieces[0],
+            "bouncers": bouncers,
+            "difficulty": difficulty,
+            "difficulty_label": label,
+        }
+        if metrics is not None:
+            out["metrics"] = metrics
+        if extra_len:
+            out.update(json.loads(data[pos : pos + extra_len].decode("utf-8")))
+        return out
+
+
+def _normalized(data: dict) -> dict:
+    """``data`` as the pack stores it, for comparing against a decoded level."""
+    out = dict(data)
+    out["palette"] = ["#" + _color_bytes(item).hex().upper() for item in data.get("palette", [])]
+    out["walls"] = sorted(([int(p[0]), int(p[1])] for p in data.get("walls", [])), key=lambda p: (p[1], p[0]))
+    if data.get("metrics"):
+        out["metrics"] = {key: value for key, value in data["metrics"].items() if key in PACKED_METRICS}
+    else:
+        out.pop("metrics", None)
+    return out
+
+
+def load_sources() -> List[dict]:
+    levels = []
+    for index in range(STAGE_COUNT * LEVELS_PER_STAGE):
+        path = level_path(index)
+        if not path.exists():
+            raise RuntimeError(f"Missing level file: {path}")
+        with path.open("r", encoding="utf-8") as f:
+            levels.append(json.load(f))
+    return levels
+
+
+def verify_pack(pack: LevelPack, levels: List[dict]) -> None:
+    for index, data in enumerate(levels):
+        if pack.decode(index) != _normalized(data):
+            raise RuntimeError(f"Pack does not round-trip {level_path(index).name}")
+
+
+def main() -> None:
+    manifest = BuildManifest("level_pack")
+    count = STAGE_COUNT * LEVELS_PER_STAGE
+    inputs = inputs_digest({"sources": source_digest("build_level_pack.py")}, [level_path(i) for i in range(count)])
+    if manifest.is_fresh("pack", inputs):
+        print(f"{PACK_PATH} is up to date.")
+        return
+    levels = load_sources()
+    blob = build_pack(levels)
+    verify_pack(LevelPack(blob), levels)
+    PACK_PATH.write_bytes(blob)
+    manifest.record("pack", inputs, [PACK_PATH])
+    manifest.save()
+    source_bytes = sum(level_path(i).stat().st_size for i in range(len(levels)))
+    print(f"Wrote {PACK_PATH} ({len(levels)} levels, {len(blob)} bytes; JSON sources {source_bytes} bytes).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Content-hash build manifest shared by the level tools.
+
+Every build step names its targets (one level, one stage sheet, the pack)
+and, for each, a digest of everything that decides it: settings such as the
+RNG seed and engine version, the tool sources holding the rules constants,
+and the input files. After producing a target the tool records that digest
+with digests of its output files. A later run skips the target when the
+input digest is unchanged and the outputs on disk still hash the same, so
+deleting or hand-editing an output rebuilds it.
+
+The manifest is a local file next to the analysis cache. SHIFTLINE_FORCE=1
+ignores it and rebuilds everything (the results are recorded again).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+TOOLS_DIR = Path(__file__).resolve().parent
+ROOT = TOOLS_DIR.parent
+MANIFEST_PATH = TOOLS_DIR / ".build_manifest.json"
+# Bump when the entry layout changes.
+MANIFEST_FORMAT = 1
+FORCE = os.environ.get("SHIFTLINE_FORCE", "0") == "1"
+
+_FILE_DIGESTS: Dict[Path, str] = {}
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of the file's bytes, or "" when it does not exist."""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return ""
+
+
+def source_digest(*modules: str) -> str:
+    """Digest of tool sources (e.g. "slide_engine.py"); computed once per run."""
+    h = hashlib.sha256()
+    for name in modules:
+        path = TOOLS_DIR / name
+        digest = _FILE_DIGESTS.get(path)
+        if digest is None:
+            digest = file_digest(path)
+            _FILE_DIGESTS[path] = digest
+        h.update(name.encode("utf-8") + b"\0" + digest.encode("ascii"))
+    return h.hexdigest()
+
+
+def inputs_digest(settings: dict, files: Iterable[Path] = ()) -> str:
+    """Digest of JSON-serializable ``settings`` and the contents of ``files``."""
+    h = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    for path in files:
+        h.update(b"\0" + path.name.encode("utf-8") + b"\0" + file_digest(path).encode("ascii"))
+    return h.hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, tool: str, path: Path = MANIFEST_PATH, force: bool = FORCE) -> None:
+        self.tool = tool
+        self.path = path
+        self.force = force
+        self._targets: Optional[Dict[str, dict]] = None
+        self._dirty = False
+        self.fresh_count = 0
+        self.stale_count = 0
+
+    def _load(self) -> Dict[str, Dict[str, dict]]:
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("format") != MANIFEST_FORMAT:
+            return {}
+        return data.get("tools", {})
+
+    @property
+    def targets(self) -> Dict[str, dict]:
+        if self._targets is None:
+            self._targets = self._load().get(self.tool, {})
+        return self._targets
+
+    def is_fresh(self, target: str, inputs: str) -> bool:
+        """True if ``target`` was built from ``inputs`` and its outputs are untouched."""
+        entry = self.targets.get(target)
+        fresh = (
+            not self.force
+            and entry is not None
+            and entry["inputs"] == inputs
+            and all(file_digest(ROOT / path) == digest for path, digest in entry["outputs"].items())
+        )
+        if fresh:
+            self.fresh_count += 1
+        else:
+            self.stale_count += 1
+        return fresh
+
+    def record(self, target: str, inputs: str, outputs: List[Path]) -> None:
+        self.targets[target] = {
+            "inputs": inputs,
+            "outputs": {path.relative_to(ROOT).as_posix(): file_digest(path) for path in outputs},
+        }
+        self._dirty = True
+
+    def forget(self, target: str) -> None:
+        if self.targets.pop(target, None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        # Re-read so tools run one after another never drop each other's entries.
+        data = self._load()
+        data[self.tool] = self.targets
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"format": MANIFEST_FORMAT, "tools": data}, f, indent=1, sort_keys=True)
+        tmp.replace(self.path)
+        self._dirty = False
+
+    def stats(self) -> Dict[str, int]:
+        return {"fresh": self.fresh_count, "rebuilt": self.stale_count}
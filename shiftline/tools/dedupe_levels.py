@@ -4,16 +4,29 @@ Dedupe Shiftline levels by symmetry and regenerate replacements.
 
 Usage:
   python tools/dedupe_levels.py
+  SHIFTLINE_WORKERS=32 python tools/dedupe_levels.py
+  SHIFTLINE_REPORT=1 python tools/dedupe_levels.py
+
+SHIFTLINE_REPORT=1 and SHIFTLINE_PROFILE=1 write a report of where the
+replacement attempts went and a profile (see run_report).
 """
 from __future__ import annotations
 
 import json
 import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import rebuild_levels_no_bouncers as gen
+from geometry import STANDARD, Geometry
+from level_metrics import parse_solution
+from run_report import OK, REPORT, session
+from similarity import NearDuplicateIndex, level_shingles
+from slide_engine import Board, Move, line_table
+from symmetry import SymmetryIndex
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -30,24 +43,21 @@ class LevelEntry:
     holes: Dict[Tuple[int, int], int]
     blocks: Dict[Tuple[int, int], int]
     label: str
+    solution: Optional[List[Move]] = None
+    geometry: Geometry = STANDARD
 
 
 def canonical_signature(
     walls: Set[Tuple[int, int]],
     holes: Dict[Tuple[int, int], int],
     blocks: Dict[Tuple[int, int], int],
-) -> str:
-    signatures: List[str] = []
-    for variant in range(8):
-        twalls = tuple(sorted(gen.transform_pos(p, variant) for p in walls))
-        tholes = tuple(sorted((gen.transform_pos(p, variant), c) for p, c in holes.items()))
-        tblocks = tuple(sorted((gen.transform_pos(p, variant), c) for p, c in blocks.items()))
-        signatures.append(f"W{twalls}|H{tholes}|B{tblocks}")
-    return min(signatures)
+    geometry: Geometry = STANDARD,
+) -> bytes:
+    return gen.canonical_variant(walls, holes, blocks, geometry)[0]
 
 
-def canonical_signature_level(level: gen.Level) -> str:
-    return canonical_signature(level.walls, level.holes, level.blocks)
+def canonical_signature_level(level: gen.Level) -> bytes:
+    return canonical_signature(level.walls, level.holes, level.blocks, level.geometry)
 
 
 def load_levels() -> List[LevelEntry]:
@@ -59,7 +69,18 @@ def load_levels() -> List[LevelEntry]:
         holes = {tuple(h["pos"]): int(h["color"]) for h in data.get("holes", [])}
         blocks = {tuple(b["pos"]): int(b["color"]) for b in data.get("blocks", [])}
         label = gen.normalize_label(str(data.get("difficulty_label", "hard"))) or "hard"
-        entries.append(LevelEntry(path=path, walls=walls, holes=holes, blocks=blocks, label=label))
+        solution = parse_solution(data.get("metrics", {}).get("solution", ""))
+        entries.append(
+            LevelEntry(
+                path=path,
+                walls=walls,
+                holes=holes,
+                blocks=blocks,
+                label=label,
+                solution=solution or None,
+                geometry=gen.level_geometry(data),
+            )
+        )
     return entries
 
 
@@ -83,20 +104,24 @@ def _assign_line_pairs(
     return blocks_out, holes_out
 
 
-def generate_easy_multi_block(rng: random.Random, blocks_count: int = 2) -> Optional[gen.Level]:
+def generate_easy_multi_block(
+    rng: random.Random,
+    blocks_count: int = 2,
+    geometry: Geometry = STANDARD,
+) -> Optional[gen.Level]:
     if blocks_count < 2:
         return None
     for _ in range(60):
         orient_row = rng.choice([True, False])
         direction_positive = rng.choice([True, False])
         if orient_row:
-            y = rng.randrange(gen.HEIGHT)
+            y = rng.randrange(geometry.height)
             if direction_positive:
-                hole_positions = [gen.WIDTH - 1 - i for i in range(blocks_count)]
-                candidates = list(range(0, gen.WIDTH - blocks_count))
+                hole_positions = [geometry.width - 1 - i for i in range(blocks_count)]
+                candidates = list(range(0, geometry.width - blocks_count))
             else:
                 hole_positions = [i for i in range(blocks_count)]
-                candidates = list(range(blocks_count, gen.WIDTH))
+                candidates = list(range(blocks_count, geometry.width))
             if len(candidates) < blocks_count:
                 continue
             rng.shuffle(candidates)
@@ -112,13 +137,13 @@ def generate_easy_multi_block(rng: random.Random, blocks_count: int = 2) -> Opti
             blocks = {(x, y): color for x, color in blocks_line.items()}
             holes = {(x, y): color for x, color in holes_line.items()}
         else:
-            x = rng.randrange(gen.WIDTH)
+            x = rng.randrange(geometry.width)
             if direction_positive:
-                hole_positions = [gen.HEIGHT - 1 - i for i in range(blocks_count)]
-                candidates = list(range(0, gen.HEIGHT - blocks_count))
+                hole_positions = [geometry.height - 1 - i for i in range(blocks_count)]
+                candidates = list(range(0, geometry.height - blocks_count))
             else:
                 hole_positions = [i for i in range(blocks_count)]
-                candidates = list(range(blocks_count, gen.HEIGHT))
+                candidates = list(range(blocks_count, geometry.height))
             if len(candidates) < blocks_count:
                 continue
             rng.shuffle(candidates)
@@ -134,33 +159,50 @@ def generate_easy_multi_block(rng: random.Random, blocks_count: int = 2) -> Opti
             blocks = {(x, y): color for y, color in blocks_line.items()}
             holes = {(x, y): color for y, color in holes_line.items()}
 
-        level = gen.analyze_level(blocks, holes, set())
+        level = gen.analyze_level(blocks, holes, set(), geometry=geometry)
         if level is None or level.label != "easy":
             continue
+        if REPORT is not None:
+            REPORT.count("easy_line")
         return level
+    if REPORT is not None:
+        REPORT.count("easy_line", "no_level")
     return None
 
 
 def _mutate_with_walls(entry: LevelEntry, rng: random.Random, extra_walls: int) -> Optional[gen.Level]:
     if extra_walls <= 0:
         return None
-    all_positions = [(x, y) for y in range(gen.HEIGHT) for x in range(gen.WIDTH)]
+    geometry = entry.geometry
+    all_positions = geometry.positions()
     for _ in range(80):
         walls = set(entry.walls)
         empties = [pos for pos in all_positions if pos not in walls and pos not in entry.blocks and pos not in entry.holes]
         if len(empties) < extra_walls:
+            if REPORT is not None:
+                REPORT.count("mutate", "no_room")
             return None
         rng.shuffle(empties)
         for idx in range(extra_walls):
             walls.add(empties[idx])
-        level = gen.analyze_level(dict(entry.blocks), dict(entry.holes), walls)
+        if gen.is_hopeless(entry.blocks, entry.holes, walls, geometry):
+            continue
+        level = gen.analyze_level(dict(entry.blocks), dict(entry.holes), walls, geometry=geometry)
         if level is None or level.label != entry.label:
             continue
+        if REPORT is not None:
+            REPORT.count("mutate")
         return level
+    if REPORT is not None:
+        REPORT.count("mutate", "no_level")
     return None
 
 
-def _generate_spicy_candidate(rng: random.Random, target_label: str) -> Optional[gen.Level]:
+def _generate_spicy_candidate(
+    rng: random.Random,
+    target_label: str,
+    geometry: Geometry = STANDARD,
+) -> Optional[gen.Level]:
     if target_label not in ("challenging", "hard"):
         return None
     blocks_count = rng.randint(2, 4)
@@ -171,65 +213,125 @@ def _generate_spicy_candidate(rng: random.Random, target_label: str) -> Optional
         walls_count = rng.randint(3, 8)
         scramble_len = rng.randint(5, 9)
 
-    walls = set(gen.random_positions(rng, walls_count, set()))
-    holes = gen.build_holes(rng, blocks_count, walls, target_label)
+    walls = set(gen.random_positions(rng, walls_count, set(), geometry))
+    holes = gen.build_holes(rng, blocks_count, walls, target_label, geometry)
     if holes is None:
+        if REPORT is not None:
+            REPORT.count("spicy", "no_holes")
         return None
 
     blocks = dict(holes)
-    grid = gen.grid_from_blocks(blocks)
+    board = Board(walls, {}, blocks.values(), geometry.width, geometry.height)
+    state = board.encode(blocks)
     for _ in range(scramble_len):
         moved = False
         for _try in range(8):
             is_row = rng.choice([True, False])
-            index = rng.randrange(gen.HEIGHT if is_row else gen.WIDTH)
+            index = rng.randrange(geometry.height if is_row else geometry.width)
             direction = rng.choice([-1, 1])
-            grid_next, moved = gen.slide_grid(grid, walls, {}, is_row, index, direction)
+            state_next, moved = board.slide(state, is_row, index, direction)
             if moved:
-                grid = grid_next
+                state = state_next
                 break
         if not moved:
             break
 
-    blocks = gen.blocks_from_grid(grid)
+    blocks = gen.blocks_from_grid(board.decode_grid(state), geometry)
     if any(holes.get(pos) == color for pos, color in blocks.items()):
+        if REPORT is not None:
+            REPORT.count("spicy", "starts_solved")
         return None
-    return gen.analyze_level(blocks, holes, walls)
+    if gen.is_hopeless(blocks, holes, walls, geometry):
+        if REPORT is not None:
+            REPORT.count("spicy", "hopeless")
+        return None
+    level = gen.analyze_level(blocks, holes, walls, geometry=geometry)
+    if REPORT is not None:
+        REPORT.count("spicy", OK if level is not None else "unsolved")
+    return level
+
+
+def _unique_attempt(
+    rng: random.Random,
+    target_label: str,
+    seed_entry: Optional[LevelEntry] = None,
+) -> Optional[gen.Level]:
+    level: Optional[gen.Level] = None
+    geometry = seed_entry.geometry if seed_entry is not None else STANDARD
+    if seed_entry is not None and target_label in ("challenging", "hard"):
+        extra_walls = 1 if target_label == "challenging" else 2
+        level = _mutate_with_walls(seed_entry, rng, extra_walls)
+    if target_label == "easy":
+        if rng.random() < 0.65:
+            level = generate_easy_multi_block(rng, blocks_count=2, geometry=geometry)
+        if level is None:
+            level = gen.generate_candidate(rng, target_label, geometry)
+    elif target_label in ("challenging", "hard"):
+        roll = rng.random()
+        if roll < 0.3:
+            blocks_count = rng.randint(2, 3 if target_label == "challenging" else 4)
+            level = gen.generate_corridor_candidate(rng, target_label, blocks_count, geometry)
+        elif roll < 0.8:
+            level = _generate_spicy_candidate(rng, target_label, geometry)
+        if level is None:
+            level = gen.generate_candidate(rng, target_label, geometry)
+    else:
+        level = gen.generate_candidate(rng, target_label, geometry)
+    return level
 
 
 def generate_unique_level(
     target_label: str,
     rng: random.Random,
-    seen: Set[str],
+    seen: Set[bytes],
     seed_entry: Optional[LevelEntry] = None,
+    pool: Optional[Executor] = None,
+    workers: int = 0,
+    near: Optional[NearDuplicateIndex[Any]] = None,
 ) -> gen.Level:
+    if pool is not None and workers > 0:
+        # One stream per replaced file keeps replacements independent of each other's attempts.
+        stream = seed_entry.path.name if seed_entry is not None else target_label
+        levels, _attempts = gen.generate_parallel(
+            _unique_attempt,
+            (target_label, seed_entry),
+            target_label,
+            1,
+            seen,
+            canonical_signature_level,
+            stream,
+            MAX_ATTEMPTS,
+            pool,
+            workers,
+            seed=RNG_SEED,
+            near=near,
+        )
+        if levels:
+            return levels[0]
+        raise RuntimeError(f"Failed to generate unique {target_label} level after {MAX_ATTEMPTS} attempts.")
+
+    if REPORT is not None:
+        REPORT.target = target_label
     for attempt in range(MAX_ATTEMPTS):
-        level: Optional[gen.Level] = None
-        if seed_entry is not None and target_label in ("challenging", "hard"):
-            extra_walls = 1 if target_label == "challenging" else 2
-            level = _mutate_with_walls(seed_entry, rng, extra_walls)
-        if target_label == "easy":
-            if rng.random() < 0.65:
-                level = generate_easy_multi_block(rng, blocks_count=2)
-            if level is None:
-                level = gen.generate_candidate(rng, target_label)
-        elif target_label in ("challenging", "hard"):
-            roll = rng.random()
-            if roll < 0.3:
-                blocks_count = rng.randint(2, 3 if target_label == "challenging" else 4)
-                level = gen.generate_corridor_candidate(rng, target_label, blocks_count)
-            elif roll < 0.8:
-                level = _generate_spicy_candidate(rng, target_label)
-            if level is None:
-                level = gen.generate_candidate(rng, target_label)
+        if REPORT is None:
+            level = _unique_attempt(rng, target_label, seed_entry)
         else:
-            level = gen.generate_candidate(rng, target_label)
-
+            start = time.perf_counter()
+            level = _unique_attempt(rng, target_label, seed_entry)
+            REPORT.count("attempt", gen.attempt_outcome(level, target_label), time.perf_counter() - start)
         if level is None or level.label != target_label:
             continue
         signature = canonical_signature_level(level)
         if signature in seen:
+            if REPORT is not None:
+                REPORT.count("dedupe", "duplicate")
             continue
+        if gen.is_near_duplicate(near, level):
+            if REPORT is not None:
+                REPORT.count("dedupe", "near_duplicate")
+            continue
+        if REPORT is not None:
+            REPORT.count("dedupe")
         seen.add(signature)
         return level
     raise RuntimeError(f"Failed to generate unique {target_label} level after {MAX_ATTEMPTS} attempts.")
@@ -241,28 +343,63 @@ def main() -> None:
     if not entries:
         raise RuntimeError("No levels found.")
 
-    seen: Set[str] = set()
+    # Keys of different board sizes never collide (see symmetry), so one seen set covers them all.
+    indexes: Dict[Geometry, SymmetryIndex[LevelEntry]] = {}
+    near = gen.near_duplicate_index([])
     duplicates: List[LevelEntry] = []
+    near_clones = 0
     for entry in entries:
-        signature = canonical_signature(entry.walls, entry.holes, entry.blocks)
-        if signature in seen:
+        geometry = entry.geometry
+        index = indexes.get(geometry)
+        if index is None:
+            index = indexes[geometry] = SymmetryIndex(geometry.width, geometry.colors)
+        if index.add(entry.walls, entry.holes, entry.blocks, entry) is not None:
             duplicates.append(entry)
             continue
-        seen.add(signature)
+        if near is None:
+            continue
+        sketch = near.sketch(
+            level_shingles(entry.walls, entry.holes, entry.blocks, entry.solution, geometry.width, geometry.height)
+        )
+        if near.find(sketch) is not None:
+            duplicates.append(entry)
+            near_clones += 1
+            continue
+        near.add(sketch, entry)
+    seen: Set[bytes] = set()
+    for index in indexes.values():
+        seen |= index.keys()
 
     if not duplicates:
         print("No symmetry duplicates found.")
         return
 
     replaced = 0
-    for entry in duplicates:
-        replacement = generate_unique_level(entry.label, rng, seen, seed_entry=entry)
-        with entry.path.open("w", encoding="utf-8") as f:
-            json.dump(replacement.to_json(), f, indent=2)
-        replaced += 1
-
-    print(f"Replaced {replaced} duplicate levels by symmetry.")
+    pool = ProcessPoolExecutor(max_workers=gen.WORKERS) if gen.WORKERS > 0 else None
+    try:
+        for entry in duplicates:
+            replacement = generate_unique_level(
+                entry.label, rng, seen, seed_entry=entry, pool=pool, workers=gen.WORKERS, near=near
+            )
+            gen.write_level_json(entry.path, replacement)
+            replaced += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"Replaced {replaced} duplicate levels ({near_clones} near-clones, the rest by symmetry).")
+    print(f"Line table: {line_table(STANDARD.width, STANDARD.height).stats()}")
+    print(
+        f"Search ({gen.SEARCH}): expanded {gen.SEARCH_TOTALS.forward_expanded} forward, "
+        f"{gen.SEARCH_TOTALS.backward_expanded} backward; "
+        f"rejected {gen.HOPELESS_REJECTS['candidates']} hopeless and "
+        f"{gen.NEAR_REJECTS['candidates']} near-duplicate candidates."
+    )
+    if gen.ANALYSIS_CACHE is not None:
+        gen.ANALYSIS_CACHE.save()
+        print(f"Analysis cache: {gen.ANALYSIS_CACHE.stats()}")
 
 
 if __name__ == "__main__":
-    main()
+    with session("dedupe_levels"):
+        main()
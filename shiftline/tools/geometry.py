@@ -0,0 +1,106 @@
+"""
+Board sizes the level tools can build and solve.
+
+A ``Geometry`` bundles a board size with its palette (one color per block
+color a level may use) and the state budget for solving candidates on it.
+Level files store width, height and palette; ``geometry_for`` maps them back.
+
+The state space grows roughly with cells ** blocks, so the budget grows
+with the board (bench_board_sizes measures solve times per size). Past 64
+cells masks and packed keys no longer fit one machine word; slide_engine
+works on Python ints of any width and state_store spreads wide keys over
+several 64-bit slots.
+
+Rotations and diagonal flips only map a board onto itself when it is square,
+so ``transform_pos`` refuses them on other boards.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from slide_engine import Move
+
+
+PALETTE = ("#3C78DC", "#E65050", "#50BE78", "#E6C846")
+EXPERT_PALETTE = PALETTE + ("#A064DC", "#F08C3C")
+
+Pos = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class Geometry:
+    name: str
+    width: int
+    height: int
+    palette: Tuple[str, ...]
+    # Default max_states for solving a candidate on this board.
+    max_states: int
+
+    @property
+    def cells(self) -> int:
+        return self.width * self.height
+
+    @property
+    def colors(self) -> int:
+        return len(self.palette)
+
+    @property
+    def square(self) -> bool:
+        return self.width == self.height
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def positions(self) -> List[Pos]:
+        """Every cell, row by row."""
+        return [(x, y) for y in range(self.height) for x in range(self.width)]
+
+    def transform_pos(self, pos: Pos, variant: int) -> Pos:
+        """``pos`` under one of the eight symmetries, numbered as in symmetry.variant_keys."""
+        x, y = pos
+        w = self.width - 1
+        h = self.height - 1
+        if variant in (1, 3, 6, 7) and not self.square:
+            raise RuntimeError(f"Variant {variant} does not map a {self.width}x{self.height} board onto itself")
+        if variant == 0:  # identity
+            return x, y
+        if variant == 1:  # rot90
+            return y, w - x
+        if variant == 2:  # rot180
+            return w - x, h - y
+        if variant == 3:  # rot270
+            return h - y, x
+        if variant == 4:  # flip horizontal
+            return w - x, y
+        if variant == 5:  # flip vertical
+            return x, h - y
+        if variant == 6:  # main diagonal
+            return y, x
+        # anti-diagonal
+        return w - y, h - x
+
+    def transform_move(self, move: Move, variant: int) -> Move:
+        """The move that does on a transformed level what ``move`` does on the original."""
+        is_row, index, direction = move
+        start = (0, index) if is_row else (index, 0)
+        step = (1, index) if is_row else (index, 1)
+        ax, ay = self.transform_pos(start, variant)
+        bx, by = self.transform_pos(step, variant)
+        if ay == by:
+            return True, ay, direction * (bx - ax)
+        return False, ax, direction * (by - ay)
+
+
+STANDARD = Geometry("standard", 8, 8, PALETTE, 15000)
+EXPERT_10 = Geometry("expert10", 10, 10, EXPERT_PALETTE, 60000)
+EXPERT_12 = Geometry("expert12", 12, 12, EXPERT_PALETTE, 150000)
+GEOMETRIES: Dict[str, Geometry] = {g.name: g for g in (STANDARD, EXPERT_10, EXPERT_12)}
+
+
+def geometry_for(width: int, height: int) -> Geometry:
+    """The known geometry of a width x height board."""
+    for geometry in GEOMETRIES.values():
+        if geometry.width == width and geometry.height == height:
+            return geometry
+    raise RuntimeError(f"No geometry for {width}x{height} boards")
@@ -0,0 +1,274 @@
+"""
+Single-pass level analysis.
+
+``collect_metrics`` runs one forward BFS and gathers everything the tools and
+the game derive from a level's search space:
+
+* par and the solution path (the same path ``solver.bfs`` returns);
+* per hole, the depth of the first state in BFS order with that hole locked
+  and how many other holes were locked in it, exactly as Game.gd's
+  ``_analyze_difficulty`` records them;
+* per color, the solution step that locks it and how often it moves before
+  that, read from the stored path states instead of replaying the moves.
+
+``level_metadata`` adds the size of the whole reachable state space and
+returns the block baked into the level files (``metrics``), so the game can
+skip its own searches. The solution is stored as one string (see
+format_solution) so it stays on one line of the indented level files.
+
+The BFS does not prune dead states: they can lock holes early, and the game
+counts them.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from bouncer_engine import BouncerBoard, bouncers_from_json
+from slide_engine import ENGINE_VERSION, Board, Move, State
+from solver import SearchStats
+from state_store import NO_PARENT, new_store
+
+# Game.gd's HINT_MAX_STATES: the most states a hint search may expand on device.
+HINT_MAX_STATES = 8000
+
+
+def format_solution(moves: List[Move]) -> str:
+    """Moves as one line for the level files: "r3+ c0-" slides row 3 right, then column 0 up."""
+    return " ".join(
+        f"{'r' if is_row else 'c'}{index}{'+' if direction > 0 else '-'}" for is_row, index, direction in moves
+    )
+
+
+def parse_solution(text: str) -> List[Move]:
+    return [(token[0] == "r", int(token[1:-1]), 1 if token[-1] == "+" else -1) for token in text.split()]
+
+
+def ordering_from_lock_steps(lock_steps: Dict[int, int]) -> str:
+    steps = list(lock_steps.values())
+    if len(set(steps)) == 1:
+        return "none"
+    if len(set(steps)) == len(steps):
+        return "strict"
+    return "specific"
+
+
+@dataclass(frozen=True)
+class HoleMetrics:
+    pos: Tuple[int, int]
+    color: int
+    min_moves: int
+    other_locked: int
+
+
+@dataclass(frozen=True)
+class LevelMetrics:
+    par_moves: int
+    solution: List[Move]
+    holes: List[HoleMetrics]
+    lock_steps: Dict[int, int]
+    move_counts: Dict[int, int]
+    reachable_states: Optional[int] = None
+
+    @property
+    def dependencies(self) -> int:
+        """Holes that were never locked first (Game.gd's ``deps``)."""
+        return sum(1 for hole in self.holes if hole.other_locked > 0)
+
+    @property
+    def max_min_moves(self) -> int:
+        return max((hole.min_moves for hole in self.holes), default=0)
+
+    @property
+    def ordering(self) -> str:
+        return ordering_from_lock_steps(self.lock_steps)
+
+    @property
+    def multi_swipe(self) -> bool:
+        return any(count > 1 for count in self.move_counts.values())
+
+    @property
+    def game_label(self) -> str:
+        """The label Game.gd's ``_analyze_difficulty`` gives the level."""
+        if self.dependencies == 0:
+            return "very easy" if self.max_min_moves <= 1 else "easy"
+        if self.dependencies == 1:
+            return "challenging" if self.max_min_moves <= 2 else "hard"
+        return "very hard"
+
+    @property
+    def hint_max_states(self) -> Optional[int]:
+        """Hint search budget: enough to expand every reachable state, but never above HINT_MAX_STATES."""
+        if self.reachable_states is None:
+            return None
+        return min(self.reachable_states + 1, HINT_MAX_STATES)
+
+    def to_json(self) -> dict:
+        data = {
+            "engine_version": ENGINE_VERSION,
+            "par_moves": self.par_moves,
+            "solution_length": len(self.solution),
+            "solution": format_solution(self.solution),
+            "holes": [
+                {
+                    "pos": [hole.pos[0], hole.pos[1]],
+                    "color": hole.color,
+                    "min_moves": hole.min_moves,
+                    "other_locked": hole.other_locked,
+                }
+                for hole in self.holes
+            ],
+            "dependencies": self.dependencies,
+            "ordering": self.ordering,
+            "multi_swipe": self.multi_swipe,
+            "label": self.game_label,
+        }
+        if self.reachable_states is not None:
+            data["reachable_states"] = self.reachable_states
+            data["hint_max_states"] = self.hint_max_states
+        return data
+
+
+def board_from_level_json(data: dict) -> Tuple[Board, State]:
+    walls = {tuple(w) for w in data.get("walls", [])}
+    holes = {tuple(h["pos"]): int(h["color"]) for h in data.get("holes", [])}
+    blocks = {tuple(b["pos"]): int(b["color"]) for b in data.get("blocks", [])}
+    width = int(data.get("width", 8))
+    height = int(data.get("height", 8))
+    if data.get("bouncers"):
+        board: Board = BouncerBoard(walls, holes, blocks.values(), width, height, bouncers_from_json(data))
+    else:
+        board = Board(walls, holes, blocks.values(), width, height)
+    return board, board.encode(blocks)
+
+
+def collect_metrics(
+    board: Board,
+    start: State,
+    max_states: int,
+    stats: Optional[SearchStats] = None,
+) -> Optional[LevelMetrics]:
+    """Metrics for ``start``, or None if unsolvable or ``max_states`` is reached."""
+    store = new_store(board.key_bits)
+    store.add(board.pack(start))
+    keys = store.keys
+    add = store.add
+    unpack = board.unpack
+    successor_keys = board.successor_keys
+    is_solved = board.is_solved
+    locked_of = board.locked
+
+    hole_bits = board.hole_mask
+    recorded = 0
+    first_lock: Dict[int, Tuple[int, int]] = {}
+    solution: Optional[int] = None
+    capped = False
+    expanded = 0
+    depth = 0
+    layer_end = 1
+    while expanded < len(keys):
+        index = expanded
+        if index == layer_end:
+            depth += 1
+            layer_end = len(keys)
+        key = keys[index]
+        state = unpack(key)
+        expanded += 1
+        if recorded != hole_bits:
+            locked = locked_of(state)
+            new = locked & ~recorded
+            if new:
+                others = bin(locked).count("1") - 1
+                recorded |= new
+                while new:
+                    low = new & -new
+                    first_lock[low] = (depth, others)
+                    new ^= low
+        if is_solved(state):
+            solution = index
+            break
+        for move_idx, nxt in successor_keys(state, key):
+            if add(nxt, index, move_idx) < 0:
+                continue
+            if len(keys) >= max_states:
+                capped = True
+                break
+        if capped:
+            break
+
+    if stats is not None:
+        stats.states = len(store)
+        stats.expanded = expanded
+        stats.forward_expanded = expanded
+        stats.peak_memory_bytes = store.note_peak()
+        stats.capped = capped
+    if solution is None:
+        return None
+
+    # Walk the stored path states instead of replaying the moves.
+    chain = [solution]
+    while store.parents[chain[-1]] != NO_PARENT:
+        chain.append(store.parents[chain[-1]])
+    chain.reverse()
+    colors = [i for i, count in enumerate(board.block_counts) if count]
+    lock_steps: Dict[int, int] = {}
+    move_counts = {board.colors[i]: 0 for i in colors}
+    before = unpack(keys[chain[0]])
+    for step, index in enumerate(chain[1:], start=1):
+        after = unpack(keys[index])
+        for i in colors:
+            color = board.colors[i]
+            if color in lock_steps:
+                continue
+            if before[i] != after[i]:
+                move_counts[color] += 1
+            holes = board.hole_masks[i]
+            if holes and after[i] & holes == holes:
+                lock_steps[color] = step
+        before = after
+
+    holes_out: List[HoleMetrics] = []
+    for (x, y), color in sorted(board.decode(board.hole_masks).items()):
+        hole_depth, others = first_lock[board.bit(x, y)]
+        holes_out.append(HoleMetrics(pos=(x, y), color=color, min_moves=hole_depth, other_locked=others))
+    return LevelMetrics(
+        par_moves=len(chain) - 1,
+        solution=[board.moves[move_idx] for move_idx in store.path(solution)],
+        holes=holes_out,
+        lock_steps=lock_steps,
+        move_counts=move_counts,
+    )
+
+
+def count_reachable(board: Board, start: State, max_states: int) -> Optional[int]:
+    """States reachable from ``start`` (solved ones are not expanded), or None past ``max_states``."""
+    store = new_store(board.key_bits)
+    store.add(board.pack(start))
+    keys = store.keys
+    add = store.add
+    unpack = board.unpack
+    successor_keys = board.successor_keys
+    is_solved = board.is_solved
+    index = 0
+    while index < len(keys):
+        key = keys[index]
+        state = unpack(key)
+        if not is_solved(state):
+            for move_idx, nxt in successor_keys(state, key):
+                add(nxt, index, move_idx)
+            if len(keys) > max_states:
+                return None
+        index += 1
+    return len(keys)
+
+
+def level_metadata(data: dict, max_states: int) -> Optional[dict]:
+    """The ``metrics`` block for a level JSON dictionary, or None if it cannot be baked."""
+    board, start = board_from_level_json(data)
+    metrics = collect_metrics(board, start, max_states)
+    if metrics is None:
+        return None
+    reachable = count_reachable(board, start, max_states)
+    if reachable is None:
+        return None
+    return replace(metrics, reachable_states=reachable).to_json()
@@ -0,0 +1,147 @@
+"""
+Streaming stages for the level generators.
+
+A pipeline pulls items from a source iterator through a list of ``Stage``s
+and yields whatever comes out of the last one, as soon as it does. Each
+stage maps one item to one item or drops it by returning None, so cheap
+filters can sit in front of expensive ones. Consumers stop the pipeline by
+stopping iteration.
+
+A parallel stage runs its function in an executor with at most ``queue_size``
+items in flight and hands results on in submission order, so output never
+depends on scheduling. Its optional ``collect`` step runs in this process on
+each result (e.g. to merge worker statistics).
+
+Every stage counts what it received and passed and the time spent in it.
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+
+QUEUE_SIZE = 64
+
+
+@dataclass
+class StageStats:
+    received: int = 0
+    passed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.received / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    parallel: bool = False
+    collect: Optional[Callable[[Any], Any]] = None
+
+
+class Pipeline:
+    def __init__(
+        self,
+        source: Iterable[Any],
+        stages: List[Stage],
+        pool: Optional[Executor] = None,
+        queue_size: int = QUEUE_SIZE,
+        source_name: str = "source",
+    ) -> None:
+        self.source = source
+        self.stages = stages
+        self.pool = pool
+        self.queue_size = queue_size
+        self.source_name = source_name
+        self.stats: Dict[str, StageStats] = {source_name: StageStats()}
+        for stage in stages:
+            if stage.name in self.stats:
+                raise RuntimeError(f"Duplicate stage name: {stage.name}")
+            self.stats[stage.name] = StageStats()
+
+    def __iter__(self) -> Iterator[Any]:
+        stream = self._count_source()
+        for stage in self.stages:
+            if stage.parallel and self.pool is not None:
+                stream = self._run_parallel(stage, stream)
+            else:
+                stream = self._run_serial(stage, stream)
+        return stream
+
+    def _count_source(self) -> Iterator[Any]:
+        stats = self.stats[self.source_name]
+        iterator = iter(self.source)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stats.seconds += time.perf_counter() - start
+            stats.received += 1
+            if item is None:
+                continue
+            stats.passed += 1
+            yield item
+
+    def _run_serial(self, stage: Stage, upstream: Iterator[Any]) -> Iterator[Any]:
+        stats = self.stats[stage.name]
+        for item in upstream:
+            stats.received += 1
+            start = time.perf_counter()
+            out = stage.fn(item)
+            if out is not None and stage.collect is not None:
+                out = stage.collect(out)
+            stats.seconds += time.perf_counter() - start
+            if out is None:
+                continue
+            stats.passed += 1
+            yield out
+
+    def _run_parallel(self, stage: Stage, upstream: Iterator[Any]) -> Iterator[Any]:
+        assert self.pool is not None
+        stats = self.stats[stage.name]
+        pending: Deque[Future] = deque()
+        exhausted = False
+        try:
+            while pending or not exhausted:
+                while not exhausted and len(pending) < self.queue_size:
+                    try:
+                        item = next(upstream)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    stats.received += 1
+                    pending.append(self.pool.submit(stage.fn, item))
+                if not pending:
+                    break
+                start = time.perf_counter()
+                out = pending.popleft().result()
+                if out is not None and stage.collect is not None:
+                    out = stage.collect(out)
+                stats.seconds += time.perf_counter() - start
+                if out is None:
+                    continue
+                stats.passed += 1
+                yield out
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def summary(self) -> str:
+        return summarize(self.stats)
+
+
+def summarize(stats: Dict[str, StageStats]) -> str:
+    """One line of passed/received counts and rates per stage, in stage order."""
+    parts = []
+    for name, stage_stats in stats.items():
+        parts.append(f"{name} {stage_stats.passed}/{stage_stats.received} ({stage_stats.per_second:.0f}/s)")
+    return " -> ".join(parts)
@@ -0,0 +1,152 @@
+"""
+Static reachability of holes, for pruning states that can never be solved.
+
+A block locks only when a slide stops it on a hole of its color, and locked
+blocks never move again, so walls plus locked blocks are permanent obstacles.
+``StopMap`` works out, per open hole and obstacle layout, which cells a block
+could start from and still end up stopped on that hole:
+
+* While another unlocked block is on the board it may end up anywhere and
+  stop a slide at any cell, so a block can reach every cell in a straight
+  line of free cells; the map is the hole's rook-connected area.
+* A lone unlocked block only stops against obstacles and the board edge, so
+  its moves are exactly the four stops from each cell, and the map is every
+  cell with a chain of such stops ending on the hole.
+
+A state is dead when some open hole has no unlocked block of its color in
+its map, or when a color has fewer blocks than holes. Maps are cached per
+locked-block layout, so a search only pays for each layout once.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+from slide_engine import Board, State
+
+
+class StopMap:
+    def __init__(self, board: Board) -> None:
+        self.board = board
+        # Per color, the bit of every hole of that color.
+        self._holes: List[Tuple[int, ...]] = []
+        for holes in board.hole_masks:
+            bits = []
+            while holes:
+                low = holes & -holes
+                bits.append(low)
+                holes ^= low
+            self._holes.append(tuple(bits))
+        # Fewer blocks than holes of some color: nothing is solvable.
+        self.hopeless = any(
+            count < len(holes) for count, holes in zip(board.block_counts, self._holes)
+        )
+        self._maps: Dict[Tuple[int, int, bool], int] = {}
+        self._stops: Dict[int, List[Tuple[int, ...]]] = {}
+        # (locked cells, lone) -> (color index, cells one of its blocks must be in)
+        self._checks: Dict[Tuple[int, bool], Tuple[Tuple[int, int], ...]] = {}
+        self.checked = 0
+        self.pruned = 0
+
+    def is_dead(self, state: State) -> bool:
+        """True when no sequence of moves can lock every hole from ``state``."""
+        self.checked += 1
+        if self.hopeless:
+            self.pruned += 1
+            return True
+        locked = 0
+        occupied = 0
+        for mask, holes in zip(state, self.board.hole_masks):
+            locked |= mask & holes
+            occupied |= mask
+        unlocked = occupied ^ locked
+        lone = not unlocked & (unlocked - 1)
+        checks = self._checks.get((locked, lone))
+        if checks is None:
+            checks = self._build_checks(locked, lone)
+        for i, cells in checks:
+            if not state[i] & cells:
+                self.pruned += 1
+                return True
+        return False
+
+    def _build_checks(self, locked: int, lone: bool) -> Tuple[Tuple[int, int], ...]:
+        # Open holes follow from the locked cells: a hole is open unless a
+        # block of its color sits on it. Locked blocks are obstacles, so the
+        # maps never contain them and only unlocked blocks can match.
+        obstacles = self.board.wall_mask | locked
+        checks = []
+        for i, holes in enumerate(self._holes):
+            for hole in holes:
+                if not hole & locked:
+                    checks.append((i, self.reach(hole, obstacles, lone)))
+        out = tuple(checks)
+        self._checks[(locked, lone)] = out
+        return out
+
+    def reach(self, hole: int, obstacles: int, lone: bool) -> int:
+        """Mask of cells from which a block can get stopped on ``hole``."""
+        key = (hole, obstacles, lone)
+        cells = self._maps.get(key)
+        if cells is None:
+            cells = self._lone_reach(hole, obstacles) if lone else self._rook_reach(hole, obstacles)
+            self._maps[key] = cells
+        return cells
+
+    def _rays(self, idx: int, obstacles: int) -> List[List[int]]:
+        """Free cell indexes in each direction from ``idx``, nearest first."""
+        board = self.board
+        width = board.width
+        x, y = idx % width, idx // width
+        rays = []
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            ray = []
+            cx, cy = x + dx, y + dy
+            while 0 <= cx < width and 0 <= cy < board.height and not obstacles >> (cy * width + cx) & 1:
+                ray.append(cy * width + cx)
+                cx += dx
+                cy += dy
+            rays.append(ray)
+        return rays
+
+    def _rook_reach(self, hole: int, obstacles: int) -> int:
+        start = hole.bit_length() - 1
+        cells = hole
+        frontier = [start]
+        while frontier:
+            nxt = []
+            for idx in frontier:
+                for ray in self._rays(idx, obstacles):
+                    for cell in ray:
+                        if not cells >> cell & 1:
+                            cells |= 1 << cell
+                            nxt.append(cell)
+            frontier = nxt
+        return cells
+
+    def _lone_reach(self, hole: int, obstacles: int) -> int:
+        # Reverse the stop graph: ``sources[t]`` lists the cells whose slide
+        # in some direction ends on t.
+        sources = self._stops.get(obstacles)
+        if sources is None:
+            board = self.board
+            count = board.width * board.height
+            found: List[List[int]] = [[] for _ in range(count)]
+            for idx in range(count):
+                if obstacles >> idx & 1:
+                    continue
+                for ray in self._rays(idx, obstacles):
+                    if ray:
+                        found[ray[-1]].append(idx)
+            sources = [tuple(cells) for cells in found]
+            self._stops[obstacles] = sources
+        cells = hole
+        frontier = [hole.bit_length() - 1]
+        while frontier:
+            nxt = []
+            for idx in frontier:
+                for cell in sources[idx]:
+                    if not cells >> cell & 1:
+                        cells |= 1 << cell
+                        nxt.append(cell)
+            frontier = nxt
+        return cells
@@ -4,29 +4,107 @@ Rebuild Shiftline levels without bouncers, using difficulty rubric and stage rul
 
 Usage:
   python tools/rebuild_levels_no_bouncers.py
+  SHIFTLINE_WORKERS=32 python tools/rebuild_levels_no_bouncers.py
+  SHIFTLINE_FORCE=1 python tools/rebuild_levels_no_bouncers.py
+  SHIFTLINE_REPORT=1 python tools/rebuild_levels_no_bouncers.py
+
+Runs are recorded in the build manifest (see build_manifest): nothing is
+regenerated while the seed, rules sources and level files are unchanged, and
+only level files whose content changes are rewritten. SHIFTLINE_REPORT=1 and
+SHIFTLINE_PROFILE=1 write a report of where the attempts went and a profile
+(see run_report).
 """
 from __future__ import annotations
 
 import json
+import os
 import random
-from collections import deque
-from dataclasses import dataclass
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from analysis_cache import AnalysisCache, CachedAnalysis
+from bake_level_metadata import metadata_inputs
+from build_manifest import BuildManifest, inputs_digest, source_digest
+from geometry import STANDARD, Geometry, geometry_for
+from level_metrics import LevelMetrics, collect_metrics, level_metadata, ordering_from_lock_steps, parse_solution
+from pipeline import Pipeline, Stage, StageStats, summarize
+from reachability import StopMap
+from reverse_search import backward_layers
+from run_report import OK, REPORT, Counters, session
+from slide_engine import ENGINE_VERSION, Board, Move, line_table
+from solver import SEARCHES, SearchStats
+from similarity import NearDuplicateIndex, level_shingles
+from symmetry import canonical_key, level_key, transformed_keys
 
 
 ROOT = Path(__file__).resolve().parents[1]
 LEVELS_DIR = ROOT / "levels"
 
-WIDTH = 8
-HEIGHT = 8
-PALETTE = ["#3C78DC", "#E65050", "#50BE78", "#E6C846"]
 RNG_SEED = 240125
 STAGE_COUNT = 10
 LEVELS_PER_STAGE = 20
 FAST_EXPAND = True
 
-MAX_STATES = 15000
+# Written levels get a full metrics block; this bounds its reachable-state count.
+METADATA_MAX_STATES = 1_000_000
+# Sources holding the generation rules; main() is skipped while these, the
+# seed and the level files match the build manifest (see build_manifest).
+GENERATOR_SOURCES = (
+    "rebuild_levels_no_bouncers.py",
+    "geometry.py",
+    "slide_engine.py",
+    "solver.py",
+    "reachability.py",
+    "state_store.py",
+    "level_metrics.py",
+    "symmetry.py",
+    "similarity.py",
+    "pipeline.py",
+)
+# One of solver.SEARCHES: "bfs", "bidirectional", "astar" or "ida". All give
+# the same par and path; bidirectional is the fastest on our levels and
+# stores far fewer states, so hard candidates stay under their board's
+# Geometry.max_states. "ida" keeps the least in memory. "single_pass" runs
+# one unpruned forward BFS that also fills Level.metrics (see level_metrics)
+# with what the game needs.
+SEARCH = "bidirectional"
+SINGLE_PASS = "single_pass"
+# Running totals of every analyze_level search, reported by main().
+SEARCH_TOTALS = SearchStats()
+# Longest par per block each label allows; "hard" needs more than challenging's.
+MAX_PAR_PER_BLOCK = {"easy": 2.0, "fun": 2.5, "challenging": 2.5}
+# Labels whose candidates are built backward from the solved board at a
+# chosen par (build_reverse_candidate) instead of scrambled and re-solved.
+REVERSE_TARGETS = ("challenging", "hard")
+# Bounds of that backward search: deepest par tried, states explored and
+# states kept per layer (see reverse_search.backward_layers).
+REVERSE_MAX_PAR = 14
+REVERSE_MAX_STATES = 20000
+REVERSE_BEAM = 1000
+# Candidates dropped by is_hopeless before any search, reported by main().
+HOPELESS_REJECTS = {"candidates": 0}
+# collect_levels also rejects near-clones of kept levels (see similarity).
+NEAR_DUPLICATES = True
+NEAR_REJECTS = {"candidates": 0}
+# Analyses of every symmetry class seen so far; set to None to always solve.
+ANALYSIS_CACHE: Optional[AnalysisCache] = AnalysisCache()
+# Maps a transform_pos variant to the one that undoes it.
+INVERSE_VARIANT = (0, 3, 2, 1, 4, 5, 6, 7)
+
+# Processes for candidate generation; 0 keeps the single-RNG serial run.
+# Output is identical for a given RNG_SEED and worker count, but differs
+# from the serial run: a pooled collect_levels call returns the same levels,
+# yet leaves its rng further along (see level_pipeline), so later calls
+# sharing it draw different candidates, and generate_parallel draws from
+# per-worker RNGs.
+WORKERS = int(os.environ.get("SHIFTLINE_WORKERS", "0"))
+# Attempts each worker runs per round of generate_parallel before results are merged.
+WORKER_BATCH = 25
+# Per-stage throughput of every collect_levels pipeline, reported by main().
+PIPELINE_STATS: List[Tuple[str, Dict[str, StageStats]]] = []
 
 DIFFICULTY_VALUES = {
     "easy": 1,
@@ -55,12 +133,16 @@ class Level:
     label: str
     ordering: str
     multi_swipe: bool
+    metrics: Optional[LevelMetrics] = field(default=None, compare=False)
+    geometry: Geometry = field(default=STANDARD, compare=False)
+    # The solution analyze_level found, in this level's orientation; None if not known.
+    solution: Optional[List[Move]] = field(default=None, compare=False)
 
     def to_json(self) -> dict:
-        return {
-            "width": WIDTH,
-            "height": HEIGHT,
-            "palette": PALETTE,
+        data = {
+            "width": self.geometry.width,
+            "height": self.geometry.height,
+            "palette": list(self.geometry.palette),
             "walls": [[x, y] for (x, y) in sorted(self.walls)],
             "blocks": [{"pos": [x, y], "color": c} for (x, y), c in sorted(self.blocks.items())],
             "holes": [{"pos": [x, y], "color": c} for (x, y), c in sorted(self.holes.items())],
@@ -68,27 +150,86 @@ class Level:
             "difficulty": DIFFICULTY_VALUES[self.label],
             "difficulty_label": self.label,
         }
+        if self.metrics is not None:
+            data["metrics"] = self.metrics.to_json()
+        return data
+
+
+def write_level_json(path: Path, level: Level, manifest: Optional[BuildManifest] = None) -> bool:
+    """Write ``level`` with its baked solver metadata (see level_metrics.level_metadata).
+
+    With bake_level_metadata's ``manifest``, a file that already holds this
+    level and up-to-date metadata is left alone. A file is only rewritten
+    when its text changes. Returns whether it was.
+    """
+    data = level.to_json()
+    inputs = metadata_inputs(data, METADATA_MAX_STATES)
+    if manifest is not None and manifest.is_fresh(path.name, inputs):
+        return False
+    metadata = level_metadata(data, METADATA_MAX_STATES)
+    if metadata is not None:
+        data["metrics"] = metadata
+    text = json.dumps(data, indent=2)
+    changed = not path.exists() or path.read_text(encoding="utf-8") != text
+    if changed:
+        path.write_text(text, encoding="utf-8")
+    if manifest is not None:
+        manifest.record(path.name, inputs, [path])
+    return changed
+
+
+def write_stages(stages: List[List[Level]]) -> int:
+    """Write the stages as level_001.json onwards and delete any other level files.
+
+    Returns how many files were written or deleted.
+    """
+    manifest = BuildManifest("bake")
+    LEVELS_DIR.mkdir(parents=True, exist_ok=True)
+    kept: Set[Path] = set()
+    changed = 0
+    for level in (level for stage_levels in stages for level in stage_levels):
+        out_path = LEVELS_DIR / f"level_{len(kept) + 1:03d}.json"
+        changed += write_level_json(out_path, level, manifest)
+        kept.add(out_path)
+    for path in LEVELS_DIR.glob("level_*.json"):
+        if path not in kept:
+            path.unlink()
+            manifest.forget(path.name)
+            changed += 1
+    manifest.save()
+    return changed
 
 
-def in_bounds(x: int, y: int) -> bool:
-    return 0 <= x < WIDTH and 0 <= y < HEIGHT
+def run_inputs() -> str:
+    """Manifest digest of a generator run: seed, engine, rules sources and the current level files."""
+    settings = {
+        "seed": RNG_SEED,
+        "engine_version": ENGINE_VERSION,
+        "fast_expand": FAST_EXPAND,
+        "sources": source_digest(*GENERATOR_SOURCES),
+    }
+    return inputs_digest(settings, sorted(LEVELS_DIR.glob("level_*.json")))
 
 
 def grid_key(grid: Tuple[int, ...]) -> str:
     return ",".join(str(v) for v in grid)
 
 
-def grid_from_blocks(blocks: Dict[Tuple[int, int], int]) -> Tuple[int, ...]:
-    grid = [-1] * (WIDTH * HEIGHT)
+def grid_from_blocks(blocks: Dict[Tuple[int, int], int], geometry: Geometry = STANDARD) -> Tuple[int, ...]:
+    grid = [-1] * geometry.cells
     for (x, y), color in blocks.items():
-        grid[y * WIDTH + x] = color
+        grid[y * geometry.width + x] = color
     return tuple(grid)
 
 
-def locked_from_grid(grid: Tuple[int, ...], holes: Dict[Tuple[int, int], int]) -> Set[Tuple[int, int]]:
+def locked_from_grid(
+    grid: Tuple[int, ...],
+    holes: Dict[Tuple[int, int], int],
+    geometry: Geometry = STANDARD,
+) -> Set[Tuple[int, int]]:
     locked = set()
     for (x, y), color in holes.items():
-        if grid[y * WIDTH + x] == color:
+        if grid[y * geometry.width + x] == color:
             locked.add((x, y))
     return locked
 
@@ -100,56 +241,58 @@ def slide_grid(
     is_row: bool,
     index: int,
     direction: int,
+    geometry: Geometry = STANDARD,
 ) -> Tuple[Tuple[int, ...], bool]:
+    width, height = geometry.width, geometry.height
     grid_list = list(grid)
-    locked = locked_from_grid(grid, holes)
+    locked = locked_from_grid(grid, holes, geometry)
     moved = False
 
     if is_row:
-        if index < 0 or index >= HEIGHT:
+        if index < 0 or index >= height:
             return grid, False
-        occupied = set(walls) | locked | {(x, index) for x in range(WIDTH) if grid_list[index * WIDTH + x] != -1}
-        xs = range(WIDTH - 1, -1, -1) if direction > 0 else range(WIDTH)
+        occupied = set(walls) | locked | {(x, index) for x in range(width) if grid_list[index * width + x] != -1}
+        xs = range(width - 1, -1, -1) if direction > 0 else range(width)
         for x in xs:
             pos = (x, index)
-            color = grid_list[index * WIDTH + x]
+            color = grid_list[index * width + x]
             if color == -1 or pos in locked:
                 continue
             occupied.discard(pos)
             nx, ny = x, index
             while True:
                 tx = nx + direction
-                if not in_bounds(tx, ny) or (tx, ny) in occupied:
+                if not geometry.in_bounds(tx, ny) or (tx, ny) in occupied:
                     break
                 nx = tx
             if (nx, ny) != pos:
-                grid_list[index * WIDTH + x] = -1
-                grid_list[ny * WIDTH + nx] = color
+                grid_list[index * width + x] = -1
+                grid_list[ny * width + nx] = color
                 moved = True
             occupied.add((nx, ny))
             if (nx, ny) in holes and holes[(nx, ny)] == color and (nx, ny) not in locked:
                 locked.add((nx, ny))
                 moved = True
     else:
-        if index < 0 or index >= WIDTH:
+        if index < 0 or index >= width:
             return grid, False
-        occupied = set(walls) | locked | {(index, y) for y in range(HEIGHT) if grid_list[y * WIDTH + index] != -1}
-        ys = range(HEIGHT - 1, -1, -1) if direction > 0 else range(HEIGHT)
+        occupied = set(walls) | locked | {(index, y) for y in range(height) if grid_list[y * width + index] != -1}
+        ys = range(height - 1, -1, -1) if direction > 0 else range(height)
         for y in ys:
             pos = (index, y)
-            color = grid_list[y * WIDTH + index]
+            color = grid_list[y * width + index]
             if color == -1 or pos in locked:
                 continue
             occupied.discard(pos)
             nx, ny = index, y
             while True:
                 ty = ny + direction
-                if not in_bounds(nx, ty) or (nx, ty) in occupied:
+                if not geometry.in_bounds(nx, ty) or (nx, ty) in occupied:
                     break
                 ny = ty
             if (nx, ny) != pos:
-                grid_list[y * WIDTH + index] = -1
-                grid_list[ny * WIDTH + nx] = color
+                grid_list[y * width + index] = -1
+                grid_list[ny * width + nx] = color
                 moved = True
             occupied.add((nx, ny))
             if (nx, ny) in holes and holes[(nx, ny)] == color and (nx, ny) not in locked:
@@ -158,71 +301,236 @@ def slide_grid(
     return tuple(grid_list), moved
 
 
+def is_hopeless(
+    blocks: Dict[Tuple[int, int], int],
+    holes: Dict[Tuple[int, int], int],
+    walls: Set[Tuple[int, int]],
+    geometry: Geometry = STANDARD,
+) -> bool:
+    """True if the start position is already dead (see reachability.StopMap), so no search is needed."""
+    board = Board(walls, holes, blocks.values(), geometry.width, geometry.height)
+    if StopMap(board).is_dead(board.encode(blocks)):
+        HOPELESS_REJECTS["candidates"] += 1
+        return True
+    return False
+
+
 def analyze_level(
     blocks: Dict[Tuple[int, int], int],
     holes: Dict[Tuple[int, int], int],
     walls: Set[Tuple[int, int]],
+    max_states: Optional[int] = None,
+    stats: Optional[SearchStats] = None,
+    search: str = SEARCH,
+    max_par: Optional[int] = None,
+    geometry: Geometry = STANDARD,
 ) -> Optional[Level]:
-    start = grid_from_blocks(blocks)
-    queue = deque([start])
-    visited = {grid_key(start)}
-    parent: Dict[str, Tuple[str, Tuple[bool, int, int]]] = {}
-    grids: Dict[str, Tuple[int, ...]] = {grid_key(start): start}
-
-    solution_key: Optional[str] = None
-
-    while queue:
-        grid = queue.popleft()
-        key = grid_key(grid)
-        if all(pos in locked_from_grid(grid, holes) for pos in holes.keys()):
-            solution_key = key
-            break
-        for is_row in (True, False):
-            limit = HEIGHT if is_row else WIDTH
-            for index in range(limit):
-                for direction in (-1, 1):
-                    nxt, moved = slide_grid(grid, walls, holes, is_row, index, direction)
-                    if not moved:
-                        continue
-                    nxt_key = grid_key(nxt)
-                    if nxt_key in visited:
-                        continue
-                    visited.add(nxt_key)
-                    if len(visited) >= MAX_STATES:
-                        return None
-                    parent[nxt_key] = (key, (is_row, index, direction))
-                    grids[nxt_key] = nxt
-                    queue.append(nxt)
-
-    if solution_key is None:
-        return None
+    """Solve and classify a level; None if it is unsolvable or fits no label.
+
+    ``max_states`` defaults to the board's Geometry.max_states. With
+    ``max_par`` the search stops once par is proved longer (see solver);
+    such levels are rejected without being cached, and the stop is counted
+    in SEARCH_TOTALS.aborted. SINGLE_PASS ignores it.
+
+    Except with SINGLE_PASS the level is solved in its canonical orientation
+    (see canonical_variant): which shortest path a search finds first, and
+    so ordering and multi_swipe, depends on the orientation, and this keeps
+    all eight symmetries of a level, cached or not, classified alike.
+    """
+    if REPORT is None:
+        return _analyze_level(blocks, holes, walls, max_states, stats, search, max_par, geometry)[0]
+    if stats is None:
+        stats = SearchStats()
+    states = stats.states
+    start = time.perf_counter()
+    level, outcome = _analyze_level(blocks, holes, walls, max_states, stats, search, max_par, geometry)
+    REPORT.count("analyze", outcome, time.perf_counter() - start, stats.states - states)
+    return level
+
+
+def _analyze_level(
+    blocks: Dict[Tuple[int, int], int],
+    holes: Dict[Tuple[int, int], int],
+    walls: Set[Tuple[int, int]],
+    max_states: Optional[int],
+    stats: Optional[SearchStats],
+    search: str,
+    max_par: Optional[int],
+    geometry: Geometry,
+) -> Tuple[Optional[Level], str]:
+    """analyze_level's result and its outcome for the run report (OK, "cached" or why it was rejected)."""
+    if max_states is None:
+        max_states = geometry.max_states
+    use_cache = ANALYSIS_CACHE is not None and search != SINGLE_PASS
+    if search != SINGLE_PASS:
+        signature, variant = canonical_variant(walls, holes, blocks, geometry)
+    if use_cache:
+        cached = ANALYSIS_CACHE.get(signature, search, max_states)
+        if cached is not None:
+            solution = [geometry.transform_move(move, INVERSE_VARIANT[variant]) for move in cached.path]
+            level = level_from_analysis(
+                blocks,
+                holes,
+                walls,
+                cached.par_moves,
+                cached.ordering,
+                cached.multi_swipe,
+                geometry=geometry,
+                solution=solution,
+            )
+            return level, "cached" if level is not None else "cached_reject"
+
+    if stats is None:
+        stats = SearchStats()
+    metrics: Optional[LevelMetrics] = None
+    path: List[Move] = []
+    if search == SINGLE_PASS:
+        board = Board(walls, holes, blocks.values(), geometry.width, geometry.height)
+        start = board.encode(blocks)
+        metrics = collect_metrics(board, start, max_states, stats)
+        SEARCH_TOTALS.add(stats)
+        if metrics is None or metrics.par_moves <= 0:
+            return None, "max_states" if stats.capped else "unsolvable"
+        par_moves: Optional[int] = metrics.par_moves
+        colors = list(set(blocks.values()))
+        lock_steps = metrics.lock_steps
+        move_counts = metrics.move_counts
+    else:
+        transform = geometry.transform_pos
+        c_walls = {transform(pos, variant) for pos in walls}
+        c_holes = {transform(pos, variant): color for pos, color in holes.items()}
+        c_blocks = {transform(pos, variant): color for pos, color in blocks.items()}
+        board = Board(c_walls, c_holes, c_blocks.values(), geometry.width, geometry.height)
+        start = board.encode(c_blocks)
+        solution = SEARCHES[search](board, start, max_states, stats, max_depth=max_par)
+        SEARCH_TOTALS.add(stats)
+        if solution is None:
+            if use_cache and not stats.capped and not stats.aborted:
+                ANALYSIS_CACHE.put(signature, CachedAnalysis(None, None, False, None, [], search, stats.states))
+            if stats.capped:
+                return None, "max_states"
+            return None, "past_max_par" if stats.aborted else "unsolvable"
+        path = [board.moves[move_idx] for move_idx in solution]
+        par_moves = len(path)
+        colors, lock_steps, move_counts = replay_locks(board, start, path, c_blocks, c_holes, geometry)
+
+    ordering = ordering_from_lock_steps(lock_steps) if len(lock_steps) == len(colors) else None
+    multi_swipe = any(count > 1 for count in move_counts.values())
+    if metrics is None:
+        solution = [geometry.transform_move(move, INVERSE_VARIANT[variant]) for move in path]
+    else:
+        solution = metrics.solution
+    level = level_from_analysis(blocks, holes, walls, par_moves, ordering, multi_swipe, metrics, geometry, solution)
+    if use_cache:
+        ANALYSIS_CACHE.put(
+            signature,
+            CachedAnalysis(
+                par_moves=par_moves,
+                ordering=ordering,
+                multi_swipe=multi_swipe,
+                label=level.label if level is not None else None,
+                path=path,
+                search=search,
+                states=stats.states,
+            ),
+        )
+    if level is None:
+        return None, "unlockable" if ordering is None else "no_label"
+    return level, OK
 
-    # Reconstruct solution path (list of moves)
-    path: List[Tuple[bool, int, int]] = []
-    cur = solution_key
-    while cur in parent:
-        prev_key, move = parent[cur]
-        path.append(move)
-        cur = prev_key
-    path.reverse()
-    par_moves = len(path)
-    if par_moves <= 0:
-        return None
 
+def level_from_analysis(
+    blocks: Dict[Tuple[int, int], int],
+    holes: Dict[Tuple[int, int], int],
+    walls: Set[Tuple[int, int]],
+    par_moves: Optional[int],
+    ordering: Optional[str],
+    multi_swipe: bool,
+    metrics: Optional[LevelMetrics] = None,
+    geometry: Geometry = STANDARD,
+    solution: Optional[List[Move]] = None,
+) -> Optional[Level]:
+    """Classify a solved level; None if unsolved, unlockable or outside every label."""
+    if par_moves is None or par_moves <= 0 or ordering is None:
+        return None
     blocks_count = len(blocks)
     par_per_block = par_moves / float(blocks_count)
+    label = classify(blocks_count, par_per_block, ordering, multi_swipe)
+    if label is None:
+        return None
+
+    return Level(
+        walls=walls,
+        holes=holes,
+        blocks=blocks,
+        par_moves=par_moves,
+        par_per_block=par_per_block,
+        label=label,
+        ordering=ordering,
+        multi_swipe=multi_swipe,
+        metrics=metrics,
+        geometry=geometry,
+        solution=solution,
+    )
+
+
+def level_solution(level: Level) -> Optional[List[Move]]:
+    if level.solution is not None:
+        return level.solution
+    return level.metrics.solution if level.metrics is not None else None
 
+
+def level_sketch_shingles(level: Level) -> Set[Tuple[int, ...]]:
+    geometry = level.geometry
+    return level_shingles(
+        level.walls, level.holes, level.blocks, level_solution(level), geometry.width, geometry.height
+    )
+
+
+def near_duplicate_index(levels: List[Level]) -> Optional[NearDuplicateIndex[Any]]:
+    """Index of ``levels`` for is_near_duplicate, or None when NEAR_DUPLICATES is off."""
+    if not NEAR_DUPLICATES:
+        return None
+    near: NearDuplicateIndex[Any] = NearDuplicateIndex()
+    for level in levels:
+        near.add(near.sketch(level_sketch_shingles(level)), level)
+    return near
+
+
+def is_near_duplicate(near: Optional[NearDuplicateIndex[Any]], level: Level) -> bool:
+    """True if ``level`` is a near-clone of an indexed level; otherwise index it."""
+    if near is None:
+        return False
+    sketch = near.sketch(level_sketch_shingles(level))
+    if near.find(sketch) is not None:
+        NEAR_REJECTS["candidates"] += 1
+        return True
+    near.add(sketch, level)
+    return False
+
+
+def replay_locks(
+    board: Board,
+    start: Tuple[int, ...],
+    path: List[Move],
+    blocks: Dict[Tuple[int, int], int],
+    holes: Dict[Tuple[int, int], int],
+    geometry: Geometry = STANDARD,
+) -> Tuple[List[int], Dict[int, int], Dict[int, int]]:
+    """Replay a solution and return (colors, lock step per color, moves per color until locked)."""
     # Track moves per block color until locked
     colors = list(set(blocks.values()))
     move_counts = {c: 0 for c in colors}
     lock_steps: Dict[int, int] = {}
 
-    grid = start
+    state = start
+    grid = board.decode_grid(state)
     for step, move in enumerate(path, start=1):
-        before_positions = positions_by_color(grid)
-        grid, _ = slide_grid(grid, walls, holes, move[0], move[1], move[2])
-        after_positions = positions_by_color(grid)
-        locked = locked_from_grid(grid, holes)
+        before_positions = positions_by_color(grid, geometry)
+        state, _ = board.slide(state, move[0], move[1], move[2])
+        grid = board.decode_grid(state)
+        after_positions = positions_by_color(grid, geometry)
+        locked = locked_from_grid(grid, holes, geometry)
         for color in colors:
             if color in lock_steps:
                 continue
@@ -231,60 +539,37 @@ def analyze_level(
             pos = after_positions.get(color)
             if pos in locked and holes.get(pos) == color:
                 lock_steps[color] = step
+    return colors, lock_steps, move_counts
 
-    if len(lock_steps) != len(colors):
-        return None
 
-    multi_swipe = any(count > 1 for count in move_counts.values())
-    ordering = ordering_from_lock_steps(lock_steps)
+def level_signature(level: Level) -> bytes:
+    return level_key(level.walls, level.holes, level.blocks, level.geometry.width, level.geometry.colors)
 
-    label = classify(blocks_count, par_per_block, ordering, multi_swipe)
-    if label is None:
-        return None
 
-    return Level(
-        walls=walls,
-        holes=holes,
-        blocks=blocks,
-        par_moves=par_moves,
-        par_per_block=par_per_block,
-        label=label,
-        ordering=ordering,
-        multi_swipe=multi_swipe,
-    )
+def transform_pos(pos: Tuple[int, int], variant: int, geometry: Geometry = STANDARD) -> Tuple[int, int]:
+    return geometry.transform_pos(pos, variant)
+
+
+def transform_move(move: Move, variant: int, geometry: Geometry = STANDARD) -> Move:
+    """The move that does on a transformed level what ``move`` does on the original."""
+    return geometry.transform_move(move, variant)
 
 
-def level_signature(level: Level) -> str:
-    walls = tuple(sorted(level.walls))
-    holes = tuple(sorted(level.holes.items()))
-    blocks = tuple(sorted(level.blocks.items()))
-    return f"W{walls}|H{holes}|B{blocks}"
-
-
-def transform_pos(pos: Tuple[int, int], variant: int) -> Tuple[int, int]:
-    x, y = pos
-    if variant == 0:  # identity
-        return x, y
-    if variant == 1:  # rot90
-        return y, WIDTH - 1 - x
-    if variant == 2:  # rot180
-        return WIDTH - 1 - x, HEIGHT - 1 - y
-    if variant == 3:  # rot270
-        return HEIGHT - 1 - y, x
-    if variant == 4:  # flip horizontal
-        return WIDTH - 1 - x, y
-    if variant == 5:  # flip vertical
-        return x, HEIGHT - 1 - y
-    if variant == 6:  # main diagonal
-        return y, x
-    # anti-diagonal
-    return WIDTH - 1 - y, HEIGHT - 1 - x
+def canonical_variant(
+    walls: Set[Tuple[int, int]],
+    holes: Dict[Tuple[int, int], int],
+    blocks: Dict[Tuple[int, int], int],
+    geometry: Geometry = STANDARD,
+) -> Tuple[bytes, int]:
+    """Smallest signature over the eight symmetries, and the transform_pos variant giving it."""
+    return canonical_key(walls, holes, blocks, geometry.width, geometry.colors)
 
 
 def transform_level(level: Level, variant: int) -> Optional[Level]:
-    walls = {transform_pos(p, variant) for p in level.walls}
-    holes = {transform_pos(p, variant): c for p, c in level.holes.items()}
-    blocks = {transform_pos(p, variant): c for p, c in level.blocks.items()}
+    transform = level.geometry.transform_pos
+    walls = {transform(p, variant) for p in level.walls}
+    holes = {transform(p, variant): c for p, c in level.holes.items()}
+    blocks = {transform(p, variant): c for p, c in level.blocks.items()}
     if any(holes.get(pos) == color for pos, color in blocks.items()):
         return None
     return Level(
@@ -296,13 +581,19 @@ def transform_level(level: Level, variant: int) -> Optional[Level]:
         label=level.label,
         ordering=level.ordering,
         multi_swipe=level.multi_swipe,
+        geometry=level.geometry,
+        solution=(
+            [level.geometry.transform_move(move, variant) for move in level.solution]
+            if level.solution is not None
+            else None
+        ),
     )
 
 
 def expand_with_transforms(
     levels: List[Level],
     target_count: int,
-    seen: Set[str],
+    seen: Set[bytes],
     rng: random.Random,
 ) -> List[Level]:
     if len(levels) >= target_count:
@@ -312,13 +603,14 @@ def expand_with_transforms(
     idx = 0
     while len(levels) < target_count and idx < len(levels):
         base = levels[idx]
+        keys = transformed_keys(base.walls, base.holes, base.blocks, base.geometry.width, base.geometry.colors)
         for variant in variants:
+            signature = keys[variant]
+            if signature in seen:
+                continue
             transformed = transform_level(base, variant)
             if transformed is None:
                 continue
-            signature = level_signature(transformed)
-            if signature in seen:
-                continue
             seen.add(signature)
             levels.append(transformed)
             if len(levels) >= target_count:
@@ -327,25 +619,16 @@ def expand_with_transforms(
     return levels
 
 
-def positions_by_color(grid: Tuple[int, ...]) -> Dict[int, Tuple[int, int]]:
+def positions_by_color(grid: Tuple[int, ...], geometry: Geometry = STANDARD) -> Dict[int, Tuple[int, int]]:
     out: Dict[int, Tuple[int, int]] = {}
-    for y in range(HEIGHT):
-        for x in range(WIDTH):
-            color = grid[y * WIDTH + x]
+    for y in range(geometry.height):
+        for x in range(geometry.width):
+            color = grid[y * geometry.width + x]
             if color != -1:
                 out[color] = (x, y)
     return out
 
 
-def ordering_from_lock_steps(lock_steps: Dict[int, int]) -> str:
-    steps = list(lock_steps.values())
-    if len(set(steps)) == 1:
-        return "none"
-    if len(set(steps)) == len(steps):
-        return "strict"
-    return "specific"
-
-
 def classify(
     blocks_count: int,
     par_per_block: float,
@@ -354,19 +637,40 @@ def classify(
 ) -> Optional[str]:
     if blocks_count < 1:
         return None
-    if blocks_count <= 4 and not multi_swipe and par_per_block <= 2.0:
+    if blocks_count <= 4 and not multi_swipe and par_per_block <= MAX_PAR_PER_BLOCK["easy"]:
         return "easy"
-    if blocks_count <= 3 and multi_swipe and ordering == "none" and par_per_block <= 2.5:
+    if blocks_count <= 3 and multi_swipe and ordering == "none" and par_per_block <= MAX_PAR_PER_BLOCK["fun"]:
         return "fun"
-    if blocks_count <= 4 and multi_swipe and ordering in ("specific", "strict") and par_per_block <= 2.5:
+    if (
+        blocks_count <= 4
+        and multi_swipe
+        and ordering in ("specific", "strict")
+        and par_per_block <= MAX_PAR_PER_BLOCK["challenging"]
+    ):
         return "challenging"
-    if blocks_count <= 4 and multi_swipe and ordering == "strict" and par_per_block > 2.5:
+    if blocks_count <= 4 and multi_swipe and ordering == "strict" and par_per_block > MAX_PAR_PER_BLOCK["challenging"]:
         return "hard"
     return None
 
 
-def random_positions(rng: random.Random, count: int, forbidden: Set[Tuple[int, int]]) -> List[Tuple[int, int]]:
-    positions = [(x, y) for y in range(HEIGHT) for x in range(WIDTH) if (x, y) not in forbidden]
+def max_par(labels: Iterable[str], blocks_count: int) -> Optional[int]:
+    """Longest par classify accepts for any of ``labels``; None when one of them has no limit."""
+    longest = 0
+    for label in labels:
+        limit = MAX_PAR_PER_BLOCK.get(label)
+        if limit is None:
+            return None
+        longest = max(longest, int(limit * blocks_count))
+    return longest
+
+
+def random_positions(
+    rng: random.Random,
+    count: int,
+    forbidden: Set[Tuple[int, int]],
+    geometry: Geometry = STANDARD,
+) -> List[Tuple[int, int]]:
+    positions = [pos for pos in geometry.positions() if pos not in forbidden]
     rng.shuffle(positions)
     return positions[:count]
 
@@ -376,19 +680,20 @@ def build_holes(
     blocks_count: int,
     walls: Set[Tuple[int, int]],
     target: str,
+    geometry: Geometry = STANDARD,
 ) -> Optional[Dict[Tuple[int, int], int]]:
     if target == "easy":
+        last_x, last_y = geometry.width - 1, geometry.height - 1
         edge_positions = [
             (x, y)
-            for y in range(HEIGHT)
-            for x in range(WIDTH)
-            if (x in (0, WIDTH - 1) or y in (0, HEIGHT - 1)) and (x, y) not in walls
+            for x, y in geometry.positions()
+            if (x in (0, last_x) or y in (0, last_y)) and (x, y) not in walls
         ]
         if not edge_positions:
             return None
         hole_positions = [rng.choice(edge_positions)]
     else:
-        hole_positions = random_positions(rng, blocks_count, walls)
+        hole_positions = random_positions(rng, blocks_count, walls, geometry)
         if len(hole_positions) < blocks_count:
             return None
     colors = list(range(blocks_count))
@@ -396,11 +701,11 @@ def build_holes(
     return {pos: colors[i] for i, pos in enumerate(hole_positions)}
 
 
-def blocks_from_grid(grid: Tuple[int, ...]) -> Dict[Tuple[int, int], int]:
+def blocks_from_grid(grid: Tuple[int, ...], geometry: Geometry = STANDARD) -> Dict[Tuple[int, int], int]:
     out: Dict[Tuple[int, int], int] = {}
-    for y in range(HEIGHT):
-        for x in range(WIDTH):
-            color = grid[y * WIDTH + x]
+    for y in range(geometry.height):
+        for x in range(geometry.width):
+            color = grid[y * geometry.width + x]
             if color != -1:
                 out[(x, y)] = color
     return out
@@ -416,7 +721,20 @@ def scramble_length_for(target: str) -> int:
     return 6
 
 
-def generate_candidate(rng: random.Random, target: str) -> Optional[Level]:
+@dataclass
+class Candidate:
+    """An unsolved level drawn for ``target``, on its way through level_pipeline."""
+
+    target: str
+    blocks: Dict[Tuple[int, int], int]
+    holes: Dict[Tuple[int, int], int]
+    walls: Set[Tuple[int, int]]
+    # Longest par any wanted label allows (see max_par); solving stops past it.
+    max_par: Optional[int] = None
+    geometry: Geometry = STANDARD
+
+
+def build_candidate(rng: random.Random, target: str, geometry: Geometry = STANDARD) -> Optional[Candidate]:
     if target == "easy":
         blocks_count = 1
         walls_count = 0
@@ -430,72 +748,152 @@ def generate_candidate(rng: random.Random, target: str) -> Optional[Level]:
         blocks_count = rng.randint(2, 4)
         walls_count = rng.randint(2, 5)
 
-    walls = set(random_positions(rng, walls_count, set()))
-    holes = build_holes(rng, blocks_count, walls, target)
+    walls = set(random_positions(rng, walls_count, set(), geometry))
+    holes = build_holes(rng, blocks_count, walls, target, geometry)
     if holes is None:
+        if REPORT is not None:
+            REPORT.count("build", "no_holes")
         return None
 
     if target == "easy":
         hole = next(iter(holes.keys()))
         same_row = rng.choice([True, False])
         if same_row:
-            bx = rng.choice([x for x in range(WIDTH) if x != hole[0]])
+            bx = rng.choice([x for x in range(geometry.width) if x != hole[0]])
             blocks = {(bx, hole[1]): 0}
         else:
-            by = rng.choice([y for y in range(HEIGHT) if y != hole[1]])
+            by = rng.choice([y for y in range(geometry.height) if y != hole[1]])
             blocks = {(hole[0], by): 0}
-        return analyze_level(blocks, holes, walls)
+        return Candidate(target, blocks, holes, walls, geometry=geometry)
 
     if target == "fun":
         hole = next(iter(holes.keys()))
         candidates = [
             (x, y)
-            for y in range(HEIGHT)
-            for x in range(WIDTH)
+            for x, y in geometry.positions()
             if (x, y) not in walls and (x, y) != hole and x != hole[0] and y != hole[1]
         ]
         if not candidates:
+            if REPORT is not None:
+                REPORT.count("build", "no_block_cell")
             return None
         blocks = {rng.choice(candidates): 0}
-        return analyze_level(blocks, holes, walls)
+        return Candidate(target, blocks, holes, walls, geometry=geometry)
 
     blocks = dict(holes)
     scramble_len = scramble_length_for(target)
-    grid = grid_from_blocks(blocks)
+    board = Board(walls, {}, blocks.values(), geometry.width, geometry.height)
+    state = board.encode(blocks)
     for _ in range(scramble_len):
         moved = False
         for _try in range(6):
             is_row = rng.choice([True, False])
-            index = rng.randrange(HEIGHT if is_row else WIDTH)
+            index = rng.randrange(geometry.height if is_row else geometry.width)
             direction = rng.choice([-1, 1])
-            grid_next, moved = slide_grid(grid, walls, {}, is_row, index, direction)
+            state_next, moved = board.slide(state, is_row, index, direction)
             if moved:
-                grid = grid_next
+                state = state_next
                 break
         if not moved:
             break
 
-    blocks = blocks_from_grid(grid)
+    blocks = blocks_from_grid(board.decode_grid(state), geometry)
     if any(holes.get(pos) == color for pos, color in blocks.items()):
+        if REPORT is not None:
+            REPORT.count("build", "starts_solved")
+        return None
+    return Candidate(target, blocks, holes, walls, geometry=geometry)
+
+
+def reverse_par_range(target: str, blocks_count: int) -> Tuple[int, int]:
+    """Pars that can classify as ``target`` (see classify's par_per_block bounds)."""
+    limit = int(MAX_PAR_PER_BLOCK["challenging"] * blocks_count)
+    if target == "hard":
+        return limit + 1, REVERSE_MAX_PAR
+    return blocks_count + 1, limit
+
+
+def build_reverse_candidate(rng: random.Random, target: str, geometry: Geometry = STANDARD) -> Optional[Candidate]:
+    """Candidate picked by backward search from the solved board instead of a scramble.
+
+    Walls and holes are drawn as in build_candidate. Start states come from
+    reverse_search.backward_layers within reverse_par_range; "hard" only
+    follows strict reverse moves and takes the deepest layer it reached.
+    No block starts on its own hole.
+    """
+    if target == "challenging":
+        blocks_count = rng.randint(2, 3)
+        walls_count = rng.randint(1, 3)
+    else:
+        blocks_count = rng.randint(2, 4)
+        walls_count = rng.randint(2, 5)
+    walls = set(random_positions(rng, walls_count, set(), geometry))
+    holes = build_holes(rng, blocks_count, walls, target, geometry)
+    if holes is None:
+        if REPORT is not None:
+            REPORT.count("build", "no_holes")
+        return None
+
+    board = Board(walls, holes, holes.values(), geometry.width, geometry.height)
+    low, high = reverse_par_range(target, blocks_count)
+    strict = target == "hard"
+    layers = backward_layers(board, board.encode(holes), high, REVERSE_MAX_STATES, strict, REVERSE_BEAM, rng)
+    depths = range(low, len(layers))
+    if strict:
+        depths = range(len(layers) - 1, low - 1, -1)
+    starts: List[Tuple[int, ...]] = []
+    for depth in depths:
+        starts += [state for state in layers[depth] if not board.locked(state)]
+        if strict and starts:
+            break
+    if not starts:
+        if REPORT is not None:
+            REPORT.count("build", "no_start")
+        return None
+    return Candidate(target, board.decode(rng.choice(starts)), holes, walls, geometry=geometry)
+
+
+def candidate_builder(target: str) -> Callable[..., Optional[Candidate]]:
+    return build_reverse_candidate if target in REVERSE_TARGETS else build_candidate
+
+
+def generate_candidate(rng: random.Random, target: str, geometry: Geometry = STANDARD) -> Optional[Level]:
+    candidate = build_candidate(rng, target, geometry)
+    if candidate is None:
         return None
-    return analyze_level(blocks, holes, walls)
+    if REPORT is not None:
+        REPORT.count("build")
+    if is_hopeless(candidate.blocks, candidate.holes, candidate.walls, geometry):
+        if REPORT is not None:
+            REPORT.count("prefilter", "hopeless")
+        return None
+    if REPORT is not None:
+        REPORT.count("prefilter")
+    return analyze_level(candidate.blocks, candidate.holes, candidate.walls, geometry=geometry)
 
 
-def generate_corridor_candidate(rng: random.Random, target: str, blocks_count: int) -> Optional[Level]:
+def generate_corridor_candidate(
+    rng: random.Random,
+    target: str,
+    blocks_count: int,
+    geometry: Geometry = STANDARD,
+) -> Optional[Level]:
     orient_row = rng.choice([True, False])
     if orient_row:
-        line = rng.randint(1, HEIGHT - 2)
-        walls = {(x, y) for y in range(HEIGHT) for x in range(WIDTH) if y != line}
-        line_positions = [(x, line) for x in range(WIDTH)]
+        line = rng.randint(1, geometry.height - 2)
+        walls = {(x, y) for x, y in geometry.positions() if y != line}
+        line_positions = [(x, line) for x in range(geometry.width)]
     else:
-        line = rng.randint(1, WIDTH - 2)
-        walls = {(x, y) for y in range(HEIGHT) for x in range(WIDTH) if x != line}
-        line_positions = [(line, y) for y in range(HEIGHT)]
+        line = rng.randint(1, geometry.width - 2)
+        walls = {(x, y) for x, y in geometry.positions() if x != line}
+        line_positions = [(line, y) for y in range(geometry.height)]
 
     rng.shuffle(line_positions)
     holes_positions = line_positions[:blocks_count]
     block_positions = [p for p in line_positions[blocks_count:] if p not in holes_positions]
     if len(block_positions) < blocks_count:
+        if REPORT is not None:
+            REPORT.count("corridor", "no_room")
         return None
     block_positions = block_positions[:blocks_count]
 
@@ -505,45 +903,298 @@ def generate_corridor_candidate(rng: random.Random, target: str, blocks_count: i
     blocks = {pos: colors[i] for i, pos in enumerate(block_positions)}
 
     if any(holes.get(pos) == color for pos, color in blocks.items()):
+        if REPORT is not None:
+            REPORT.count("corridor", "starts_solved")
         return None
 
-    lvl = analyze_level(blocks, holes, walls)
+    lvl = analyze_level(blocks, holes, walls, geometry=geometry)
     if lvl is None:
+        if REPORT is not None:
+            REPORT.count("corridor", "unsolved")
         return None
     if lvl.label != target:
+        if REPORT is not None:
+            REPORT.count("corridor", "wrong_label")
         return None
+    if REPORT is not None:
+        REPORT.count("corridor")
     return lvl
 
 
-def collect_levels(
+def worker_rng(seed: int, stream: str, worker: int) -> random.Random:
+    """Independent RNG for one worker of one generation stream."""
+    return random.Random(f"{seed}:{stream}:{worker}")
+
+
+def _attempt_batch(
+    task: Tuple[Callable[..., Optional[Level]], tuple, str, Any, int],
+) -> Tuple[Any, list, SearchStats, int, Optional[Counters], Dict[bytes, CachedAnalysis]]:
+    """Run one worker's batch in a pool process and return its RNG state, hits, counters and new analyses."""
+    global SEARCH_TOTALS
+    attempt, args, target_label, rng_state, batch = task
+    SEARCH_TOTALS = SearchStats()
+    HOPELESS_REJECTS["candidates"] = 0
+    if REPORT is not None:
+        REPORT.take()
+        REPORT.target = target_label
+    if ANALYSIS_CACHE is not None:
+        ANALYSIS_CACHE.take()
+    rng = random.Random()
+    rng.setstate(rng_state)
+    found = []
+    for _ in range(batch):
+        start = time.perf_counter() if REPORT is not None else 0.0
+        level = attempt(rng, *args)
+        if level is not None and level.label == target_label:
+            found.append(level)
+        if REPORT is not None:
+            REPORT.count("attempt", attempt_outcome(level, target_label), time.perf_counter() - start)
+    report = REPORT.take() if REPORT is not None else None
+    analyses = ANALYSIS_CACHE.take() if ANALYSIS_CACHE is not None else {}
+    return rng.getstate(), found, SEARCH_TOTALS, HOPELESS_REJECTS["candidates"], report, analyses
+
+
+def attempt_outcome(level: Optional[Level], target_label: str) -> str:
+    """Run report outcome of one generation attempt for ``target_label``."""
+    if level is None:
+        return "no_level"
+    return OK if level.label == target_label else f"got_{level.label}"
+
+
+def generate_parallel(
+    attempt: Callable[..., Optional[Level]],
+    args: tuple,
     target_label: str,
     count: int,
-    rng: random.Random,
-    seen: Set[str],
-    attempts_multiplier: int = 300,
-) -> List[Level]:
+    seen: Set[bytes],
+    signature: Callable[[Level], bytes],
+    stream: str,
+    max_attempts: int,
+    pool: Executor,
+    workers: int,
+    seed: int = RNG_SEED,
+    near: Optional[NearDuplicateIndex[Any]] = None,
+) -> Tuple[List[Level], int]:
+    """Call ``attempt(rng, *args)`` across ``pool`` until ``count`` unseen levels are found.
+
+    Worker w draws from ``worker_rng(seed, stream, w)`` and runs WORKER_BATCH
+    attempts per round. Rounds are merged in worker order against ``seen``,
+    so the result depends only on the seed and worker count, never on
+    scheduling. Levels ``near`` flags as near-clones are skipped. Returns
+    the new levels and the attempts spent.
+    """
+    states = [worker_rng(seed, stream, w).getstate() for w in range(workers)]
     levels: List[Level] = []
     attempts = 0
-    while len(levels) < count and attempts < count * attempts_multiplier:
-        attempts += 1
-        level = generate_candidate(rng, target_label)
-        if level is None:
-            continue
-        if level.label != target_label:
-            continue
+    if REPORT is not None:
+        REPORT.target = target_label
+    while len(levels) < count and attempts < max_attempts:
+        tasks = [(attempt, args, target_label, states[w], WORKER_BATCH) for w in range(workers)]
+        for w, (state, found, stats, rejects, report, analyses) in enumerate(pool.map(_attempt_batch, tasks)):
+            states[w] = state
+            SEARCH_TOTALS.add(stats)
+            HOPELESS_REJECTS["candidates"] += rejects
+            if REPORT is not None and report is not None:
+                REPORT.merge(report)
+            if ANALYSIS_CACHE is not None:
+                ANALYSIS_CACHE.merge(analyses)
+            for level in found:
+                if len(levels) >= count:
+                    break
+                key = signature(level)
+                if key in seen:
+                    if REPORT is not None:
+                        REPORT.count("dedupe", "duplicate")
+                    continue
+                if is_near_duplicate(near, level):
+                    if REPORT is not None:
+                        REPORT.count("dedupe", "near_duplicate")
+                    continue
+                if REPORT is not None:
+                    REPORT.count("dedupe")
+                seen.add(key)
+                levels.append(level)
+        attempts += workers * WORKER_BATCH
+    return levels, attempts
+
+
+RemoteSolve = Tuple[str, Optional[Level], SearchStats, Optional[Counters], Dict[bytes, CachedAnalysis]]
+
+
+def _solve_remote(candidate: Candidate) -> RemoteSolve:
+    """Solve stage body for pool processes: the level, the search and report counters and the analysis it made there."""
+    stats = SearchStats()
+    if REPORT is not None:
+        REPORT.target = candidate.target
+    if ANALYSIS_CACHE is not None:
+        ANALYSIS_CACHE.take()
+    level = analyze_level(
+        candidate.blocks,
+        candidate.holes,
+        candidate.walls,
+        stats=stats,
+        max_par=candidate.max_par,
+        geometry=candidate.geometry,
+    )
+    report = REPORT.take() if REPORT is not None else None
+    analyses = ANALYSIS_CACHE.take() if ANALYSIS_CACHE is not None else {}
+    return candidate.target, level, stats, report, analyses
+
+
+def _merge_remote(result: RemoteSolve) -> Optional[Level]:
+    target, level, stats, report, analyses = result
+    SEARCH_TOTALS.add(stats)
+    if ANALYSIS_CACHE is not None:
+        ANALYSIS_CACHE.merge(analyses)
+    if REPORT is not None:
+        # Later stages count this level for its candidate's target.
+        REPORT.target = target
+        if report is not None:
+            REPORT.merge(report)
+    return level
+
+
+def default_prefilters(seen: Set[bytes]) -> List[Stage]:
+    """Cheap checks run on candidates before the solve stage."""
+
+    def hopeless(candidate: Candidate) -> Optional[Candidate]:
+        if is_hopeless(candidate.blocks, candidate.holes, candidate.walls, candidate.geometry):
+            if REPORT is not None:
+                REPORT.count("prefilter", "hopeless")
+            return None
+        return candidate
+
+    def unseen(candidate: Candidate) -> Optional[Candidate]:
+        geometry = candidate.geometry
+        key = level_key(candidate.walls, candidate.holes, candidate.blocks, geometry.width, geometry.colors)
+        if key in seen:
+            if REPORT is not None:
+                REPORT.count("prefilter", "seen")
+            return None
+        if REPORT is not None:
+            REPORT.count("prefilter")
+        return candidate
+
+    return [Stage("hopeless", hopeless), Stage("seen", unseen)]
+
+
+def level_pipeline(
+    quotas: Dict[str, int],
+    rng: random.Random,
+    seen: Set[bytes],
+    max_attempts: int,
+    pool: Optional[Executor] = None,
+    near: Optional[NearDuplicateIndex[Any]] = None,
+    prefilters: Optional[List[Stage]] = None,
+    geometry: Geometry = STANDARD,
+) -> Pipeline:
+    """Stream of new levels: generate -> prefilters -> solve -> classify -> dedupe.
+
+    ``quotas`` maps labels to how many levels are still wanted and is counted
+    down as levels come out. Candidates (see candidate_builder) are drawn for the open labels in
+    turn, at most ``max_attempts`` of them, and generation stops once every
+    quota is met. Solving stops once par is too long for every open label
+    (see max_par). A solved level is kept for whatever open label it gets,
+    then checked against ``seen`` and ``near`` and added to both. With a pool
+    only the solve stage runs there; candidates are still drawn from ``rng``
+    in order, so this call's levels do not depend on the worker count. The
+    pool is fed pipeline.QUEUE_SIZE candidates ahead, though, so ``rng`` ends
+    up further along than after a serial run and the next pipeline sharing it
+    gets different candidates. Every candidate is built on ``geometry``.
+    """
+
+    def generate() -> Iterator[Optional[Candidate]]:
+        for attempt in range(max_attempts):
+            open_labels = [label for label, wanted in quotas.items() if wanted > 0]
+            if not open_labels:
+                return
+            target = open_labels[attempt % len(open_labels)]
+            if REPORT is None:
+                candidate = candidate_builder(target)(rng, target, geometry)
+            else:
+                REPORT.target = target
+                start = time.perf_counter()
+                candidate = candidate_builder(target)(rng, target, geometry)
+                REPORT.spend("build", time.perf_counter() - start)
+                if candidate is not None:
+                    REPORT.count("build")
+            if candidate is not None:
+                candidate.max_par = max_par(open_labels, len(candidate.blocks))
+            yield candidate
+
+    def solve(candidate: Candidate) -> Optional[Level]:
+        return analyze_level(
+            candidate.blocks, candidate.holes, candidate.walls, max_par=candidate.max_par, geometry=candidate.geometry
+        )
+
+    def classify(level: Level) -> Optional[Level]:
+        wanted = quotas.get(level.label, 0) > 0
+        if REPORT is not None:
+            REPORT.count("classify", OK if wanted else f"got_{level.label}")
+        return level if wanted else None
+
+    def dedupe(level: Level) -> Optional[Level]:
         signature = level_signature(level)
         if signature in seen:
-            continue
+            if REPORT is not None:
+                REPORT.count("dedupe", "duplicate")
+            return None
+        if is_near_duplicate(near, level):
+            if REPORT is not None:
+                REPORT.count("dedupe", "near_duplicate")
+            return None
+        if REPORT is not None:
+            REPORT.count("dedupe")
         seen.add(signature)
+        quotas[level.label] -= 1
+        return level
+
+    if prefilters is None:
+        prefilters = default_prefilters(seen)
+    if pool is None:
+        solve_stage = Stage("solve", solve)
+    else:
+        solve_stage = Stage("solve", _solve_remote, parallel=True, collect=_merge_remote)
+    stages = prefilters + [solve_stage, Stage("classify", classify), Stage("dedupe", dedupe)]
+    return Pipeline(generate(), stages, pool, source_name="generate")
+
+
+def collect_levels(
+    target_label: str,
+    count: int,
+    rng: random.Random,
+    seen: Set[bytes],
+    attempts_multiplier: int = 300,
+    pool: Optional[Executor] = None,
+    workers: int = 0,
+    near: Optional[NearDuplicateIndex[Any]] = None,
+    geometry: Geometry = STANDARD,
+) -> List[Level]:
+    quotas = {target_label: count}
+    stream = level_pipeline(
+        quotas, rng, seen, count * attempts_multiplier, pool if workers > 0 else None, near, geometry=geometry
+    )
+    levels: List[Level] = []
+    for level in stream:
         levels.append(level)
+        if len(levels) == count:
+            break
+    PIPELINE_STATS.append((target_label, stream.stats))
+    if REPORT is not None:
+        REPORT.add_pipeline(target_label, stream.stats)
     if len(levels) < count:
+        attempts = stream.stats["generate"].received
         raise RuntimeError(f"Failed to generate {count} {target_label} levels after {attempts} attempts.")
     return levels
 
 
-def load_existing_levels() -> Tuple[List[Level], Set[str]]:
+def level_geometry(data: dict) -> Geometry:
+    return geometry_for(int(data.get("width", STANDARD.width)), int(data.get("height", STANDARD.height)))
+
+
+def load_existing_levels() -> Tuple[List[Level], Set[bytes]]:
     levels: List[Level] = []
-    signatures: Set[str] = set()
+    signatures: Set[bytes] = set()
     for path in sorted(LEVELS_DIR.glob("level_*.json")):
         with path.open("r", encoding="utf-8") as f:
             data = json.load(f)
@@ -553,7 +1204,7 @@ def load_existing_levels() -> Tuple[List[Level], Set[str]]:
         # Skip if any block starts solved
         if any(holes.get(pos) == color for pos, color in blocks.items()):
             continue
-        lvl = analyze_level(blocks, holes, walls)
+        lvl = analyze_level(blocks, holes, walls, geometry=level_geometry(data))
         if lvl is None:
             continue
         signature = level_signature(lvl)
@@ -564,9 +1215,9 @@ def load_existing_levels() -> Tuple[List[Level], Set[str]]:
     return levels, signatures
 
 
-def load_existing_levels_raw() -> Tuple[List[Level], Set[str]]:
+def load_existing_levels_raw() -> Tuple[List[Level], Set[bytes]]:
     levels: List[Level] = []
-    signatures: Set[str] = set()
+    signatures: Set[bytes] = set()
     for path in sorted(LEVELS_DIR.glob("level_*.json")):
         with path.open("r", encoding="utf-8") as f:
             data = json.load(f)
@@ -585,6 +1236,8 @@ def load_existing_levels_raw() -> Tuple[List[Level], Set[str]]:
             label=label or "hard",
             ordering="none",
             multi_swipe=True,
+            geometry=level_geometry(data),
+            solution=parse_solution(data.get("metrics", {}).get("solution", "")) or None,
         )
         signature = level_signature(lvl)
         if signature in signatures:
@@ -597,7 +1250,7 @@ def load_existing_levels_raw() -> Tuple[List[Level], Set[str]]:
 def build_transforms(
     base_levels: List[Level],
     count: int,
-    seen: Set[str],
+    seen: Set[bytes],
     rng: random.Random,
 ) -> List[Level]:
     if count <= 0:
@@ -608,13 +1261,14 @@ def build_transforms(
         progress = False
         for base in base_levels:
             rng.shuffle(variants)
+            keys = transformed_keys(base.walls, base.holes, base.blocks, base.geometry.width, base.geometry.colors)
             for variant in variants:
+                signature = keys[variant]
+                if signature in seen:
+                    continue
                 transformed = transform_level(base, variant)
                 if transformed is None:
                     continue
-                signature = level_signature(transformed)
-                if signature in seen:
-                    continue
                 seen.add(signature)
                 expanded.append(transformed)
                 progress = True
@@ -630,6 +1284,10 @@ def build_transforms(
 
 
 def main() -> None:
+    manifest = BuildManifest("rebuild")
+    if manifest.is_fresh("levels", run_inputs()):
+        print("Levels are up to date with their seed, rules and sources (SHIFTLINE_FORCE=1 regenerates them).")
+        return
     rng = random.Random(RNG_SEED)
 
     if FAST_EXPAND:
@@ -677,17 +1335,10 @@ def main() -> None:
                 raise RuntimeError(f"Stage {stage_idx} has {len(stage_levels)} levels.")
             stages.append(stage_levels)
 
-        LEVELS_DIR.mkdir(parents=True, exist_ok=True)
-        for path in LEVELS_DIR.glob("level_*.json"):
-            path.unlink()
-        idx = 1
-        for stage_levels in stages:
-            for level in stage_levels:
-                out_path = LEVELS_DIR / f"level_{idx:03d}.json"
-                with out_path.open("w", encoding="utf-8") as f:
-                    json.dump(level.to_json(), f, indent=2)
-                idx += 1
-        print(f"Expanded to {STAGE_COUNT * LEVELS_PER_STAGE} levels with transforms.")
+        changed = write_stages(stages)
+        manifest.record("levels", run_inputs(), sorted(LEVELS_DIR.glob("level_*.json")))
+        manifest.save()
+        print(f"Expanded to {STAGE_COUNT * LEVELS_PER_STAGE} levels with transforms ({changed} files changed).")
         return
 
     existing, seen = load_existing_levels()
@@ -701,25 +1352,41 @@ def main() -> None:
     challenging_target = 94
     hard_target = 90
 
-    easy_levels += collect_levels("easy", max(0, easy_target - len(easy_levels)), rng, seen)
-    fun_levels += collect_levels("fun", max(0, fun_target - len(fun_levels)), rng, seen)
-
-    challenging_base = min(challenging_target, 50)
-    hard_base = min(hard_target, 50)
-    challenging_levels += collect_levels(
-        "challenging",
-        max(0, challenging_base - len(challenging_levels)),
-        rng,
-        seen,
-        attempts_multiplier=600,
-    )
-    hard_levels += collect_levels(
-        "hard",
-        max(0, hard_base - len(hard_levels)),
-        rng,
-        seen,
-        attempts_multiplier=600,
-    )
+    near = near_duplicate_index(existing)
+    pool = ProcessPoolExecutor(max_workers=WORKERS) if WORKERS > 0 else None
+    try:
+        easy_levels += collect_levels(
+            "easy", max(0, easy_target - len(easy_levels)), rng, seen, pool=pool, workers=WORKERS, near=near
+        )
+        fun_levels += collect_levels(
+            "fun", max(0, fun_target - len(fun_levels)), rng, seen, pool=pool, workers=WORKERS, near=near
+        )
+
+        challenging_base = min(challenging_target, 50)
+        hard_base = min(hard_target, 50)
+        challenging_levels += collect_levels(
+            "challenging",
+            max(0, challenging_base - len(challenging_levels)),
+            rng,
+            seen,
+            attempts_multiplier=600,
+            pool=pool,
+            workers=WORKERS,
+            near=near,
+        )
+        hard_levels += collect_levels(
+            "hard",
+            max(0, hard_base - len(hard_levels)),
+            rng,
+            seen,
+            attempts_multiplier=600,
+            pool=pool,
+            workers=WORKERS,
+            near=near,
+        )
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
     easy_levels = expand_with_transforms(easy_levels, easy_target, seen, rng)
     fun_levels = expand_with_transforms(fun_levels, fun_target, seen, rng)
@@ -760,21 +1427,29 @@ def main() -> None:
         stages.append(stage_levels)
 
     # Write levels
-    LEVELS_DIR.mkdir(parents=True, exist_ok=True)
-    for path in LEVELS_DIR.glob("level_*.json"):
-        path.unlink()
-    idx = 1
     for stage_idx, stage_levels in enumerate(stages, start=1):
         if len(stage_levels) != LEVELS_PER_STAGE:
             raise RuntimeError(f"Stage {stage_idx} has {len(stage_levels)} levels.")
-        for level in stage_levels:
-            out_path = LEVELS_DIR / f"level_{idx:03d}.json"
-            with out_path.open("w", encoding="utf-8") as f:
-                json.dump(level.to_json(), f, indent=2)
-            idx += 1
-
-    print(f"Rebuilt {STAGE_COUNT * LEVELS_PER_STAGE} levels with no bouncers.")
+    changed = write_stages(stages)
+    manifest.record("levels", run_inputs(), sorted(LEVELS_DIR.glob("level_*.json")))
+    manifest.save()
+
+    print(f"Rebuilt {STAGE_COUNT * LEVELS_PER_STAGE} levels with no bouncers ({changed} files changed).")
+    print(f"Line table: {line_table(STANDARD.width, STANDARD.height).stats()}")
+    print(
+        f"Search ({SEARCH}): expanded {SEARCH_TOTALS.forward_expanded} forward, "
+        f"{SEARCH_TOTALS.backward_expanded} backward; "
+        f"{SEARCH_TOTALS.aborted} searches stopped past their label's par, saving at least "
+        f"{SEARCH_TOTALS.saved} expansions; "
+        f"rejected {HOPELESS_REJECTS['candidates']} hopeless and {NEAR_REJECTS['candidates']} near-duplicate candidates."
+    )
+    for label, stage_stats in PIPELINE_STATS:
+        print(f"Pipeline ({label}): {summarize(stage_stats)}")
+    if ANALYSIS_CACHE is not None:
+        ANALYSIS_CACHE.save()
+        print(f"Analysis cache: {ANALYSIS_CACHE.stats()}")
 
 
 if __name__ == "__main__":
-    main()
+    with session("rebuild_levels_no_bouncers"):
+        main()
@@ -4,30 +4,63 @@ Render stage contact sheets from Shiftline level JSON files.
 
 Usage:
   python tools/render_level_sheets.py
+  SHIFTLINE_WATCH=1 python tools/render_level_sheets.py
 
 Outputs:
   shiftline/level_sheets/stage_01.png ... stage_10.png
+  shiftline/level_thumbs/stage_01.png ... stage_10.png (+ .json UV index)
+
+A sheet is only redrawn when its stage's level files or this script changed
+since the last run (see build_manifest); level files of other stages are not
+read. With SHIFTLINE_WORKERS=N stale sheets are drawn in N processes.
+
+level_thumbs holds one texture atlas per stage for the level select: each
+level's grid drawn like its card, without frame or text, and scaled down to
+THUMB_CELL pixels per cell. Next to each atlas a JSON index gives every
+level's rect in pixels and its UV rect, so a stage's previews take one
+texture load (an AtlasTexture per button). The run ends with the atlases'
+file size and the memory they take once loaded as uncompressed RGBA8.
+
+Cards are cached as PNGs in tools/.render_cache, keyed by the level file's
+content hash, the card's title and size and the render settings (see
+render_settings), so a redrawn sheet only draws the cards whose level
+changed. The cache can be deleted at any time.
+
+SHIFTLINE_WATCH=1 keeps running and redraws the affected sheet whenever a
+level file changes, e.g. when LevelEditor saves one.
+
+Cards are composed from prebuilt tiles instead of being drawn cell by cell:
+a ``TileAtlas`` holds every cell a palette can produce (wall, hole and block
+per color, block on hole per pair) and ``card_frame`` the card background
+with its empty grid, both drawn once with the same calls as before. Titles
+and labels are drawn from cached glyph masks.
 """
 from __future__ import annotations
 
+import hashlib
 import json
 import math
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
+import PIL
 from PIL import Image, ImageDraw, ImageFont  # type: ignore
 
+from build_manifest import BuildManifest, inputs_digest, source_digest
+
 
 ROOT = Path(__file__).resolve().parents[1]
 LEVELS_DIR = ROOT / "levels"
 OUT_DIR = ROOT / "level_sheets"
 
+# Board size of level files without width/height; cards fit the largest board of their stage.
 GRID_W = 8
 GRID_H = 8
 CELL = 16
 PADDING = 6
-CARD_W = GRID_W * CELL + PADDING * 2
-CARD_H = GRID_H * CELL + PADDING * 2 + 16
 STAGE_COUNT = 10
 LEVELS_PER_STAGE = 20
 SHEET_COLS = 4
@@ -37,6 +70,27 @@ BG = (22, 30, 38)
 GRID_LINE = (36, 46, 58)
 WALL = (35, 42, 52)
 HOLE_RING = (30, 30, 34)
+CARD_FILL = (26, 34, 44)
+CARD_OUTLINE = (40, 52, 64)
+DEFAULT_PALETTE = [(60, 120, 220), (230, 80, 80), (80, 190, 120), (230, 200, 70)]
+# Processes drawing stale sheets; 0 draws them here.
+WORKERS = int(os.environ.get("SHIFTLINE_WORKERS", "0"))
+CARD_CACHE_DIR = Path(__file__).resolve().parent / ".render_cache"
+# Bump when draw_level or draw_cell change what a card looks like.
+CARD_FORMAT = 1
+WATCH = os.environ.get("SHIFTLINE_WATCH", "0") == "1"
+# Seconds between checks of the level files in watch mode.
+WATCH_INTERVAL = 0.2
+THUMBS_DIR = ROOT / "level_thumbs"
+# Pixels per cell in thumbnails; CELL must be a multiple of it.
+THUMB_CELL = 8
+# Transparent pixels around each thumbnail, so filtering never bleeds into a neighbour.
+THUMB_GAP = 2
+THUMB_COLS = 5
+
+RGB = Tuple[int, int, int]
+# (wall, hole color, block color) of a cell, colors as palette indexes or -1.
+TileKey = Tuple[bool, int, int]
 
 
 def load_levels() -> list[dict]:
@@ -55,7 +109,7 @@ def parse_palette(data: dict) -> list[tuple[int, int, int]]:
         if isinstance(item, str) and item.startswith("#") and len(item) == 7:
             out.append(tuple(int(item[i : i + 2], 16) for i in (1, 3, 5)))
     if not out:
-        out = [(60, 120, 220), (230, 80, 80), (80, 190, 120), (230, 200, 70)]
+        out = list(DEFAULT_PALETTE)
     return out
 
 
@@ -68,89 +122,397 @@ def normalize_label(label: str) -> str:
     return label
 
 
+def grid_size(data: dict) -> tuple[int, int]:
+    return int(data.get("width", GRID_W)), int(data.get("height", GRID_H))
+
+
+def card_size(grid_w: int, grid_h: int) -> tuple[int, int]:
+    return grid_w * CELL + PADDING * 2, grid_h * CELL + PADDING * 2 + 16
+
+
+def draw_cell(
+    draw: ImageDraw.ImageDraw,
+    x0: int,
+    y0: int,
+    wall: bool,
+    hole: Optional[RGB],
+    block: Optional[RGB],
+) -> None:
+    """One grid cell with its top-left pixel at (x0, y0)."""
+    x1 = x0 + CELL - 1
+    y1 = y0 + CELL - 1
+    draw.rectangle((x0, y0, x1, y1), outline=GRID_LINE)
+
+    if wall:
+        draw.rectangle((x0 + 1, y0 + 1, x1 - 1, y1 - 1), fill=WALL)
+        return
+
+    if hole is not None:
+        outer = tuple(max(0, int(v * 0.6)) for v in hole)
+        inner = tuple(min(255, int(v * 0.9)) for v in hole)
+        draw.rounded_rectangle(
+            (x0 + 2, y0 + 2, x1 - 2, y1 - 2),
+            radius=4,
+            fill=outer,
+        )
+        draw.rounded_rectangle(
+            (x0 + 4, y0 + 4, x1 - 4, y1 - 4),
+            radius=3,
+            fill=inner,
+            outline=HOLE_RING,
+        )
+
+    if block is not None:
+        draw.rounded_rectangle(
+            (x0 + 3, y0 + 3, x1 - 3, y1 - 3),
+            radius=4,
+            fill=block,
+        )
+
+
+class TileAtlas:
+    """Every non-empty cell of one palette, drawn once on the card fill."""
+
+    def __init__(self, palette: Tuple[RGB, ...]) -> None:
+        self.palette = palette
+        colors = range(len(palette))
+        keys = [(True, -1, -1)]
+        keys += [(False, hole, -1) for hole in colors]
+        keys += [(False, -1, block) for block in colors]
+        keys += [(False, hole, block) for hole in colors for block in colors]
+        self.tiles: Dict[TileKey, Image.Image] = {key: self._draw(*key) for key in keys}
+
+    def _draw(self, wall: bool, hole: int, block: int) -> Image.Image:
+        tile = Image.new("RGB", (CELL, CELL), CARD_FILL)
+        draw_cell(
+            ImageDraw.Draw(tile),
+            0,
+            0,
+            wall,
+            self.palette[hole] if hole >= 0 else None,
+            self.palette[block] if block >= 0 else None,
+        )
+        return tile
+
+
+_ATLASES: Dict[Tuple[RGB, ...], TileAtlas] = {}
+_FRAMES: Dict[Tuple[int, int, int, int], Image.Image] = {}
+_FONT: Optional[ImageFont.ImageFont] = None
+# Per text, its glyph coverage and where it sits relative to the text origin.
+_TEXT_MASKS: Dict[str, Tuple[Image.Image, int, int]] = {}
+
+
+def tile_atlas(palette: Tuple[RGB, ...]) -> TileAtlas:
+    atlas = _ATLASES.get(palette)
+    if atlas is None:
+        atlas = _ATLASES[palette] = TileAtlas(palette)
+    return atlas
+
+
+def card_frame(card_w: int, card_h: int, grid_w: int, grid_h: int) -> Image.Image:
+    """Card background with an empty grid; shared, so paste it rather than drawing on it."""
+    key = (card_w, card_h, grid_w, grid_h)
+    frame = _FRAMES.get(key)
+    if frame is None:
+        frame = Image.new("RGB", (card_w, card_h), BG)
+        draw = ImageDraw.Draw(frame)
+        draw.rounded_rectangle(
+            (0, 0, card_w - 1, card_h - 1),
+            radius=8,
+            fill=CARD_FILL,
+            outline=CARD_OUTLINE,
+            width=2,
+        )
+        for y in range(grid_h):
+            for x in range(grid_w):
+                draw_cell(draw, PADDING + x * CELL, PADDING + y * CELL, False, None, None)
+        _FRAMES[key] = frame
+    return frame
+
+
+def draw_text(draw: ImageDraw.ImageDraw, xy: Tuple[int, int], text: str, fill: RGB) -> None:
+    """Same pixels as ``draw.text`` with the default font, from a mask rendered once per text."""
+    global _FONT
+    cached = _TEXT_MASKS.get(text)
+    if cached is None:
+        if _FONT is None:
+            _FONT = ImageFont.load_default()
+        left, top, right, bottom = _FONT.getbbox(text)
+        mask = Image.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=_FONT)
+        cached = _TEXT_MASKS[text] = (mask, left, top)
+    mask, left, top = cached
+    draw.bitmap((xy[0] + left, xy[1] + top), mask, fill=fill)
+
+
 def draw_level(card: Image.Image, data: dict, title: str) -> None:
+    card_h = card.size[1]
+    draw_board(card, data)
+    label = normalize_label(str(data.get("difficulty_label", "")))
+
+    # title + difficulty
     draw = ImageDraw.Draw(card)
+    draw_text(draw, (PADDING, card_h - 14), title, (220, 220, 220))
+    if label:
+        draw_text(draw, (PADDING, card_h - 28), label, (180, 200, 220))
+
+
+def draw_board(card: Image.Image, data: dict) -> None:
+    """Card background and grid of ``data``, without title or label."""
+    card_w, card_h = card.size
+    grid_w, grid_h = grid_size(data)
     palette = parse_palette(data)
-    label = normalize_label(str(data.get("difficulty_label", "")))
+    atlas = tile_atlas(tuple(palette))
     walls = {tuple(w) for w in data.get("walls", [])}
     blocks = {(b["pos"][0], b["pos"][1]): b["color"] for b in data.get("blocks", [])}
     holes = {(h["pos"][0], h["pos"][1]): h["color"] for h in data.get("holes", [])}
 
-    # background
-    draw.rounded_rectangle(
-        (0, 0, CARD_W - 1, CARD_H - 1),
-        radius=8,
-        fill=(26, 34, 44),
-        outline=(40, 52, 64),
-        width=2,
-    )
-
-    # grid cells
-    for y in range(GRID_H):
-        for x in range(GRID_W):
-            x0 = PADDING + x * CELL
-            y0 = PADDING + y * CELL
-            x1 = x0 + CELL - 1
-            y1 = y0 + CELL - 1
-            draw.rectangle((x0, y0, x1, y1), outline=GRID_LINE)
-
-            if (x, y) in walls:
-                draw.rectangle((x0 + 1, y0 + 1, x1 - 1, y1 - 1), fill=WALL)
-                continue
+    card.paste(card_frame(card_w, card_h, grid_w, grid_h))
+    cells: Dict[Tuple[int, int], TileKey] = {}
+    for pos, color in holes.items():
+        cells[pos] = (False, color % len(palette), -1)
+    for pos, color in blocks.items():
+        cells[pos] = (False, cells.get(pos, (False, -1, -1))[1], color % len(palette))
+    for pos in walls:
+        cells[pos] = (True, -1, -1)
+    tiles = atlas.tiles
+    for (x, y), key in cells.items():
+        if 0 <= x < grid_w and 0 <= y < grid_h:
+            card.paste(tiles[key], (PADDING + x * CELL, PADDING + y * CELL))
 
-            if (x, y) in holes:
-                c = palette[holes[(x, y)] % len(palette)]
-                outer = tuple(max(0, int(v * 0.6)) for v in c)
-                inner = tuple(min(255, int(v * 0.9)) for v in c)
-                draw.rounded_rectangle(
-                    (x0 + 2, y0 + 2, x1 - 2, y1 - 2),
-                    radius=4,
-                    fill=outer,
-                )
-                draw.rounded_rectangle(
-                    (x0 + 4, y0 + 4, x1 - 4, y1 - 4),
-                    radius=3,
-                    fill=inner,
-                    outline=HOLE_RING,
-                )
-
-            if (x, y) in blocks:
-                c = palette[blocks[(x, y)] % len(palette)]
-                draw.rounded_rectangle(
-                    (x0 + 3, y0 + 3, x1 - 3, y1 - 3),
-                    radius=4,
-                    fill=c,
-                )
 
-    # title + difficulty
-    font = ImageFont.load_default()
-    draw.text((PADDING, CARD_H - 14), title, fill=(220, 220, 220), font=font)
-    if label:
-        draw.text((PADDING, CARD_H - 28), label, fill=(180, 200, 220), font=font)
+def render_settings() -> dict:
+    """Everything besides the level itself that decides a card's pixels."""
+    return {
+        "format": CARD_FORMAT,
+        "pillow": PIL.__version__,
+        "grid": [GRID_W, GRID_H],
+        "cell": CELL,
+        "padding": PADDING,
+        "colors": [BG, GRID_LINE, WALL, HOLE_RING, CARD_FILL, CARD_OUTLINE],
+        "palette": DEFAULT_PALETTE,
+    }
 
 
-def main() -> None:
+_SETTINGS_DIGEST: Optional[str] = None
+
+
+def card_cache_path(level_digest: str, title: str, size: Tuple[int, int]) -> Path:
+    global _SETTINGS_DIGEST
+    if _SETTINGS_DIGEST is None:
+        _SETTINGS_DIGEST = hashlib.sha256(json.dumps(render_settings()).encode("utf-8")).hexdigest()
+    key = hashlib.sha256(f"{_SETTINGS_DIGEST}\0{level_digest}\0{title}\0{size[0]}x{size[1]}".encode("utf-8"))
+    return CARD_CACHE_DIR / f"{key.hexdigest()}.png"
+
+
+def cached_card(data: dict, level_digest: str, title: str, size: Tuple[int, int]) -> Image.Image:
+    """The card for a level file with content hash ``level_digest``, drawn only if not cached."""
+    path = card_cache_path(level_digest, title, size)
+    try:
+        with Image.open(path) as cached:
+            return cached.convert("RGB")
+    except (OSError, ValueError):
+        pass
+    card = Image.new("RGB", size, BG)
+    draw_level(card, data, title)
+    CARD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    card.save(tmp, format="PNG")
+    tmp.replace(path)
+    return card
+
+
+def render_sheet(stage: int, chunk: list[dict], digests: Optional[List[str]] = None) -> Image.Image:
+    """Contact sheet of one stage's levels, in order; cards come from the cache when ``digests`` are given."""
+    sizes = [grid_size(data) for data in chunk] or [(GRID_W, GRID_H)]
+    card_w, card_h = card_size(max(w for w, _h in sizes), max(h for _w, h in sizes))
+    sheet_w = SHEET_COLS * card_w + (SHEET_COLS + 1) * SHEET_PAD
+    sheet_h = SHEET_ROWS * card_h + (SHEET_ROWS + 1) * SHEET_PAD
+    sheet = Image.new("RGB", (sheet_w, sheet_h), BG)
+    for idx, data in enumerate(chunk):
+        r = idx // SHEET_COLS
+        c = idx % SHEET_COLS
+        x = SHEET_PAD + c * (card_w + SHEET_PAD)
+        y = SHEET_PAD + r * (card_h + SHEET_PAD)
+        title = f"Stage {stage}-{idx + 1}"
+        if digests is not None:
+            card = cached_card(data, digests[idx], title, (card_w, card_h))
+        else:
+            card = Image.new("RGB", (card_w, card_h), BG)
+            draw_level(card, data, title)
+        sheet.paste(card, (x, y))
+    return sheet
+
+
+def draw_thumb(data: dict) -> Image.Image:
+    """The level's grid as on its card, scaled to THUMB_CELL pixels per cell."""
+    grid_w, grid_h = grid_size(data)
+    card = Image.new("RGB", card_size(grid_w, grid_h), BG)
+    draw_board(card, data)
+    board = card.crop((PADDING, PADDING, PADDING + grid_w * CELL, PADDING + grid_h * CELL))
+    return board.reduce(CELL // THUMB_CELL)
+
+
+def render_thumbs(stage: int, chunk: list[dict], names: List[str]) -> Tuple[Image.Image, dict]:
+    """One stage's thumbnail atlas and its index; ``names`` are the level file names of ``chunk``."""
+    thumbs = [draw_thumb(data) for data in chunk]
+    slot_w = max([thumb.width for thumb in thumbs] or [GRID_W * THUMB_CELL]) + THUMB_GAP * 2
+    slot_h = max([thumb.height for thumb in thumbs] or [GRID_H * THUMB_CELL]) + THUMB_GAP * 2
+    cols = min(THUMB_COLS, max(1, len(thumbs)))
+    rows = max(1, math.ceil(len(thumbs) / cols))
+    atlas_w = cols * slot_w
+    atlas_h = rows * slot_h
+    atlas = Image.new("RGBA", (atlas_w, atlas_h), (0, 0, 0, 0))
+    levels = []
+    for idx, thumb in enumerate(thumbs):
+        x = (idx % cols) * slot_w + THUMB_GAP
+        y = (idx // cols) * slot_h + THUMB_GAP
+        atlas.paste(thumb, (x, y))
+        levels.append(
+            {
+                "level": (stage - 1) * LEVELS_PER_STAGE + idx + 1,
+                "file": names[idx],
+                "rect": [x, y, thumb.width, thumb.height],
+                "uv": [
+                    round(x / atlas_w, 6),
+                    round(y / atlas_h, 6),
+                    round((x + thumb.width) / atlas_w, 6),
+                    round((y + thumb.height) / atlas_h, 6),
+                ],
+            }
+        )
+    index = {
+        "stage": stage,
+        "size": [atlas_w, atlas_h],
+        "thumb_cell": THUMB_CELL,
+        "rgba8_bytes": atlas_w * atlas_h * 4,
+        "levels": levels,
+    }
+    return atlas, index
+
+
+def thumb_index_path(atlas_path: Path) -> Path:
+    return atlas_path.with_suffix(".json")
+
+
+def _render_stage(task: Tuple[str, int, List[Path], Path]) -> Path:
+    """Draw and save one stage's sheet or thumbnail atlas (runs in a pool process with SHIFTLINE_WORKERS)."""
+    kind, stage, paths, out_path = task
+    chunk = []
+    digests = []
+    for path in paths:
+        raw = path.read_bytes()
+        chunk.append(json.loads(raw))
+        digests.append(hashlib.sha256(raw).hexdigest())
+    if kind == "thumbs":
+        atlas, index = render_thumbs(stage, chunk, [path.name for path in paths])
+        atlas.save(out_path, optimize=True)
+        index["image"] = out_path.name
+        index["png_bytes"] = out_path.stat().st_size
+        with thumb_index_path(out_path).open("w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+            f.write("\n")
+    else:
+        render_sheet(stage, chunk, digests).save(out_path)
+    return out_path
+
+
+def render_stale(workers: int = WORKERS) -> List[Path]:
+    """Redraw the sheets and thumbnail atlases whose level files or sources changed; returns the images written."""
     OUT_DIR.mkdir(parents=True, exist_ok=True)
-    levels = load_levels()
-    total = len(levels)
+    THUMBS_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = BuildManifest("level_sheets")
+    sources = source_digest("render_level_sheets.py")
+    paths = sorted(LEVELS_DIR.glob("level_*.json"))
+    stale: List[Tuple[str, int, List[Path], Path]] = []
+    stale_inputs: Dict[Path, Tuple[str, str]] = {}
     for stage in range(1, STAGE_COUNT + 1):
         start = (stage - 1) * LEVELS_PER_STAGE
-        chunk = levels[start : start + LEVELS_PER_STAGE]
-        sheet_w = SHEET_COLS * CARD_W + (SHEET_COLS + 1) * SHEET_PAD
-        sheet_h = SHEET_ROWS * CARD_H + (SHEET_ROWS + 1) * SHEET_PAD
-        sheet = Image.new("RGB", (sheet_w, sheet_h), BG)
-        for idx, (name, data) in enumerate(chunk):
-            r = idx // SHEET_COLS
-            c = idx % SHEET_COLS
-            x = SHEET_PAD + c * (CARD_W + SHEET_PAD)
-            y = SHEET_PAD + r * (CARD_H + SHEET_PAD)
-            card = Image.new("RGB", (CARD_W, CARD_H), BG)
-            title = f"Stage {stage}-{idx + 1}"
-            draw_level(card, data, title)
-            sheet.paste(card, (x, y))
-        out_path = OUT_DIR / f"stage_{stage:02d}.png"
-        sheet.save(out_path)
-    print(f"Wrote {STAGE_COUNT} sheets to {OUT_DIR}")
+        chunk = paths[start : start + LEVELS_PER_STAGE]
+        for kind, out_dir in (("sheet", OUT_DIR), ("thumbs", THUMBS_DIR)):
+            out_path = out_dir / f"stage_{stage:02d}.png"
+            # Sheets keep their original target names.
+            target = out_path.name if kind == "sheet" else f"{out_dir.name}/{out_path.name}"
+            inputs = inputs_digest({"sources": sources, "stage": stage, "kind": kind}, chunk)
+            if manifest.is_fresh(target, inputs):
+                continue
+            stale.append((kind, stage, chunk, out_path))
+            stale_inputs[out_path] = (target, inputs)
+    if workers > 0 and len(stale) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(_render_stage, stale))
+    else:
+        written = [_render_stage(task) for task in stale]
+    for out_path in written:
+        target, inputs = stale_inputs[out_path]
+        outputs = [out_path, thumb_index_path(out_path)] if out_path.parent == THUMBS_DIR else [out_path]
+        manifest.record(target, inputs, outputs)
+    manifest.save()
+    return written
+
+
+def thumb_stats() -> List[str]:
+    """Size of every thumbnail atlas on disk and once loaded, read from their indexes."""
+    lines = []
+    total_png = total_rgba = 0
+    for path in sorted(THUMBS_DIR.glob("stage_*.json")):
+        with path.open("r", encoding="utf-8") as f:
+            index = json.load(f)
+        width, height = index["size"]
+        total_png += index["png_bytes"]
+        total_rgba += index["rgba8_bytes"]
+        lines.append(
+            f"  {index['image']}: {width}x{height}, {len(index['levels'])} levels, "
+            f"{index['png_bytes'] / 1024:.1f} KiB PNG, {index['rgba8_bytes'] / 1024:.1f} KiB RGBA8"
+        )
+    if lines:
+        lines.append(f"  total: {total_png / 1024:.1f} KiB PNG, {total_rgba / 1024:.1f} KiB RGBA8")
+    return lines
+
+
+def level_mtimes() -> Dict[Path, int]:
+    return {path: path.stat().st_mtime_ns for path in LEVELS_DIR.glob("level_*.json")}
+
+
+def watch() -> None:
+    """Redraw stale sheets every time a level file is added, removed or saved, until interrupted."""
+    print(f"Watching {LEVELS_DIR} (Ctrl+C to stop)")
+    seen: Dict[Path, int] = {}
+    try:
+        while True:
+            try:
+                current = level_mtimes()
+            except FileNotFoundError:
+                # A file was replaced between listing and stat; look again next time.
+                current = seen
+            if current != seen:
+                seen = current
+                start = time.perf_counter()
+                try:
+                    written = render_stale(workers=0)
+                except ValueError as exc:
+                    # Most likely read mid-save; check again on the next pass.
+                    print(f"Could not read the levels yet: {exc}")
+                    seen = {}
+                    written = []
+                if written:
+                    names = ", ".join(str(path.relative_to(ROOT)) for path in written)
+                    print(f"Updated {names} in {(time.perf_counter() - start) * 1000:.0f} ms")
+            time.sleep(WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    if WATCH:
+        watch()
+        return
+    written = render_stale()
+    sheets = sum(path.parent == OUT_DIR for path in written)
+    print(f"Wrote {sheets} of {STAGE_COUNT} sheets to {OUT_DIR}")
+    print(f"Wrote {len(written) - sheets} of {STAGE_COUNT} thumbnail atlases to {THUMBS_DIR}")
+    for line in thumb_stats():
+        print(line)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+"""
+Backward search from a solved board, for building levels at a chosen par.
+
+``backward_layers`` walks Board.predecessors breadth-first from the solved
+state. Reverse moves respect locks: a block on its hole stays put unless the
+move is the one that slid it there. Layer ``d`` therefore holds exactly the
+states whose shortest solution is ``d`` moves, so a start state can be
+picked for a par instead of sampled and rejected.
+
+Layers grow several times over per move on four-block boards. A ``beam``
+keeps a random sample of that many states per layer, which reaches deep
+pars on a fixed budget but turns layer numbers into upper bounds: a pruned
+state may have offered a shorter way back.
+
+With ``strict`` only reverse moves that unlock at most one block are
+followed. Every state found then has a solution that locks blocks one at a
+time, but its par can be shorter than its layer when another path locks two
+blocks together. Either way callers still solve what they pick.
+"""
+from __future__ import annotations
+
+import random
+from typing import List, Optional, Set
+
+from slide_engine import Board, State
+
+
+def _locked_count(board: Board, state: State) -> int:
+    return bin(board.locked(state)).count("1")
+
+
+def backward_layers(
+    board: Board,
+    goal: State,
+    max_depth: int,
+    max_states: int,
+    strict: bool = False,
+    beam: int = 0,
+    rng: Optional[random.Random] = None,
+) -> List[List[State]]:
+    """States by distance to ``goal``, up to ``max_depth`` moves or about ``max_states`` states.
+
+    Layers come out in a fixed order (predecessors in move order, layer by
+    layer), so picking from them with a seeded RNG is reproducible. ``beam``
+    needs ``rng`` to sample with.
+    """
+    layers: List[List[State]] = [[goal]]
+    seen: Set[State] = {goal}
+    while len(layers) <= max_depth and len(seen) <= max_states:
+        nxt: List[State] = []
+        for state in layers[-1]:
+            floor = _locked_count(board, state) - 1
+            for _move_idx, prev in board.predecessors(state):
+                if prev in seen:
+                    continue
+                if strict and _locked_count(board, prev) < floor:
+                    continue
+                seen.add(prev)
+                nxt.append(prev)
+        if not nxt:
+            break
+        if beam and len(nxt) > beam:
+            if rng is None:
+                raise RuntimeError("backward_layers needs an rng to sample a beam")
+            nxt = rng.sample(nxt, beam)
+        layers.append(nxt)
+    return layers
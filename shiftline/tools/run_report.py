@@ -0,0 +1,161 @@
+"""
+Where a generation run's attempts went, as a JSON report.
+
+Usage:
+  SHIFTLINE_REPORT=1 python tools/rebuild_levels_no_bouncers.py
+  SHIFTLINE_PROFILE=1 python tools/dedupe_levels.py
+
+With SHIFTLINE_REPORT=1, ``REPORT`` is a ``RunReport`` and the generators
+count every outcome of their steps (a candidate built, a rejection and its
+reason, a level kept) with the time and search states spent, per target
+label. Each collect_levels pipeline adds its per-stage counts and times. The
+report is written to tools/.reports/<tool>_<time>.json when the run ends,
+including runs that fail, so "Failed to generate ..." can be traced to the
+step that rejected the attempts.
+
+When the report is off ``REPORT`` is None; call sites check that before
+doing anything, so an uninstrumented run pays one comparison per step.
+
+SHIFTLINE_PROFILE=1 runs the tool under cProfile and saves the stats next to
+the report (.prof; read with pstats, or draw a flame graph with snakeviz or
+flameprof). Only the main process is profiled; with SHIFTLINE_WORKERS the
+workers' counters are merged into the report but not profiled.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pipeline import StageStats
+
+
+ENABLED = os.environ.get("SHIFTLINE_REPORT", "0") == "1"
+PROFILE = os.environ.get("SHIFTLINE_PROFILE", "0") == "1"
+REPORTS_DIR = Path(__file__).resolve().parent / ".reports"
+# Target of counts made before any generator names one (e.g. loading levels).
+NO_TARGET = "none"
+# Outcome of a step that passed its item on.
+OK = "ok"
+
+
+@dataclass
+class StepCounters:
+    outcomes: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+    states: int = 0
+
+    def add(self, other: "StepCounters") -> None:
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+        self.seconds += other.seconds
+        self.states += other.states
+
+
+Counters = Dict[Tuple[str, str], StepCounters]
+
+
+class RunReport:
+    def __init__(self) -> None:
+        # Label the generator is currently trying to make; counts go to it.
+        self.target = NO_TARGET
+        self.counters: Counters = {}
+        self.pipelines: List[dict] = []
+        self.started = time.time()
+
+    def _step(self, step: str) -> StepCounters:
+        key = (self.target, step)
+        counters = self.counters.get(key)
+        if counters is None:
+            counters = self.counters[key] = StepCounters()
+        return counters
+
+    def count(self, step: str, outcome: str = OK, seconds: float = 0.0, states: int = 0) -> None:
+        """One item through ``step`` with ``outcome`` (OK or a rejection reason)."""
+        counters = self._step(step)
+        counters.outcomes[outcome] = counters.outcomes.get(outcome, 0) + 1
+        counters.seconds += seconds
+        counters.states += states
+
+    def spend(self, step: str, seconds: float, states: int = 0) -> None:
+        """Time and states spent in ``step`` whose outcomes are counted elsewhere."""
+        counters = self._step(step)
+        counters.seconds += seconds
+        counters.states += states
+
+    def add_pipeline(self, label: str, stats: Dict[str, StageStats]) -> None:
+        self.pipelines.append({"label": label, "stages": {name: asdict(s) for name, s in stats.items()}})
+
+    def take(self) -> Counters:
+        """The counters so far, leaving this report empty (worker processes send them back)."""
+        counters = self.counters
+        self.counters = {}
+        return counters
+
+    def merge(self, counters: Counters) -> None:
+        for key, other in counters.items():
+            mine = self.counters.get(key)
+            if mine is None:
+                mine = self.counters[key] = StepCounters()
+            mine.add(other)
+
+    def to_json(self, tool: str, error: Optional[str] = None) -> dict:
+        targets: Dict[str, Dict[str, dict]] = {}
+        rejects: Dict[str, int] = {}
+        for (target, step), counters in sorted(self.counters.items()):
+            targets.setdefault(target, {})[step] = {
+                "outcomes": dict(sorted(counters.outcomes.items())),
+                "seconds": round(counters.seconds, 6),
+                "states": counters.states,
+            }
+            for outcome, count in counters.outcomes.items():
+                if outcome != OK:
+                    name = f"{step}/{outcome}"
+                    rejects[name] = rejects.get(name, 0) + count
+        return {
+            "tool": tool,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": round(time.time() - self.started, 3),
+            "error": error,
+            "rejects": dict(sorted(rejects.items(), key=lambda item: -item[1])),
+            "targets": targets,
+            "pipelines": self.pipelines,
+        }
+
+
+REPORT: Optional[RunReport] = RunReport() if ENABLED else None
+
+
+def output_path(tool: str, suffix: str) -> Path:
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    return REPORTS_DIR / f"{tool}_{time.strftime('%Y%m%d_%H%M%S')}{suffix}"
+
+
+@contextmanager
+def session(tool: str) -> Iterator[None]:
+    """Run a tool's main() with the report and profiler, if enabled, saving both when it ends."""
+    profiler = cProfile.Profile() if PROFILE else None
+    error: Optional[str] = None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    except BaseException as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            path = output_path(tool, ".prof")
+            profiler.dump_stats(str(path))
+            print(f"Profile: {path}")
+        if REPORT is not None:
+            path = output_path(tool, ".json")
+            with path.open("w", encoding="utf-8") as f:
+                json.dump(REPORT.to_json(tool, error), f, indent=2)
+            print(f"Run report: {path}")
@@ -0,0 +1,203 @@
+"""
+Near-duplicate detection for levels: MinHash sketches plus LSH bucketing.
+
+symmetry.canonical_key only folds exact rotations and reflections. Here a
+level becomes a set of shingles that ignore position, orientation and color
+names:
+
+* the 3x3 neighbourhood (empty, wall or board edge, hole or block) around
+  every wall, hole and block, reduced to its smallest D4 image;
+* for every block and hole of the same color, their axis distances and how
+  many walls lie between them when they share a line;
+* trigrams of the solution's move shape: whether each move stays on the
+  previous axis, keeps its direction and how far the line index jumps.
+
+Repeated shingles are numbered, so the sets behave like multisets. A level
+that gains a stray wall, swaps colors or shifts a corridor keeps most of its
+shingles. ``NearDuplicateIndex`` keeps NUM_HASHES MinHash values per level
+and buckets them in BANDS bands; only levels sharing a bucket are compared,
+so lookups stay sub-linear as the pool grows.
+"""
+from __future__ import annotations
+
+import random
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from slide_engine import HEIGHT, WIDTH, Move
+
+
+NUM_HASHES = 72
+BANDS = 12
+THRESHOLD = 0.85
+SKETCH_SEED = 0x5EED
+
+Pos = Tuple[int, int]
+Sketch = Tuple[int, ...]
+T = TypeVar("T")
+
+_PRIME = (1 << 61) - 1
+_EMPTY, _WALL, _PIECE = 0, 1, 2
+_KIND_WALL, _KIND_HOLE, _KIND_BLOCK, _KIND_PAIR, _KIND_MOVES = range(5)
+
+# Cell order of each D4 image of a 3x3 window (row-major indexes).
+_WINDOW_IMAGES: List[Tuple[int, ...]] = []
+for _variant in range(8):
+    _order = []
+    for _y in range(3):
+        for _x in range(3):
+            _sx, _sy = (
+                (_x, _y),
+                (_y, 2 - _x),
+                (2 - _x, 2 - _y),
+                (2 - _y, _x),
+                (2 - _x, _y),
+                (_x, 2 - _y),
+                (_y, _x),
+                (2 - _y, 2 - _x),
+            )[_variant]
+            _order.append(_sy * 3 + _sx)
+    _WINDOW_IMAGES.append(tuple(_order))
+
+_WINDOW_CACHE: Dict[Tuple[int, ...], int] = {}
+
+
+def _window_code(cells: Tuple[int, ...]) -> int:
+    code = _WINDOW_CACHE.get(cells)
+    if code is None:
+        code = min(sum(cells[i] * 3**n for n, i in enumerate(order)) for order in _WINDOW_IMAGES)
+        _WINDOW_CACHE[cells] = code
+    return code
+
+
+def _move_shape(moves: Sequence[Move]) -> List[Tuple[int, int, int]]:
+    shape = []
+    for (prev_row, prev_index, prev_dir), (is_row, index, direction) in zip(moves, moves[1:]):
+        if is_row == prev_row:
+            shape.append((1, int(direction == prev_dir), min(abs(index - prev_index), 3)))
+        else:
+            shape.append((0, 0, 0))
+    return shape
+
+
+def level_shingles(
+    walls: Iterable[Pos],
+    holes: Dict[Pos, int],
+    blocks: Dict[Pos, int],
+    solution: Optional[Sequence[Move]] = None,
+    width: int = WIDTH,
+    height: int = HEIGHT,
+) -> Set[Tuple[int, ...]]:
+    wall_set = set(walls)
+    state: Dict[Pos, int] = {pos: _WALL for pos in wall_set}
+    for pos in holes:
+        state[pos] = _PIECE
+    for pos in blocks:
+        state[pos] = _PIECE
+
+    counts: Dict[Tuple[int, ...], int] = {}
+    out: Set[Tuple[int, ...]] = set()
+
+    def add(shingle: Tuple[int, ...]) -> None:
+        seen = counts.get(shingle, 0)
+        counts[shingle] = seen + 1
+        out.add(shingle + (seen,))
+
+    centers = [(pos, _KIND_WALL) for pos in wall_set]
+    centers += [(pos, _KIND_HOLE) for pos in holes]
+    centers += [(pos, _KIND_BLOCK) for pos in blocks]
+    for (cx, cy), kind in centers:
+        cells = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                x, y = cx + dx, cy + dy
+                if not (0 <= x < width and 0 <= y < height):
+                    cells.append(_WALL)
+                else:
+                    cells.append(state.get((x, y), _EMPTY))
+        add((kind, _window_code(tuple(cells))))
+
+    for (bx, by), color in blocks.items():
+        for (hx, hy), hole_color in holes.items():
+            if hole_color != color:
+                continue
+            dx, dy = abs(hx - bx), abs(hy - by)
+            between = -1
+            if bx == hx:
+                between = sum(1 for y in range(min(by, hy) + 1, max(by, hy)) if (bx, y) in wall_set)
+            elif by == hy:
+                between = sum(1 for x in range(min(bx, hx) + 1, max(bx, hx)) if (x, by) in wall_set)
+            add((_KIND_PAIR, min(dx, dy), max(dx, dy), between))
+
+    if solution:
+        shape = _move_shape(solution)
+        for i in range(max(0, len(shape) - 2)):
+            add((_KIND_MOVES,) + shape[i] + shape[i + 1] + shape[i + 2])
+    return out
+
+
+class NearDuplicateIndex(Generic[T]):
+    """MinHash/LSH index: ``find`` returns the earliest indexed item at least ``threshold`` similar."""
+
+    def __init__(
+        self,
+        threshold: float = THRESHOLD,
+        num_hashes: int = NUM_HASHES,
+        bands: int = BANDS,
+        seed: int = SKETCH_SEED,
+    ) -> None:
+        if num_hashes % bands:
+            raise RuntimeError(f"{num_hashes} hashes do not split into {bands} bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_hashes // bands
+        rng = random.Random(seed)
+        self._params = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(num_hashes)]
+        self._rows: Dict[Tuple[int, ...], Sketch] = {}
+        self._buckets: Dict[Tuple[int, Sketch], List[int]] = {}
+        self._sketches: List[Sketch] = []
+        self._items: List[T] = []
+        self.compared = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def sketch(self, shingles: Set[Tuple[int, ...]]) -> Sketch:
+        # The shingle vocabulary is small, so each shingle's hash row is
+        # computed once and a sketch is a column-wise minimum.
+        rows = []
+        for shingle in shingles:
+            row = self._rows.get(shingle)
+            if row is None:
+                value = hash(shingle) & 0xFFFFFFFFFFFFFFFF
+                row = tuple((a * value + b) % _PRIME for a, b in self._params)
+                self._rows[shingle] = row
+            rows.append(row)
+        if not rows:
+            return tuple(b % _PRIME for _a, b in self._params)
+        return tuple(map(min, *rows)) if len(rows) > 1 else rows[0]
+
+    def _bands(self, sketch: Sketch) -> List[Tuple[int, Sketch]]:
+        rows = self.rows
+        return [(band, sketch[band * rows : (band + 1) * rows]) for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(a: Sketch, b: Sketch) -> float:
+        """Estimated Jaccard similarity of the shingle sets behind two sketches."""
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+    def find(self, sketch: Sketch) -> Optional[T]:
+        candidates: Set[int] = set()
+        for bucket in self._bands(sketch):
+            candidates.update(self._buckets.get(bucket, ()))
+        for index in sorted(candidates):
+            self.compared += 1
+            if self.similarity(sketch, self._sketches[index]) >= self.threshold:
+                return self._items[index]
+        return None
+
+    def add(self, sketch: Sketch, item: T) -> None:
+        index = len(self._items)
+        self._sketches.append(sketch)
+        self._items.append(item)
+        for bucket in self._bands(sketch):
+            self._buckets.setdefault(bucket, []).append(index)
@@ -0,0 +1,483 @@
+"""
+Bitboard slide engine for the Shiftline solver.
+
+A board is stored as a static wall mask, one hole mask per color and one
+block mask per color. Bit ``y * width + x`` is cell (x, y). Row and column
+slides are done with shift/mask arithmetic and give exactly the same results
+as ``rebuild_levels_no_bouncers.slide_grid``.
+
+A state is a tuple of block masks ordered like ``Board.colors``; tuples of
+ints hash quickly and can be used directly as visited-set keys. For large
+searches ``Board.pack`` squeezes a state into one fixed-width integer (the
+cell index of every block, color by color) that fits an ``array('Q')`` slot.
+
+Single-line slides are memoized in a ``LineTable`` shared by all boards of the
+same size, so most moves in a search are a dict lookup.
+"""
+from __future__ import annotations
+
+import sys
+from itertools import combinations, product
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+WIDTH = 8
+HEIGHT = 8
+# Bump whenever slide or lock rules change; cached analyses stamped with an
+# older version are discarded (see analysis_cache).
+ENGINE_VERSION = 1
+
+State = Tuple[int, ...]
+Move = Tuple[bool, int, int]
+
+
+class Board:
+    """Static part of a level (walls, holes) plus slide helpers for its states."""
+
+    # Slides stop only at obstacles and the board edge. StopMap and
+    # predecessors rely on it; bouncer_engine.BouncerBoard may clear it.
+    plain_slides = True
+
+    def __init__(
+        self,
+        walls: Set[Tuple[int, int]],
+        holes: Dict[Tuple[int, int], int],
+        colors: Iterable[int] = (),
+        width: int = WIDTH,
+        height: int = HEIGHT,
+    ) -> None:
+        # ``colors`` lists the color of every block (e.g. blocks.values()).
+        block_colors = list(colors)
+        self.width = width
+        self.height = height
+        self.colors: Tuple[int, ...] = tuple(sorted(set(block_colors) | set(holes.values())))
+        self.color_index = {color: i for i, color in enumerate(self.colors)}
+        self.block_counts: Tuple[int, ...] = tuple(block_colors.count(color) for color in self.colors)
+        self.cell_bits = max(1, (width * height - 1).bit_length())
+        self.key_bits = self.cell_bits * len(block_colors)
+        # With at most one block per color every color owns a fixed field of
+        # the packed key, so successor keys can be patched instead of repacked.
+        self._key_shifts: Optional[Tuple[int, ...]] = None
+        if all(count <= 1 for count in self.block_counts):
+            shifts = []
+            after = sum(self.block_counts)
+            for count in self.block_counts:
+                after -= count
+                shifts.append(after * self.cell_bits)
+            self._key_shifts = tuple(shifts)
+        self.wall_mask = 0
+        for x, y in walls:
+            if 0 <= x < width and 0 <= y < height:
+                self.wall_mask |= self.bit(x, y)
+        hole_masks = [0] * len(self.colors)
+        for (x, y), color in holes.items():
+            hole_masks[self.color_index[color]] |= self.bit(x, y)
+        self.hole_masks: Tuple[int, ...] = tuple(hole_masks)
+        self.hole_mask = 0
+        for mask in hole_masks:
+            self.hole_mask |= mask
+
+        row = (1 << width) - 1
+        self.row_masks = tuple(row << (y * width) for y in range(height))
+        col = 0
+        for y in range(height):
+            col |= 1 << (y * width)
+        self.col_masks = tuple(col << x for x in range(width))
+
+        # Rows, then columns, each index, direction -1 before +1: the order
+        # analyze_level has always expanded moves in, so BFS paths are stable.
+        self.moves: List[Move] = [
+            (is_row, index, direction)
+            for is_row in (True, False)
+            for index in range(height if is_row else width)
+            for direction in (-1, 1)
+        ]
+        # (line mask, bit distance between neighbouring cells, first cell,
+        # last cell) per line, in the same order as ``moves``.
+        self._move_index = {move: i for i, move in enumerate(self.moves)}
+        self.line_table = line_table(width, height)
+        self._lines = [
+            (line, step, line & -line, 1 << (line.bit_length() - 1))
+            for line, step in [(mask, 1) for mask in self.row_masks] + [(mask, width) for mask in self.col_masks]
+        ]
+        # Cell bits of every line from first to last, for reverse slides.
+        self._line_cells = [
+            tuple(1 << i for i in range(line.bit_length()) if line >> i & 1) for line, _step, _first, _last in self._lines
+        ]
+
+    def bit(self, x: int, y: int) -> int:
+        return 1 << (y * self.width + x)
+
+    def encode(self, blocks: Dict[Tuple[int, int], int]) -> State:
+        masks = [0] * len(self.colors)
+        for (x, y), color in blocks.items():
+            masks[self.color_index[color]] |= self.bit(x, y)
+        return tuple(masks)
+
+    def decode(self, state: State) -> Dict[Tuple[int, int], int]:
+        out: Dict[Tuple[int, int], int] = {}
+        for color, mask in zip(self.colors, state):
+            while mask:
+                low = mask & -mask
+                idx = low.bit_length() - 1
+                out[(idx % self.width, idx // self.width)] = color
+                mask ^= low
+        return out
+
+    def encode_grid(self, grid: Tuple[int, ...]) -> State:
+        masks = [0] * len(self.colors)
+        for idx, color in enumerate(grid):
+            if color != -1:
+                masks[self.color_index[color]] |= 1 << idx
+        return tuple(masks)
+
+    def decode_grid(self, state: State) -> Tuple[int, ...]:
+        grid = [-1] * (self.width * self.height)
+        for color, mask in zip(self.colors, state):
+            while mask:
+                low = mask & -mask
+                grid[low.bit_length() - 1] = color
+                mask ^= low
+        return tuple(grid)
+
+    def pack(self, state: State) -> int:
+        """Pack a state into ``key_bits`` bits: block cell indexes, color by color, ascending."""
+        bits = self.cell_bits
+        key = 0
+        for mask in state:
+            if not mask & (mask - 1):
+                # zero or one block of this color (the common case)
+                if mask:
+                    key = key << bits | (mask.bit_length() - 1)
+                continue
+            while mask:
+                low = mask & -mask
+                key = key << bits | (low.bit_length() - 1)
+                mask ^= low
+        return key
+
+    def unpack(self, key: int) -> State:
+        bits = self.cell_bits
+        cell = (1 << bits) - 1
+        masks = [0] * len(self.colors)
+        for i in range(len(self.colors) - 1, -1, -1):
+            for _ in range(self.block_counts[i]):
+                masks[i] |= 1 << (key & cell)
+                key >>= bits
+        return tuple(masks)
+
+    def occupied(self, state: State) -> int:
+        out = 0
+        for mask in state:
+            out |= mask
+        return out
+
+    def locked(self, state: State) -> int:
+        out = 0
+        for mask, hole in zip(state, self.hole_masks):
+            out |= mask & hole
+        return out
+
+    def is_solved(self, state: State) -> bool:
+        for mask, hole in zip(state, self.hole_masks):
+            if mask & hole != hole:
+                return False
+        return True
+
+    def slide(self, state: State, is_row: bool, index: int, direction: int) -> Tuple[State, bool]:
+        if index < 0 or index >= (self.height if is_row else self.width):
+            return state, False
+        move_idx = self._move_index[(is_row, index, 1 if direction > 0 else -1)]
+        line = self._lines[move_idx // 2][0]
+        occupied = self.occupied(state)
+        movable = occupied & ~self.locked(state) & line
+        if not movable:
+            return state, False
+        steps = self.line_table.lookup(self, move_idx, movable, (occupied | self.wall_mask) & line)
+        if not steps:
+            return state, False
+        return self._apply(state, steps), True
+
+    def successors(self, state: State) -> List[Tuple[int, State]]:
+        """Return (move index, next state) for every move that changes the board, in move order."""
+        occupied = self.occupied(state)
+        movable_all = occupied & ~self.locked(state)
+        blocked_all = occupied | self.wall_mask
+        table = self.line_table
+        entries = table.entries
+        apply = self._apply
+        out: List[Tuple[int, State]] = []
+        lookups = 0
+        move_idx = 0
+        for line, _step, _first, _last in self._lines:
+            movable = movable_all & line
+            if movable:
+                blocked = blocked_all & line
+                lookups += 2
+                for idx in (move_idx, move_idx + 1):
+                    steps = entries.get((idx, movable, blocked))
+                    if steps is None:
+                        steps = table.compute(self, idx, movable, blocked)
+                    if steps:
+                        out.append((idx, apply(state, steps)))
+            move_idx += 2
+        table.lookups += lookups
+        return out
+
+    def successor_keys(self, state: State, key: int) -> List[Tuple[int, int]]:
+        """Like ``successors`` but returns packed keys; ``key`` is ``pack(state)``."""
+        shifts = self._key_shifts
+        if shifts is None:
+            pack = self.pack
+            return [(move_idx, pack(nxt)) for move_idx, nxt in self.successors(state)]
+        occupied = self.occupied(state)
+        movable_all = occupied & ~self.locked(state)
+        blocked_all = occupied | self.wall_mask
+        table = self.line_table
+        entries = table.entries
+        out: List[Tuple[int, int]] = []
+        lookups = 0
+        move_idx = 0
+        for line, _step, _first, _last in self._lines:
+            movable = movable_all & line
+            if movable:
+                blocked = blocked_all & line
+                lookups += 2
+                for idx in (move_idx, move_idx + 1):
+                    steps = entries.get((idx, movable, blocked))
+                    if steps is None:
+                        steps = table.compute(self, idx, movable, blocked)
+                    if not steps:
+                        continue
+                    delta = 0
+                    for src, dest in steps:
+                        for i, mask in enumerate(state):
+                            if mask & src:
+                                delta += (dest.bit_length() - src.bit_length()) << shifts[i]
+                                break
+                    out.append((idx, key + delta))
+            move_idx += 2
+        table.lookups += lookups
+        return out
+
+    def predecessors(self, state: State) -> List[Tuple[int, State]]:
+        """Return (move index, previous state) for every state that ``move index`` turns into ``state``.
+
+        The reverse of ``successors``, in move order. A block sitting on its
+        hole in ``state`` was either locked before the move (and stopped the
+        others like a wall) or has just slid onto it; every subset of the
+        locked blocks in the line is tried as the already-locked set and a
+        previous state is kept only when exactly that subset is locked in it.
+        """
+        occupied = self.occupied(state)
+        locked = self.locked(state)
+        walls = self.wall_mask
+        table = self.line_table
+        apply = self._apply
+        out: List[Tuple[int, State]] = []
+        move_idx = 0
+        for line, _step, _first, _last in self._lines:
+            blocks = occupied & line
+            if blocks:
+                locked_line = locked & line
+                for idx in (move_idx, move_idx + 1):
+                    already = locked_line
+                    while True:
+                        movable = blocks & ~already
+                        if movable:
+                            for steps in table.reverse_lookup(self, idx, movable, (walls | already) & line):
+                                prev = apply(state, steps)
+                                if self.locked(prev) & line == already:
+                                    out.append((idx, prev))
+                        if not already:
+                            break
+                        already = (already - 1) & locked_line
+            move_idx += 2
+        return out
+
+    def _apply(self, state: State, steps: Tuple[Tuple[int, int], ...]) -> State:
+        masks = list(state)
+        for src, dest in steps:
+            for i, mask in enumerate(masks):
+                if mask & src:
+                    masks[i] = mask ^ src | dest
+                    break
+        return tuple(masks)
+
+    def line_steps(self, move_idx: int, movable: int, blocked: int) -> Tuple[Tuple[int, int], ...]:
+        """(source bit, destination bit) for every block that moves when ``move_idx`` is played.
+
+        Only the cells of the move's line matter: ``movable`` holds its
+        unlocked blocks and ``blocked`` its walls and blocks (locked or not).
+        """
+        line, step, first, last = self._lines[move_idx // 2]
+        positive = bool(move_idx & 1)
+        end = last if positive else first
+        # Blocks are moved one at a time starting from the slide end, exactly
+        # like slide_grid, but each block finds its stop with a single mask
+        # lookup: the nearest blocked cell ahead of it in the line. ``end`` is
+        # where a block stops when nothing is ahead of it.
+        out: List[Tuple[int, int]] = []
+        while movable:
+            if positive:
+                src = 1 << (movable.bit_length() - 1)
+                blocked ^= src
+                ahead = blocked & -(src << 1)
+                dest = (ahead & -ahead) >> step if ahead else end
+            else:
+                src = movable & -movable
+                blocked ^= src
+                ahead = blocked & (src - 1)
+                dest = 1 << (ahead.bit_length() - 1 + step) if ahead else end
+            movable ^= src
+            blocked |= dest
+            if dest != src:
+                out.append((src, dest))
+        return tuple(out)
+
+    def line_unsteps(self, move_idx: int, movable: int, fixed: int) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+        """Every placement of ``movable`` that ``move_idx`` slides into its current cells.
+
+        ``fixed`` holds the line's walls and locked blocks. Each placement is
+        a tuple of (current bit, earlier bit) steps for the blocks that moved,
+        ordered so ``_apply`` never lands a block on one still to be moved.
+        The move packs movable blocks against the slide end of each run
+        between fixed cells, so there are no placements unless they already
+        are; otherwise any order-preserving spread over the run qualifies.
+        """
+        cells = self._line_cells[move_idx // 2]
+        if not move_idx & 1:
+            cells = cells[::-1]
+        # ``cells`` now runs from the start of the slide to its end.
+        runs: List[List[int]] = []
+        run: List[int] = []
+        for cell in cells:
+            if cell & fixed:
+                if run:
+                    runs.append(run)
+                    run = []
+            else:
+                run.append(cell)
+        if run:
+            runs.append(run)
+
+        choices: List[List[Tuple[Tuple[int, int], ...]]] = []
+        for run in runs:
+            count = sum(1 for cell in run if cell & movable)
+            if not count:
+                continue
+            now = run[len(run) - count:]
+            if any(not cell & movable for cell in now):
+                return ()
+            choices.append([
+                tuple((src, run[i]) for src, i in zip(now, picked) if src != run[i])
+                for picked in combinations(range(len(run)), count)
+            ])
+        out: List[Tuple[Tuple[int, int], ...]] = []
+        for picked_runs in product(*choices):
+            steps = tuple(step for run_steps in picked_runs for step in run_steps)
+            if steps:
+                out.append(steps)
+        return tuple(out)
+
+
+class LineTable:
+    """Memo of single-line slides shared by every board of one size.
+
+    A slide only depends on its line: which cells hold unlocked blocks and
+    which are blocked by walls or blocks. Colors and holes do not matter, so
+    entries keyed by (move index, movable cells, blocked cells) are reused
+    across states, searches and candidates with the same wall layout. For an
+    8x8 board there are at most 32 * 3**8 keys; ``max_entries`` caps larger
+    boards.
+
+    Reverse slides (``Board.line_unsteps``) are memoized the same way in
+    ``reverse_entries``, keyed by (move index, movable cells, fixed cells).
+    """
+
+    def __init__(self, max_entries: int = 1 << 20) -> None:
+        self.entries: Dict[Tuple[int, int, int], Tuple[Tuple[int, int], ...]] = {}
+        self.reverse_entries: Dict[Tuple[int, int, int], Tuple[Tuple[Tuple[int, int], ...], ...]] = {}
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.misses = 0
+
+    def lookup(self, board: Board, move_idx: int, movable: int, blocked: int) -> Tuple[Tuple[int, int], ...]:
+        self.lookups += 1
+        steps = self.entries.get((move_idx, movable, blocked))
+        if steps is None:
+            steps = self.compute(board, move_idx, movable, blocked)
+        return steps
+
+    def compute(self, board: Board, move_idx: int, movable: int, blocked: int) -> Tuple[Tuple[int, int], ...]:
+        self.misses += 1
+        steps = board.line_steps(move_idx, movable, blocked)
+        if len(self.entries) < self.max_entries:
+            self.entries[(move_idx, movable, blocked)] = steps
+        return steps
+
+    def reverse_lookup(
+        self, board: Board, move_idx: int, movable: int, fixed: int
+    ) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+        key = (move_idx, movable, fixed)
+        placements = self.reverse_entries.get(key)
+        if placements is None:
+            placements = board.line_unsteps(move_idx, movable, fixed)
+            if len(self.reverse_entries) < self.max_entries:
+                self.reverse_entries[key] = placements
+        return placements
+
+    @property
+    def hits(self) -> int:
+        return self.lookups - self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def memory_bytes(self) -> int:
+        """Approximate heap size of the table: dict, key tuples, step tuples and their ints."""
+        total = sys.getsizeof(self.entries)
+        for key, steps in self.entries.items():
+            total += sys.getsizeof(key) + sum(sys.getsizeof(v) for v in key)
+            total += sys.getsizeof(steps)
+            for pair in steps:
+                total += sys.getsizeof(pair) + sys.getsizeof(pair[0]) + sys.getsizeof(pair[1])
+        total += sys.getsizeof(self.reverse_entries)
+        for key, placements in self.reverse_entries.items():
+            total += sys.getsizeof(key) + sum(sys.getsizeof(v) for v in key)
+            total += sys.getsizeof(placements)
+            for steps in placements:
+                total += sys.getsizeof(steps)
+                for pair in steps:
+                    total += sys.getsizeof(pair) + sys.getsizeof(pair[0]) + sys.getsizeof(pair[1])
+        return total
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self.entries),
+            "reverse_entries": len(self.reverse_entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.reverse_entries.clear()
+        self.lookups = 0
+        self.misses = 0
+
+
+_LINE_TABLES: Dict[Tuple[int, int], LineTable] = {}
+
+
+def line_table(width: int = WIDTH, height: int = HEIGHT) -> LineTable:
+    """Shared LineTable for boards of the given size."""
+    table = _LINE_TABLES.get((width, height))
+    if table is None:
+        table = LineTable()
+        _LINE_TABLES[(width, height)] = table
+    return table
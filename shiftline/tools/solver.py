@@ -0,0 +1,591 @@
+"""
+Search routines over slide_engine boards.
+
+Searches return the solution as a list of move indexes into ``Board.moves``
+(or None) and fill an optional ``SearchStats`` so callers can size runs.
+Every search returns the same path for a solvable start: the first shortest
+solution in move order, which is what the forward BFS finds. With ``prune``
+states ``reachability.StopMap`` proves dead are not expanded; no solution
+passes through them, so results are unchanged. It is off by default: the
+shipped and generated levels reach few dead states (about 0.1% of
+expansions), less than the check costs per state, so the generators only
+use StopMap to reject dead candidates before searching (is_hopeless).
+StopMap and ``Board.predecessors`` assume straight slides, so boards with
+bouncers (``plain_slides`` false) are never pruned and bidirectional runs
+as bfs.
+
+With ``max_depth`` a search gives up as soon as it has proved par exceeds
+it, which is all a caller that only wants short solutions needs to know.
+It then returns None with ``SearchStats.aborted`` set, a lower bound on par
+in ``lower_bound`` and, where it can tell, how many expansions the unbounded
+search would still have done at the least in ``saved``. Solutions within the
+bound are found exactly as without one.
+
+``peak_memory_bytes`` is exact for the store-backed bfs and bidirectional.
+astar and ida_star keep their states in dicts; for them it is an estimate
+from sys.getsizeof of the g-score table, the open heap at its largest and
+the depth-first pass's seen table and path stack (see _table_bytes), an
+upper bound since those peaks need not coincide.
+"""
+from __future__ import annotations
+
+import heapq
+import sys
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from reachability import StopMap
+from slide_engine import Board, State
+from state_store import new_store
+
+
+@dataclass
+class SearchStats:
+    states: int = 0
+    expanded: int = 0
+    peak_memory_bytes: int = 0
+    capped: bool = False
+    forward_expanded: int = 0
+    backward_expanded: int = 0
+    pruned: int = 0
+    # Searches stopped by ``max_depth`` (0 or 1 for a single search).
+    aborted: int = 0
+    # Par is at least this: the par itself when solved, 0 when nothing is known.
+    lower_bound: int = 0
+    saved: int = 0
+
+    def add(self, other: "SearchStats") -> None:
+        """Accumulate another search into running totals."""
+        self.states += other.states
+        self.expanded += other.expanded
+        self.peak_memory_bytes = max(self.peak_memory_bytes, other.peak_memory_bytes)
+        self.capped = self.capped or other.capped
+        self.forward_expanded += other.forward_expanded
+        self.backward_expanded += other.backward_expanded
+        self.pruned += other.pruned
+        self.aborted += other.aborted
+        self.saved += other.saved
+
+
+def bfs(
+    board: Board,
+    start: State,
+    max_states: int,
+    stats: Optional[SearchStats] = None,
+    prune: bool = False,
+    max_depth: Optional[int] = None,
+) -> Optional[List[int]]:
+    """Shortest solution from ``start``, or None if unsolvable or ``max_states`` is reached."""
+    stop_map = StopMap(board) if prune and board.plain_slides else None
+    store = new_store(board.key_bits)
+    store.add(board.pack(start))
+    keys = store.keys
+    add = store.add
+    unpack = board.unpack
+    successor_keys = board.successor_keys
+    is_solved = board.is_solved
+
+    solution: Optional[int] = None
+    capped = False
+    expanded = 0
+    depth = 0
+    layer_end = 1
+    # States at max_depth are still checked for a solve but not expanded.
+    held = 0
+    while expanded < len(keys):
+        index = expanded
+        if index == layer_end:
+            depth += 1
+            layer_end = len(keys)
+        key = keys[index]
+        state = unpack(key)
+        expanded += 1
+        if is_solved(state):
+            solution = index
+            break
+        if stop_map is not None and stop_map.is_dead(state):
+            continue
+        if max_depth is not None and depth >= max_depth:
+            held += 1
+            continue
+        for move_idx, nxt in successor_keys(state, key):
+            if add(nxt, index, move_idx) < 0:
+                continue
+            if len(keys) >= max_states:
+                capped = True
+                break
+        if capped:
+            break
+
+    aborted = solution is None and not capped and held > 0
+    if stats is not None:
+        stats.states = len(store)
+        stats.expanded = expanded - held
+        stats.forward_expanded = expanded - held
+        stats.peak_memory_bytes = store.note_peak()
+        stats.capped = capped
+        stats.pruned = stop_map.pruned if stop_map is not None else 0
+        stats.aborted = int(aborted)
+        stats.saved = held if aborted else 0
+        if solution is not None:
+            stats.lower_bound = depth
+        elif aborted and max_depth is not None:
+            stats.lower_bound = max_depth + 1
+    if solution is None:
+        return None
+    return store.path(solution)
+
+
+def bidirectional(
+    board: Board,
+    start: State,
+    max_states: int,
+    stats: Optional[SearchStats] = None,
+    prune: bool = False,
+    max_depth: Optional[int] = None,
+) -> Optional[List[int]]:
+    """Shortest solution from ``start`` found by meeting a forward and a backward BFS.
+
+    The backward search starts from the solved state and uses
+    ``Board.predecessors``; whole layers are expanded on whichever side has
+    the smaller frontier, and ``max_states`` caps both stores together. A
+    single solved state needs as many blocks as holes of every color; other
+    boards, and boards with bouncers, fall back to ``bfs``. Only the forward side is pruned: every
+    state the backward side finds can reach the goal. Once the two sides
+    have covered ``max_depth`` layers between them without meeting, par is
+    longer and the search stops.
+    """
+    hole_counts = tuple(bin(mask).count("1") for mask in board.hole_masks)
+    if hole_counts != board.block_counts or not board.plain_slides:
+        return bfs(board, start, max_states, stats, prune, max_depth)
+
+    stop_map = StopMap(board) if prune and board.plain_slides else None
+
+    forward = new_store(board.key_bits)
+    backward = new_store(board.key_bits)
+    forward.add(board.pack(start))
+    backward.add(board.pack(board.hole_masks))
+    # Layer d of a store holds keys[layers[d]:layers[d + 1]].
+    forward_layers = [0, 1]
+    backward_layers = [0, 1]
+    unpack = board.unpack
+    pack = board.pack
+    successor_keys = board.successor_keys
+    predecessors = board.predecessors
+
+    meet: Set[int] = set(forward.keys) & set(backward.keys)
+    capped = False
+    aborted = False
+    forward_expanded = 0
+    backward_expanded = 0
+    while not meet and not capped:
+        forward_size = forward_layers[-1] - forward_layers[-2]
+        backward_size = backward_layers[-1] - backward_layers[-2]
+        if not forward_size or not backward_size:
+            break
+        covered = len(forward_layers) + len(backward_layers) - 4
+        if max_depth is not None and covered >= max_depth:
+            # No state within ``covered`` moves of both ends: par is longer.
+            aborted = True
+            break
+        if forward_size <= backward_size:
+            store, other, layers = forward, backward, forward_layers
+        else:
+            store, other, layers = backward, forward, backward_layers
+        keys = store.keys
+        add = store.add
+        for index in range(layers[-2], layers[-1]):
+            key = keys[index]
+            state = unpack(key)
+            if store is forward:
+                if stop_map is not None and stop_map.is_dead(state):
+                    continue
+                forward_expanded += 1
+                found = successor_keys(state, key)
+            else:
+                backward_expanded += 1
+                found = [(move_idx, pack(prev)) for move_idx, prev in predecessors(state)]
+            for move_idx, nxt in found:
+                if add(nxt, index, move_idx) >= 0 and len(forward) + len(backward) >= max_states:
+                    capped = True
+                    break
+            if capped:
+                break
+        if capped:
+            break
+        meet = {key for key in keys[layers[-1]:] if key in other}
+        layers.append(len(keys))
+
+    if stats is not None:
+        stats.states = len(forward) + len(backward)
+        stats.expanded = forward_expanded + backward_expanded
+        stats.forward_expanded = forward_expanded
+        stats.backward_expanded = backward_expanded
+        stats.peak_memory_bytes = forward.note_peak() + backward.note_peak()
+        stats.capped = capped
+        stats.pruned = stop_map.pruned if stop_map is not None else 0
+        stats.aborted = int(aborted)
+        if meet or aborted:
+            stats.lower_bound = len(forward_layers) + len(backward_layers) - 4 + int(aborted)
+        # The unbounded search would have expanded at least the smaller frontier next.
+        stats.saved = min(forward_size, backward_size) if aborted else 0
+    if not meet:
+        return None
+
+    # Every meeting state lies in the last forward and last backward layer.
+    # Forward BFS numbers a layer in move order of the paths reaching it, so
+    # the first meeting state there carries the prefix of the path ``bfs``
+    # would return; the rest is the first shortest way on to the goal, taken
+    # greedily through the backward layers.
+    index = next(i for i in range(forward_layers[-2], forward_layers[-1]) if forward.keys[i] in meet)
+    path = forward.path(index)
+    key = forward.keys[index]
+    for depth in range(len(backward_layers) - 2, 0, -1):
+        closer = set(backward.keys[backward_layers[depth - 1]:backward_layers[depth]])
+        for move_idx, nxt in successor_keys(unpack(key), key):
+            if nxt in closer:
+                path.append(move_idx)
+                key = nxt
+                break
+    return path
+
+
+# Heuristic value of a state no sequence of moves can solve.
+UNREACHABLE = 1 << 16
+
+
+class Heuristic:
+    """Admissible and consistent lower bound on the moves left from a state.
+
+    Two bounds, of which the larger is used:
+
+    * Block distance: every open hole needs an unlocked block of its color
+      to arrive, and one move carries a block along one line. The fewest
+      straight runs between walls from any such block to the hole (blocks
+      ignored, so it can only underestimate) is precomputed per hole.
+    * Line cover: the move that locks a hole runs along its row or column,
+      and one move only uses one line, so it takes at least as many moves as
+      the smallest set of rows and columns covering the open holes (a
+      bipartite matching by Konig's theorem).
+
+    A move changes each bound by at most one, so searches can close states
+    as soon as they are expanded. With a ``StopMap``, dead states score
+    UNREACHABLE.
+    """
+
+    def __init__(self, board: Board, stop_map: Optional[StopMap] = None) -> None:
+        self.board = board
+        self.stop_map = stop_map
+        self.hole_masks = board.hole_masks
+        # Per color: (hole bit, moves from every cell to that hole).
+        self._distances: List[List[Tuple[int, List[int]]]] = []
+        for holes in board.hole_masks:
+            tables = []
+            while holes:
+                low = holes & -holes
+                tables.append((low, self._rook_distances(low.bit_length() - 1)))
+                holes ^= low
+            self._distances.append(tables)
+        self._covers: Dict[int, int] = {}
+
+    def _rook_distances(self, target: int) -> List[int]:
+        board = self.board
+        width = board.width
+        cells = width * board.height
+        dist = [UNREACHABLE] * cells
+        dist[target] = 0
+        frontier = [target]
+        while frontier:
+            nxt = []
+            for idx in frontier:
+                x, y = idx % width, idx // width
+                for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                    cx, cy = x + dx, y + dy
+                    while 0 <= cx < width and 0 <= cy < board.height:
+                        cell = cy * width + cx
+                        if board.wall_mask >> cell & 1:
+                            break
+                        if dist[cell] == UNREACHABLE:
+                            dist[cell] = dist[idx] + 1
+                            nxt.append(cell)
+                        cx += dx
+                        cy += dy
+            frontier = nxt
+        return dist
+
+    def _line_cover(self, open_holes: int) -> int:
+        width = self.board.width
+        edges: Dict[int, List[int]] = {}
+        while open_holes:
+            low = open_holes & -open_holes
+            idx = low.bit_length() - 1
+            edges.setdefault(idx // width, []).append(idx % width)
+            open_holes ^= low
+        match: Dict[int, int] = {}
+
+        def augment(row: int, visited: Set[int]) -> bool:
+            for col in edges[row]:
+                if col in visited:
+                    continue
+                visited.add(col)
+                if col not in match or augment(match[col], visited):
+                    match[col] = row
+                    return True
+            return False
+
+        return sum(1 for row in edges if augment(row, set()))
+
+    def __call__(self, state: State) -> int:
+        best = 0
+        open_all = 0
+        for mask, holes, tables in zip(state, self.hole_masks, self._distances):
+            open_holes = holes & ~mask
+            if not open_holes:
+                continue
+            open_all |= open_holes
+            free = mask & ~holes
+            if not free:
+                return UNREACHABLE
+            if not free & (free - 1):
+                # one unlocked block of this color (the common case)
+                cell = free.bit_length() - 1
+                for hole, dist in tables:
+                    if hole & open_holes and dist[cell] > best:
+                        best = dist[cell]
+                continue
+            for hole, dist in tables:
+                if not hole & open_holes:
+                    continue
+                near = UNREACHABLE
+                blocks = free
+                while blocks:
+                    low = blocks & -blocks
+                    near = min(near, dist[low.bit_length() - 1])
+                    blocks ^= low
+                if near > best:
+                    best = near
+        if best >= UNREACHABLE or not open_all:
+            return best
+        if self.stop_map is not None and self.stop_map.is_dead(state):
+            return UNREACHABLE
+        cover = self._covers.get(open_all)
+        if cover is None:
+            cover = self._line_cover(open_all)
+            self._covers[open_all] = cover
+        return max(best, cover)
+
+
+def _table_bytes(table: Dict[int, int], key: int) -> int:
+    """A dict of state keys to depths: its hash table plus a key int like ``key`` per entry."""
+    return sys.getsizeof(table) + len(table) * sys.getsizeof(key)
+
+
+def _first_path(
+    board: Board,
+    heuristic: Heuristic,
+    start: State,
+    bound: int,
+    max_states: int,
+    known: Optional[Dict[int, int]] = None,
+) -> Tuple[Optional[List[int]], int, int, bool, int]:
+    """Depth-first search for the first solution in move order within ``bound`` moves.
+
+    Returns (path, smallest f-value above ``bound`` or UNREACHABLE, states
+    expanded, capped, estimated peak bytes of the seen table and path
+    stack). States are remembered with the fewest moves they were reached
+    in (at most ``max_states`` of them) and not re-expanded at the same
+    depth or deeper; ``known`` may hold upper bounds on start distances
+    from an earlier search to prune with.
+    """
+    unpack = board.unpack
+    successor_keys = board.successor_keys
+    is_solved = board.is_solved
+    seen: Dict[int, int] = {}
+    path: List[int] = []
+    next_bound = UNREACHABLE
+    expanded = 0
+    capped = False
+
+    def visit(key: int, depth: int) -> bool:
+        nonlocal next_bound, expanded, capped
+        if known is not None and known.get(key, UNREACHABLE) < depth:
+            return False
+        prev = seen.get(key)
+        if prev is not None and prev <= depth:
+            return False
+        state = unpack(key)
+        f = depth + heuristic(state)
+        if f > bound:
+            if f < next_bound:
+                next_bound = f
+            return False
+        if is_solved(state):
+            return True
+        if prev is None and len(seen) >= max_states:
+            capped = True
+            return False
+        seen[key] = depth
+        expanded += 1
+        for move_idx, nxt in successor_keys(state, key):
+            path.append(move_idx)
+            if visit(nxt, depth + 1):
+                return True
+            path.pop()
+            if capped:
+                return False
+        return False
+
+    start_key = board.pack(start)
+    found = visit(start_key, 0)
+    # The path stack holds at most one move per depth up to ``bound``.
+    memory = _table_bytes(seen, start_key) + sys.getsizeof([0] * (bound + 1))
+    return (path if found else None), next_bound, expanded, capped, memory
+
+
+def astar(
+    board: Board,
+    start: State,
+    max_states: int,
+    stats: Optional[SearchStats] = None,
+    prune: bool = False,
+    max_depth: Optional[int] = None,
+) -> Optional[List[int]]:
+    """Shortest solution from ``start`` using A* with ``Heuristic``.
+
+    A* settles the par; the path ``bfs`` would return is then read off with
+    one depth-first pass bounded by it, pruned by the distances A* found.
+    Popped f-values never decrease, so the first one past ``max_depth``
+    bounds par from below.
+    """
+    stop_map = StopMap(board) if prune and board.plain_slides else None
+    heuristic = Heuristic(board, stop_map)
+    pack = board.pack
+    unpack = board.unpack
+    successor_keys = board.successor_keys
+    is_solved = board.is_solved
+
+    start_key = pack(start)
+    best: Dict[int, int] = {start_key: 0}
+    # (f, -g, order, key): deepest first among equal f, then insertion order.
+    h = heuristic(start)
+    heap = [(h, 0, 0, start_key)] if h < UNREACHABLE else []
+    order = 1
+    par: Optional[int] = None
+    expanded = 0
+    capped = False
+    lower_bound = 0
+    peak_heap = len(heap)
+    while heap and not capped:
+        if len(heap) > peak_heap:
+            peak_heap = len(heap)
+        f, neg_depth, _order, key = heapq.heappop(heap)
+        if max_depth is not None and f > max_depth:
+            lower_bound = f
+            break
+        depth = -neg_depth
+        if depth > best[key]:
+            continue
+        state = unpack(key)
+        if is_solved(state):
+            par = depth
+            break
+        expanded += 1
+        for _move_idx, nxt_key in successor_keys(state, key):
+            if best.get(nxt_key, UNREACHABLE) <= depth + 1:
+                continue
+            h = heuristic(unpack(nxt_key))
+            if h >= UNREACHABLE:
+                continue
+            if nxt_key not in best and len(best) >= max_states:
+                capped = True
+                break
+            best[nxt_key] = depth + 1
+            heapq.heappush(heap, (depth + 1 + h, -(depth + 1), order, nxt_key))
+            order += 1
+
+    peak_heap = max(peak_heap, len(heap))
+    # Heap entries: a list slot and an (f, -g, order, key) tuple with its order int.
+    entry_bytes = 8 + sys.getsizeof((0, 0, 0, start_key)) + sys.getsizeof(order)
+    memory = _table_bytes(best, start_key) + sys.getsizeof([]) + peak_heap * entry_bytes
+    path: Optional[List[int]] = None
+    if par is not None:
+        # The walk keeps its own table of up to max_states states; if that runs
+        # out the path is unknown, not missing, so report the search as capped.
+        path, _next_bound, walk_expanded, walk_capped, walk_memory = _first_path(
+            board, heuristic, start, par, max_states, best
+        )
+        expanded += walk_expanded
+        memory += walk_memory
+        capped = capped or walk_capped
+    if stats is not None:
+        stats.states = len(best)
+        stats.expanded = expanded
+        stats.forward_expanded = expanded
+        stats.peak_memory_bytes = memory
+        stats.capped = capped
+        stats.pruned = stop_map.pruned if stop_map is not None else 0
+        stats.aborted = int(lower_bound > 0)
+        stats.lower_bound = par if par is not None else lower_bound
+    return path
+
+
+def ida_star(
+    board: Board,
+    start: State,
+    max_states: int,
+    stats: Optional[SearchStats] = None,
+    prune: bool = False,
+    max_depth: Optional[int] = None,
+) -> Optional[List[int]]:
+    """Shortest solution from ``start`` using IDA* with ``Heuristic``.
+
+    Each iteration is a depth-first pass under a growing f-bound, so memory
+    is one table of the states seen in the current pass (capped at
+    ``max_states``) instead of a whole frontier. Passes walk moves in order,
+    so the first solution found is the one ``bfs`` returns. A pass bound
+    past ``max_depth`` ends the search; the pass it skips would have
+    re-expanded at least what the last one did.
+    """
+    stop_map = StopMap(board) if prune and board.plain_slides else None
+    heuristic = Heuristic(board, stop_map)
+    bound = heuristic(start)
+    expanded = 0
+    states = 0
+    capped = False
+    aborted = False
+    pass_expanded = 0
+    memory = 0
+    path: Optional[List[int]] = None
+    while bound < UNREACHABLE:
+        if max_depth is not None and bound > max_depth:
+            aborted = True
+            break
+        path, bound, pass_expanded, capped, pass_memory = _first_path(board, heuristic, start, bound, max_states)
+        expanded += pass_expanded
+        states = max(states, pass_expanded)
+        memory = max(memory, pass_memory)
+        if path is not None or capped:
+            break
+    if stats is not None:
+        stats.states = states
+        stats.expanded = expanded
+        stats.forward_expanded = expanded
+        stats.peak_memory_bytes = memory
+        stats.capped = capped
+        stats.pruned = stop_map.pruned if stop_map is not None else 0
+        stats.aborted = int(aborted)
+        stats.saved = pass_expanded if aborted else 0
+        if path is not None:
+            stats.lower_bound = len(path)
+        elif aborted:
+            stats.lower_bound = bound
+    return path
+
+
+# Every search takes (board, start, max_states, stats=None, prune=False, max_depth=None).
+SEARCHES: Dict[str, Callable[..., Optional[List[int]]]] = {
+    "bfs": bfs,
+    "bidirectional": bidirectional,
+    "astar": astar,
+    "ida": ida_star,
+}
@@ -0,0 +1,226 @@
+"""
+Compact visited/parent store for solver searches.
+
+Every state is kept as one packed 64-bit key (see ``slide_engine.Board.pack``)
+in an ``array('Q')``, with its parent as an index into the same array and the
+move that reached it as one byte. Membership goes through an open-addressing
+table of keys, so a search costs roughly 30 bytes per state instead of a dict
+entry plus a tuple per state, and MAX_STATES can go into the millions.
+
+States are numbered in insertion order, so for a BFS the key array doubles as
+the queue.
+
+Boards past 8x8 or with many blocks pack into more than 63 bits. ``new_store``
+then returns a ``WideStateStore``, which keeps each key in several 64-bit
+slots of one array and its table of state indexes instead of keys.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Iterator, List, Union
+
+NO_PARENT = 0xFFFFFFFF
+
+_HASH_MUL = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class StateStore:
+    def __init__(self, key_bits: int, initial_slots: int = 1 << 12) -> None:
+        if key_bits > 63:
+            raise ValueError(f"State keys need {key_bits} bits; at most 63 fit a store slot (see new_store).")
+        self.keys = array("Q")
+        self.parents = array("I")
+        self.moves = bytearray()
+        slots = 1
+        while slots < initial_slots:
+            slots <<= 1
+        self._init_table(slots)
+        self.peak_bytes = self.memory_bytes()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _init_table(self, slots: int) -> None:
+        # Slots hold key + 1 so zero can mark an empty slot.
+        self._table = array("Q", bytes(8 * slots))
+        self._slot_mask = slots - 1
+        self._shift = 64 - (slots.bit_length() - 1)
+        self._limit = slots // 2
+
+    def _slot(self, key: int) -> int:
+        return ((key * _HASH_MUL) & _MASK64) >> self._shift
+
+    def add(self, key: int, parent: int = NO_PARENT, move: int = 0xFF) -> int:
+        """Insert a state and return its index, or -1 if it was already stored."""
+        table = self._table
+        mask = self._slot_mask
+        slot = ((key * _HASH_MUL) & _MASK64) >> self._shift
+        stored = key + 1
+        while True:
+            entry = table[slot]
+            if entry == 0:
+                break
+            if entry == stored:
+                return -1
+            slot = (slot + 1) & mask
+        table[slot] = stored
+        index = len(self.keys)
+        self.keys.append(key)
+        self.parents.append(parent)
+        self.moves.append(move)
+        if index + 1 > self._limit:
+            self._grow()
+        return index
+
+    def __contains__(self, key: int) -> bool:
+        table = self._table
+        mask = self._slot_mask
+        slot = self._slot(key)
+        stored = key + 1
+        while True:
+            entry = table[slot]
+            if entry == 0:
+                return False
+            if entry == stored:
+                return True
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+        old = self._table
+        self._init_table(len(old) * 2)
+        self.peak_bytes = max(self.peak_bytes, self.memory_bytes() + old.itemsize * len(old))
+        table = self._table
+        mask = self._slot_mask
+        for stored in old:
+            if stored == 0:
+                continue
+            slot = self._slot(stored - 1)
+            while table[slot] != 0:
+                slot = (slot + 1) & mask
+            table[slot] = stored
+
+    def path(self, index: int) -> List[int]:
+        """Move codes from the root state to ``index``."""
+        out: List[int] = []
+        while self.parents[index] != NO_PARENT:
+            out.append(self.moves[index])
+            index = self.parents[index]
+        out.reverse()
+        return out
+
+    def memory_bytes(self) -> int:
+        return (
+            self.keys.itemsize * len(self.keys)
+            + self.parents.itemsize * len(self.parents)
+            + len(self.moves)
+            + self._table.itemsize * len(self._table)
+        )
+
+    def note_peak(self) -> int:
+        self.peak_bytes = max(self.peak_bytes, self.memory_bytes())
+        return self.peak_bytes
+
+
+class WideKeys:
+    """Append-only sequence of keys of up to ``64 * words`` bits, ``words`` array slots each."""
+
+    def __init__(self, words: int) -> None:
+        self.words = words
+        self.itemsize = 8 * words
+        self._slots = array("Q")
+
+    def __len__(self) -> int:
+        return len(self._slots) // self.words
+
+    def append(self, key: int) -> None:
+        for _ in range(self.words):
+            self._slots.append(key & _MASK64)
+            key >>= 64
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, List[int]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        slots = self._slots
+        base = index * self.words
+        key = 0
+        for i in range(base + self.words - 1, base - 1, -1):
+            key = key << 64 | slots[i]
+        return key
+
+    def __iter__(self) -> Iterator[int]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+class WideStateStore(StateStore):
+    """StateStore for keys wider than 63 bits; same interface, slower probes."""
+
+    def __init__(self, key_bits: int, initial_slots: int = 1 << 12) -> None:
+        self.keys = WideKeys((key_bits + 63) // 64)  # type: ignore[assignment]
+        self.parents = array("I")
+        self.moves = bytearray()
+        slots = 1
+        while slots < initial_slots:
+            slots <<= 1
+        self._init_table(slots)
+        self.peak_bytes = self.memory_bytes()
+
+    # Slots hold the state index + 1, so probes compare against stored keys.
+    def _slot(self, key: int) -> int:
+        return ((hash(key) * _HASH_MUL) & _MASK64) >> self._shift
+
+    def add(self, key: int, parent: int = NO_PARENT, move: int = 0xFF) -> int:
+        table = self._table
+        mask = self._slot_mask
+        keys = self.keys
+        slot = self._slot(key)
+        while True:
+            entry = table[slot]
+            if entry == 0:
+                break
+            if keys[entry - 1] == key:
+                return -1
+            slot = (slot + 1) & mask
+        index = len(keys)
+        table[slot] = index + 1
+        keys.append(key)
+        self.parents.append(parent)
+        self.moves.append(move)
+        if index + 1 > self._limit:
+            self._grow()
+        return index
+
+    def __contains__(self, key: int) -> bool:
+        table = self._table
+        mask = self._slot_mask
+        keys = self.keys
+        slot = self._slot(key)
+        while True:
+            entry = table[slot]
+            if entry == 0:
+                return False
+            if keys[entry - 1] == key:
+                return True
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+        old = self._table
+        self._init_table(len(old) * 2)
+        self.peak_bytes = max(self.peak_bytes, self.memory_bytes() + old.itemsize * len(old))
+        table = self._table
+        mask = self._slot_mask
+        for index, key in enumerate(self.keys):
+            slot = self._slot(key)
+            while table[slot] != 0:
+                slot = (slot + 1) & mask
+            table[slot] = index + 1
+
+
+def new_store(key_bits: int) -> StateStore:
+    """A store for ``key_bits``-bit keys: StateStore when they fit a slot, else WideStateStore."""
+    if key_bits > 63:
+        return WideStateStore(key_bits)
+    return StateStore(key_bits)
@@ -0,0 +1,229 @@
+"""
+Symmetry-free level keys built from bitboards.
+
+A level is a row of masks (bit y * size + x): walls, then holes and blocks of
+each color slot. ``level_key`` lays them out as fixed-width lanes of one
+integer and returns it as bytes; ``canonical_key`` takes the smallest key over
+the eight rotations and reflections, numbered as in
+geometry.Geometry.transform_pos.
+
+On 8x8 boards every lane is one 64-bit bitboard and the transforms are
+delta swaps that work on all lanes of the packed integer at once: a byte swap
+flips rows, a bit swap inside each byte mirrors columns and three masked
+shifts transpose. Other square sizes permute cell by cell.
+
+``SymmetryIndex`` maps canonical keys to the first item seen with them.
+"""
+from __future__ import annotations
+
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from slide_engine import WIDTH
+
+
+COLOR_SLOTS = 4
+
+Pos = Tuple[int, int]
+T = TypeVar("T")
+
+
+def _repeat(constant: int, lanes: int, lane_bits: int = 64) -> int:
+    out = 0
+    for _ in range(lanes):
+        out = out << lane_bits | constant
+    return out
+
+
+class _Lanes:
+    """Per-lane delta swap constants for ``lanes`` packed 64-bit bitboards."""
+
+    def __init__(self, lanes: int) -> None:
+        self.byte1 = _repeat(0x00FF00FF00FF00FF, lanes)
+        self.byte2 = _repeat(0x0000FFFF0000FFFF, lanes)
+        self.byte4 = _repeat(0x00000000FFFFFFFF, lanes)
+        self.bit1 = _repeat(0x5555555555555555, lanes)
+        self.bit2 = _repeat(0x3333333333333333, lanes)
+        self.bit4 = _repeat(0x0F0F0F0F0F0F0F0F, lanes)
+        self.diag7 = _repeat(0x5500550055005500, lanes)
+        self.diag14 = _repeat(0x3333000033330000, lanes)
+        self.diag28 = _repeat(0x0F0F0F0F00000000, lanes)
+
+    def flip_rows(self, x: int) -> int:
+        """y -> 7 - y: reverse the bytes of every lane."""
+        x = (x >> 8) & self.byte1 | (x & self.byte1) << 8
+        x = (x >> 16) & self.byte2 | (x & self.byte2) << 16
+        return (x >> 32) & self.byte4 | (x & self.byte4) << 32
+
+    def mirror_columns(self, x: int) -> int:
+        """x -> 7 - x: reverse the bits of every byte."""
+        x = (x >> 1) & self.bit1 | (x & self.bit1) << 1
+        x = (x >> 2) & self.bit2 | (x & self.bit2) << 2
+        return (x >> 4) & self.bit4 | (x & self.bit4) << 4
+
+    def transpose(self, x: int) -> int:
+        """(x, y) -> (y, x). The masks keep bits shifted out of a lane from landing in the next one."""
+        t = self.diag28 & (x ^ (x << 28))
+        x ^= t ^ (t >> 28)
+        t = self.diag14 & (x ^ (x << 14))
+        x ^= t ^ (t >> 14)
+        t = self.diag7 & (x ^ (x << 7))
+        return x ^ t ^ (t >> 7)
+
+
+_LANES: Dict[int, _Lanes] = {}
+
+
+def _lanes(count: int) -> _Lanes:
+    lanes = _LANES.get(count)
+    if lanes is None:
+        lanes = _Lanes(count)
+        _LANES[count] = lanes
+    return lanes
+
+
+def _lane_bits(size: int) -> int:
+    return (size * size + 7) // 8 * 8
+
+
+def level_masks(
+    walls: Iterable[Pos],
+    holes: Dict[Pos, int],
+    blocks: Dict[Pos, int],
+    size: int = WIDTH,
+    colors: int = COLOR_SLOTS,
+) -> List[int]:
+    masks = [0] * (1 + 2 * colors)
+    for x, y in walls:
+        masks[0] |= 1 << (y * size + x)
+    for offset, pieces in ((1, holes), (1 + colors, blocks)):
+        for (x, y), color in pieces.items():
+            if not 0 <= color < colors:
+                raise RuntimeError(f"Color {color} outside the {colors} key slots")
+            masks[offset + color] |= 1 << (y * size + x)
+    return masks
+
+
+def _pack(masks: List[int], lane_bits: int) -> int:
+    packed = 0
+    for mask in masks:
+        packed = packed << lane_bits | mask
+    return packed
+
+
+def _permuted(masks: List[int], variant: int, size: int) -> List[int]:
+    last = size - 1
+    out = []
+    for mask in masks:
+        moved = 0
+        while mask:
+            low = mask & -mask
+            idx = low.bit_length() - 1
+            x, y = idx % size, idx // size
+            nx, ny = (
+                (x, y),
+                (y, last - x),
+                (last - x, last - y),
+                (last - y, x),
+                (last - x, y),
+                (x, last - y),
+                (y, x),
+                (last - y, last - x),
+            )[variant]
+            moved |= 1 << (ny * size + nx)
+            mask ^= low
+        out.append(moved)
+    return out
+
+
+def variant_keys(masks: List[int], size: int = WIDTH) -> List[int]:
+    """Packed key of the level under each of the eight transforms, by variant number."""
+    if size == 8:
+        lanes = _lanes(len(masks))
+        base = _pack(masks, 64)
+        mirrored = lanes.mirror_columns(base)
+        transposed = lanes.transpose(base)
+        turned = lanes.mirror_columns(transposed)
+        return [
+            base,
+            lanes.flip_rows(transposed),
+            lanes.flip_rows(mirrored),
+            turned,
+            mirrored,
+            lanes.flip_rows(base),
+            transposed,
+            lanes.flip_rows(turned),
+        ]
+    lane_bits = _lane_bits(size)
+    return [_pack(_permuted(masks, variant, size), lane_bits) for variant in range(8)]
+
+
+def _to_bytes(packed: int, lanes: int, size: int) -> bytes:
+    return packed.to_bytes(lanes * _lane_bits(size) // 8, "big")
+
+
+def level_key(
+    walls: Iterable[Pos],
+    holes: Dict[Pos, int],
+    blocks: Dict[Pos, int],
+    size: int = WIDTH,
+    colors: int = COLOR_SLOTS,
+) -> bytes:
+    """Fixed-size key of the level as given (no symmetry folding)."""
+    masks = level_masks(walls, holes, blocks, size, colors)
+    return _to_bytes(_pack(masks, _lane_bits(size)), len(masks), size)
+
+
+def canonical_key(
+    walls: Iterable[Pos],
+    holes: Dict[Pos, int],
+    blocks: Dict[Pos, int],
+    size: int = WIDTH,
+    colors: int = COLOR_SLOTS,
+) -> Tuple[bytes, int]:
+    """Smallest key over the eight symmetries and the lowest variant giving it."""
+    masks = level_masks(walls, holes, blocks, size, colors)
+    keys = variant_keys(masks, size)
+    best = min(keys)
+    return _to_bytes(best, len(masks), size), keys.index(best)
+
+
+def transformed_keys(
+    walls: Iterable[Pos],
+    holes: Dict[Pos, int],
+    blocks: Dict[Pos, int],
+    size: int = WIDTH,
+    colors: int = COLOR_SLOTS,
+) -> List[bytes]:
+    """``level_key`` of every transformed copy of the level, by variant number."""
+    masks = level_masks(walls, holes, blocks, size, colors)
+    return [_to_bytes(key, len(masks), size) for key in variant_keys(masks, size)]
+
+
+class SymmetryIndex(Generic[T]):
+    """Canonical key -> first item added with it."""
+
+    def __init__(self, size: int = WIDTH, colors: int = COLOR_SLOTS) -> None:
+        self.size = size
+        self.colors = colors
+        self._first: Dict[bytes, T] = {}
+
+    def __len__(self) -> int:
+        return len(self._first)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._first
+
+    def key(self, walls: Iterable[Pos], holes: Dict[Pos, int], blocks: Dict[Pos, int]) -> bytes:
+        return canonical_key(walls, holes, blocks, self.size, self.colors)[0]
+
+    def add(self, walls: Iterable[Pos], holes: Dict[Pos, int], blocks: Dict[Pos, int], item: T) -> Optional[T]:
+        """Index ``item``; returns the earlier item of the same symmetry class instead if there is one."""
+        key = self.key(walls, holes, blocks)
+        first = self._first.get(key)
+        if first is not None:
+            return first
+        self._first[key] = item
+        return None
+
+    def keys(self) -> Set[bytes]:
+        return set(self._first)